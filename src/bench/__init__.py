@@ -0,0 +1,5 @@
+"""
+Benchmarks for the markdown to html pipeline, run them with
+
+    PYTHONPATH=src python3 -m bench
+"""
@@ -0,0 +1,102 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+
+from bench.corpus import SHAPES, generate_document
+from bench.stages import STAGES, run_stages
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    List every stage of every corpus whose best time got slower than
+    threshold times the same stage in baseline.
+    """
+    regressions = []
+    baseline_corpora = {corpus["name"]: corpus for corpus in baseline["corpora"]}
+    for corpus in results["corpora"]:
+        previous = baseline_corpora.get(corpus["name"])
+        if previous is None:
+            continue
+        for stage in STAGES:
+            if stage not in previous["stages"]:
+                continue
+            old = previous["stages"][stage]["min_s"]
+            new = corpus["stages"][stage]["min_s"]
+            ratio = new / old if old else 1.0
+            print(f"{corpus['name']:>24} {stage:>22} {ratio:6.2f}x", file=sys.stderr)
+            if ratio > threshold:
+                regressions.append(f"{corpus['name']} {stage}: {ratio:.2f}x slower")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="bench", description="benchmark the flowery-press markdown pipeline"
+    )
+    parser.add_argument(
+        "--shape",
+        action="append",
+        choices=SHAPES,
+        help="corpus shape to benchmark, can be given multiple times (default: all)",
+    )
+    parser.add_argument(
+        "--blocks", type=int, default=200, help="number of blocks per document"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="write the json results to this file")
+    parser.add_argument(
+        "--compare", help="json results of an earlier run to check for regressions"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.2,
+        help="slowdown factor counted as a regression by --compare",
+    )
+    args = parser.parse_args()
+
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "corpora": [],
+    }
+    for shape in args.shape or SHAPES:
+        markdown = generate_document(shape, args.blocks, args.seed)
+        corpus = {"name": f"{shape}-{args.blocks}-{args.seed}", "shape": shape}
+        corpus.update(run_stages(markdown, args.repeat))
+        results["corpora"].append(corpus)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, mode="w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, mode="r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Micro-benchmark of block_to_block_type against the regex based classifier
+it replaced, run it with
+
+    PYTHONPATH=src python3 -m bench.classify
+"""
+
+import argparse
+import json
+import re
+import time
+
+from bench.corpus import SHAPES, generate_document
+from markdown_parsing import BlockType, block_to_block_type, markdown_to_blocks
+
+
+def regex_block_to_block_type(block: str) -> BlockType:
+    """
+    The classifier block_to_block_type used to be, kept as the baseline.
+    """
+    pattern = re.compile(r"^(#{1,6})\s")
+    if bool(pattern.match(block)):
+        return BlockType.HEADING
+    elif block.startswith("```") and block.endswith("```"):
+        return BlockType.CODE
+    lines = block.split("\n")
+    quote = True
+    unordered_list = True
+    for line in lines:
+        if not line.startswith(">"):
+            quote = False
+        if not line.startswith("- "):
+            unordered_list = False
+    if quote:
+        return BlockType.QUOTE
+    elif unordered_list:
+        return BlockType.UNORDERED_LIST
+
+    ordered_list = False
+    count = 1
+    if block.startswith("1. "):
+        ordered_list = True
+        for line in lines:
+            if not line.startswith(f"{count}. "):
+                ordered_list = False
+                break
+            count += 1
+    if ordered_list:
+        return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+
+def time_per_block(blocks: list[str], classify, repeat: int) -> float:
+    """
+    Best time over repeat runs of classifying every block, in ns per block.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for block in blocks:
+            classify(block)
+        elapsed = time.perf_counter_ns() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(blocks)
+
+
+def compare_classifiers(blocks: list[str], repeat: int = 20) -> dict[str, float]:
+    regex_ns = time_per_block(blocks, regex_block_to_block_type, repeat)
+    single_pass_ns = time_per_block(blocks, block_to_block_type, repeat)
+    return {
+        "regex_ns_per_block": regex_ns,
+        "single_pass_ns_per_block": single_pass_ns,
+        "speedup": regex_ns / single_pass_ns if single_pass_ns else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="bench.classify", description="benchmark block_to_block_type"
+    )
+    parser.add_argument("--blocks", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    results = {}
+    for shape in SHAPES:
+        blocks = markdown_to_blocks(generate_document(shape, args.blocks, args.seed))
+        results[shape] = compare_classifiers(blocks, args.repeat)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
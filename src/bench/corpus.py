@@ -0,0 +1,99 @@
+import random
+
+SHAPES = ("paragraphs", "lists", "links", "code", "mixed")
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron "
+    "while elves dwarves and men of middle earth received their own rings"
+).split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _formatted_sentence(rng: random.Random, words: int) -> str:
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        roll = rng.random()
+        if roll < 0.05:
+            word = f"**{word}**"
+        elif roll < 0.10:
+            word = f"_{word}_"
+        elif roll < 0.13:
+            word = f"`{word}`"
+        parts.append(word)
+    return " ".join(parts)
+
+
+def _link(rng: random.Random) -> str:
+    url = f"/blog/{rng.choice(WORDS)}/{rng.randrange(1000)}"
+    return f"[{_sentence(rng, 2)}]({url})"
+
+
+def _image(rng: random.Random) -> str:
+    image = f"/images/{rng.choice(WORDS)}{rng.randrange(100)}.png"
+    return f"![{_sentence(rng, 3)}]({image})"
+
+
+def _paragraph_block(rng: random.Random) -> str:
+    return "\n".join(_formatted_sentence(rng, 20) for _ in range(12))
+
+
+def _list_block(rng: random.Random) -> str:
+    items = rng.randrange(20, 60)
+    if rng.random() < 0.5:
+        return "\n".join(f"- {_formatted_sentence(rng, 8)}" for _ in range(items))
+    return "\n".join(f"{i}. {_formatted_sentence(rng, 8)}" for i in range(1, items + 1))
+
+
+def _links_block(rng: random.Random) -> str:
+    parts = []
+    for _ in range(30):
+        parts.append(_sentence(rng, 3))
+        parts.append(_image(rng) if rng.random() < 0.3 else _link(rng))
+    return " ".join(parts)
+
+
+def _code_block(rng: random.Random) -> str:
+    lines = (f"let {rng.choice(WORDS)} = {rng.randrange(10000)}" for _ in range(400))
+    return "```\n" + "\n".join(lines) + "\n```"
+
+
+def _mixed_block(rng: random.Random) -> str:
+    roll = rng.random()
+    if roll < 0.1:
+        return f"{'#' * rng.randint(2, 6)} {_sentence(rng, 5)}"
+    elif roll < 0.2:
+        return "\n".join(f"> {_formatted_sentence(rng, 10)}" for _ in range(4))
+    elif roll < 0.4:
+        return _list_block(rng)
+    elif roll < 0.5:
+        return _links_block(rng)
+    elif roll < 0.55:
+        return _code_block(rng)
+    return _paragraph_block(rng)
+
+
+BLOCK_GENERATORS = {
+    "paragraphs": _paragraph_block,
+    "lists": _list_block,
+    "links": _links_block,
+    "code": _code_block,
+    "mixed": _mixed_block,
+}
+
+
+def generate_document(shape: str, blocks: int, seed: int = 0) -> str:
+    """
+    Generate a synthetic markdown document with a title and blocks blocks of
+    the given shape, the same shape, size and seed always give the same text.
+    """
+    if shape not in BLOCK_GENERATORS:
+        raise ValueError(f'unknown corpus shape: "{shape}"')
+    rng = random.Random(f"{shape}-{blocks}-{seed}")
+    generate_block = BLOCK_GENERATORS[shape]
+    parts = [f"# {_sentence(rng, 4)}"]
+    parts.extend(generate_block(rng) for _ in range(blocks))
+    return "\n\n".join(parts) + "\n"
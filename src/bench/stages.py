@@ -0,0 +1,117 @@
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+
+from markdown_parsing import (
+    block_inline_texts,
+    iter_blocks,
+    text_to_textnodes,
+    typed_blocks_to_html_node,
+)
+from template import Template
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+# NOTE: the functions generate_page calls, iter_blocks splits and classifies
+#       the blocks in one pass
+STAGES = (
+    "iter_blocks",
+    "text_to_textnodes",
+    "typed_blocks_to_html_node",
+    "to_html",
+    "template",
+    "write",
+    "read",
+)
+
+
+def _time(func: Callable[[], object], repeat: int) -> dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {"min_s": min(timings), "mean_s": sum(timings) / len(timings)}
+
+
+def run_stages(markdown: str, repeat: int = 5) -> dict:
+    """
+    Time every stage of turning markdown into a written page separately,
+    each stage is fed the output of the previous ones computed up front.
+    """
+    lines = markdown.split("\n")
+    blocks = list(iter_blocks(lines))
+    texts = [
+        text
+        for block_type, block in blocks
+        for text in block_inline_texts(block, block_type)
+    ]
+    html_node = typed_blocks_to_html_node(blocks)
+    html = html_node.to_html()
+    template = Template(TEMPLATE, "/flowery-press/")
+    page = template.render({"Title": "benchmark", "Content": html})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "index.html")
+
+        def write():
+            with open(path, mode="w") as f:
+                f.write(page)
+
+        def read():
+            with open(path, mode="r") as f:
+                f.read()
+
+        write()
+        stages = {
+            "iter_blocks": _time(lambda: list(iter_blocks(lines)), repeat),
+            "text_to_textnodes": _time(
+                lambda: [text_to_textnodes(text) for text in texts], repeat
+            ),
+            "typed_blocks_to_html_node": _time(
+                lambda: typed_blocks_to_html_node(blocks), repeat
+            ),
+            "to_html": _time(html_node.to_html, repeat),
+            "template": _time(
+                lambda: template.render({"Title": "benchmark", "Content": html}),
+                repeat,
+            ),
+            "write": _time(write, repeat),
+            "read": _time(read, repeat),
+        }
+
+    return {
+        "bytes": len(markdown.encode()),
+        "blocks": len(blocks),
+        "inline_texts": len(texts),
+        "html_bytes": len(html.encode()),
+        "stages": stages,
+        "memory": measure_memory(markdown),
+    }
+
+
+def measure_memory(markdown: str) -> dict[str, int]:
+    """
+    Bytes still allocated for the html node tree of markdown and the peak
+    allocated while building it.
+    """
+    tracemalloc.start()
+    try:
+        html_node = typed_blocks_to_html_node(iter_blocks(markdown.split("\n")))
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del html_node
+    return {"retained_bytes": retained, "peak_bytes": peak}
@@ -0,0 +1,344 @@
+import html
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import Collection, Mapping
+from urllib.parse import urlsplit
+from build_manifest import hash_bytes, hash_file
+from generate_page import page_url, remove_page, write_page
+from htmlnode import HTMLNode, LeafNode, ParentNode
+from metadata_index import MetadataIndex
+from template import load_template, rebase_urls
+
+DEFAULT_BLOG_MANIFEST_PATH = os.path.join(".flowery-cache", "blog.json")
+BLOG_MANIFEST_VERSION = 1
+BLOG_SECTION = "blog"
+DEFAULT_PAGE_SIZE = 10
+DEFAULT_FEED_SIZE = 20
+DEFAULT_FEED_TITLE = "Blog"
+FEED_NAME = "atom.xml"
+
+TAG_SLUG_PATTERN = re.compile(r"[^\w]+")
+
+
+def tag_slug(tag: str) -> str:
+    return TAG_SLUG_PATTERN.sub("-", tag.lower()).strip("-")
+
+
+def listing_path(directory: str, page: int) -> str:
+    """
+    Output path of the page-th page of a listing relative to the output
+    directory: blog/index.html, blog/page/2/index.html, ...
+    """
+    if page == 1:
+        return os.path.join(directory, "index.html")
+    return os.path.join(directory, "page", str(page), "index.html")
+
+
+def post_item(entry: dict, dest_dir_path: str, section: str) -> dict:
+    """
+    Everything a listing or the feed shows of a post. The url is root
+    relative, templates rebase it like any other.
+    """
+    metadata = entry["metadata"]
+    updated = metadata.get("date")
+    if updated is not None:
+        updated = f"{updated}T00:00:00Z"
+    else:
+        mtime = datetime.fromtimestamp(entry["mtime_ns"] / 1e9, timezone.utc)
+        updated = mtime.strftime("%Y-%m-%dT%H:%M:%SZ")
+    return {
+        "url": page_url(entry["dest"], dest_dir_path),
+        "title": str(metadata["title"]),
+        "date": metadata.get("date"),
+        "updated": updated,
+        "tags": [
+            [tag, f"/{section}/tags/{tag_slug(tag)}/"]
+            for tag in metadata.get("tags", [])
+        ],
+        "summary": entry.get("summary"),
+    }
+
+
+def listing_url(directory: str, page: int) -> str:
+    path = os.path.dirname(listing_path(directory, page)).replace(os.sep, "/")
+    return f"/{path}/"
+
+
+def paginate(
+    items: list[dict], title: str, directory: str, page_size: int
+) -> dict[str, dict]:
+    """
+    Output path => title, items and the urls of the newer and older page
+    of every page of a listing of items.
+    """
+    pages = {}
+    page_count = max(1, -(-len(items) // page_size))
+    for page in range(1, page_count + 1):
+        pages[listing_path(directory, page)] = {
+            "title": title,
+            "items": items[(page - 1) * page_size : page * page_size],
+            "newer": listing_url(directory, page - 1) if page > 1 else None,
+            "older": listing_url(directory, page + 1) if page < page_count else None,
+        }
+    return pages
+
+
+def blog_pages(
+    index: MetadataIndex,
+    content_dir_path: str,
+    dest_dir_path: str,
+    section: str = BLOG_SECTION,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> dict[str, dict]:
+    """
+    Output path of every page of the index of the posts below section and
+    of the listing of every tag => what it lists, see paginate. Built from
+    the metadata and summaries in index alone, no post is read.
+    """
+    section_dir = os.path.join(content_dir_path, section)
+    items = {
+        source_file_path: post_item(entry, dest_dir_path, section)
+        for source_file_path, entry in index.posts(section_dir)
+    }
+    pages = paginate(list(items.values()), "Blog", section, page_size)
+    for tag, sources in index.tags(section_dir).items():
+        directory = os.path.join(section, "tags", tag_slug(tag))
+        tag_items = [items[source_file_path] for source_file_path in sources]
+        pages.update(paginate(tag_items, f"Posts tagged {tag}", directory, page_size))
+    return pages
+
+
+def feed_items(
+    index: MetadataIndex,
+    content_dir_path: str,
+    dest_dir_path: str,
+    section: str = BLOG_SECTION,
+    feed_size: int = DEFAULT_FEED_SIZE,
+) -> list[dict]:
+    """
+    Items of the newest feed_size posts below section.
+    """
+    posts = index.posts(os.path.join(content_dir_path, section))[:feed_size]
+    return [post_item(entry, dest_dir_path, section) for _, entry in posts]
+
+
+def listing_node(listing: dict) -> HTMLNode:
+    children = [LeafNode("h1", html.escape(listing["title"]))]
+    list_items = []
+    for item in listing["items"]:
+        item_children = [
+            ParentNode(
+                "a", [LeafNode(None, html.escape(item["title"]))], {"href": item["url"]}
+            )
+        ]
+        if item["date"] is not None:
+            item_children.append(
+                LeafNode("time", item["date"], {"datetime": item["date"]})
+            )
+        if item["tags"]:
+            tags = [
+                LeafNode("a", html.escape(tag), {"href": url})
+                for tag, url in item["tags"]
+            ]
+            item_children.append(ParentNode("p", tags, {"class": "tags"}))
+        if item["summary"] is not None:
+            item_children.append(LeafNode(None, item["summary"]))
+        list_items.append(ParentNode("li", item_children))
+    if list_items:
+        children.append(ParentNode("ul", list_items, {"class": "posts"}))
+    links = []
+    if listing["newer"] is not None:
+        links.append(LeafNode("a", "Newer posts", {"href": listing["newer"]}))
+    if listing["older"] is not None:
+        links.append(LeafNode("a", "Older posts", {"href": listing["older"]}))
+    if links:
+        children.append(ParentNode("nav", links))
+    return ParentNode("div", children)
+
+
+def feed_entry(item: dict, site_root: str) -> str:
+    """
+    The Atom <entry> of a post, its links made absolute with site_root.
+    """
+    url = html.escape(site_root + item["url"][1:])
+    lines = [
+        "  <entry>",
+        f"    <title>{html.escape(item['title'])}</title>",
+        f'    <link href="{url}"/>',
+        f"    <id>{url}</id>",
+        f"    <updated>{item['updated']}</updated>",
+    ]
+    for tag, _ in item["tags"]:
+        lines.append(f'    <category term="{html.escape(tag)}"/>')
+    if item["summary"] is not None:
+        summary = rebase_urls(item["summary"], site_root)
+        lines.append(f'    <summary type="html">{html.escape(summary)}</summary>')
+    lines.append("  </entry>\n")
+    return "\n".join(lines)
+
+
+class BlogManifest:
+    """
+    Digest of what every generated listing page shows, by output path, and
+    the rendered Atom entry of every post in the feed with the digest of
+    the item it was rendered from, by url.
+    """
+
+    def __init__(
+        self,
+        pages: dict[str, str] | None = None,
+        entries: dict[str, dict] | None = None,
+    ) -> None:
+        self.pages = pages if pages is not None else {}
+        self.entries = entries if entries is not None else {}
+
+    def to_dict(self) -> dict:
+        return {
+            "version": BLOG_MANIFEST_VERSION,
+            "pages": self.pages,
+            "entries": self.entries,
+        }
+
+    @classmethod
+    def load(cls, path: str) -> "BlogManifest":
+        # NOTE: without a usable manifest every page is just written again
+        try:
+            with open(path, mode="r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict) or data.get("version") != BLOG_MANIFEST_VERSION:
+            return cls()
+        return cls(data.get("pages"), data.get("entries"))
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def __eq__(self, other):
+        return self.pages == other.pages and self.entries == other.entries
+
+    def __repr__(self):
+        return f"BlogManifest(pages: {self.pages}, entries: {self.entries})"
+
+
+def digest(value: object) -> str:
+    return hash_bytes(json.dumps(value, sort_keys=True).encode())
+
+
+def write_blog(
+    pages: dict[str, dict],
+    dest_dir_path: str,
+    template_path: str,
+    base_path: str = "/",
+    assets: Mapping[str, str] | None = None,
+    images: Mapping[str, str] | None = None,
+    feed: list[dict] | None = None,
+    site_url: str = "",
+    section: str = BLOG_SECTION,
+    previous: BlogManifest | None = None,
+    content_pages: Collection[str] = (),
+    feed_title: str = DEFAULT_FEED_TITLE,
+    feed_author: str | None = None,
+) -> tuple[BlogManifest, int]:
+    """
+    Write every listing page in pages into dest_dir_path with the template
+    and with feed the Atom feed of its items, linking to site_url, titled
+    feed_title and by feed_author, the host of site_url by default. Only
+    pages whose contents, or whose template, base_path, assets or images
+    changed since previous are written, and only the feed entries of changed
+    posts are rendered again. Listing pages that are gone are removed.
+    Listings at the path of one of the content_pages generated from markdown,
+    e.g. blog/index.html, are skipped and such pages are never removed.
+    Returns the manifest of the build and the number of files written.
+    """
+    previous = previous or BlogManifest()
+    manifest = BlogManifest()
+    template = load_template(template_path, base_path, assets, images)
+    context = [hash_file(template_path), base_path, assets or {}, images]
+    written = 0
+
+    def is_current(relative_path: str) -> bool:
+        unchanged = previous.pages.get(relative_path) == manifest.pages[relative_path]
+        return unchanged and os.path.exists(os.path.join(dest_dir_path, relative_path))
+
+    for relative_path, listing in sorted(pages.items()):
+        if relative_path in content_pages:
+            # NOTE: a page written for the path, e.g. an introduction to the
+            #       blog in its index.md, wins over the generated listing
+            print(f"Skipping listing {relative_path}, a page in content has its path")
+            continue
+        manifest.pages[relative_path] = digest([context, listing])
+        if is_current(relative_path):
+            continue
+        dest_file_path = os.path.join(dest_dir_path, relative_path)
+        print(f"Generating listing {dest_file_path}")
+        values = {"Title": listing["title"], "Content": listing_node(listing)}
+        write_page(dest_file_path, lambda write: template.write(write, values))
+        written += 1
+
+    if feed is not None:
+        site_root = site_url.rstrip("/") + base_path
+        for item in feed:
+            item_digest = digest([site_root, item])
+            entry = previous.entries.get(item["url"])
+            if entry is None or entry["digest"] != item_digest:
+                entry = {"digest": item_digest, "xml": feed_entry(item, site_root)}
+            manifest.entries[item["url"]] = entry
+        if feed_author is None:
+            feed_author = urlsplit(site_url).netloc or site_url
+        feed_path = os.path.join(section, FEED_NAME)
+        manifest.pages[feed_path] = digest(
+            [
+                site_root,
+                feed_title,
+                feed_author,
+                [manifest.entries[item["url"]]["digest"] for item in feed],
+            ]
+        )
+        if not is_current(feed_path):
+            dest_file_path = os.path.join(dest_dir_path, feed_path)
+            print(f"Generating feed {dest_file_path}")
+            entries = [manifest.entries[item["url"]]["xml"] for item in feed]
+            updated = max((item["updated"] for item in feed), default=None)
+            contents = feed_document(
+                site_root, section, updated, entries, feed_title, feed_author
+            )
+            write_page(dest_file_path, lambda write: write(contents))
+            written += 1
+
+    for relative_path in previous.pages.keys() - manifest.pages.keys():
+        if relative_path in content_pages:
+            continue
+        remove_page(os.path.join(dest_dir_path, relative_path), dest_dir_path)
+    return manifest, written
+
+
+def feed_document(
+    site_root: str,
+    section: str,
+    updated: str | None,
+    entries: list[str],
+    title: str = DEFAULT_FEED_TITLE,
+    author: str = "",
+) -> str:
+    section_url = html.escape(f"{site_root}{section}/")
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom">\n'
+        f"  <title>{html.escape(title)}</title>\n"
+        f"  <author><name>{html.escape(author)}</name></author>\n"
+        f'  <link href="{section_url}{FEED_NAME}" rel="self"/>\n'
+        f'  <link href="{section_url}"/>\n'
+        f"  <id>{section_url}</id>\n"
+        f"  <updated>{updated or '1970-01-01T00:00:00Z'}</updated>\n"
+        + "".join(entries)
+        + "</feed>\n"
+    )
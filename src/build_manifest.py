@@ -0,0 +1,100 @@
+import hashlib
+import json
+import os
+
+MANIFEST_VERSION = 1
+DEFAULT_MANIFEST_PATH = os.path.join(".flowery-cache", "manifest.json")
+
+
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, mode="rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """
+    Record of the inputs of the last build: the template hash, the base_path,
+    the urls rewritten in pages (fingerprinted "assets" and "images"
+    attributes) and for every markdown source its content hash and
+    generated output path.
+    """
+
+    def __init__(
+        self,
+        template_hash: str | None = None,
+        base_path: str | None = None,
+        pages: dict[str, dict[str, str]] | None = None,
+        rewrites: dict[str, dict[str, str] | None] | None = None,
+    ) -> None:
+        self.template_hash = template_hash
+        self.base_path = base_path
+        self.pages = pages if pages is not None else {}
+        self.rewrites = rewrites if rewrites is not None else {}
+
+    def add_page(self, source_path: str, source_hash: str, dest_path: str) -> None:
+        self.pages[source_path] = {"hash": source_hash, "dest": dest_path}
+
+    def is_page_current(
+        self, source_path: str, source_hash: str, dest_path: str
+    ) -> bool:
+        entry = self.pages.get(source_path)
+        return (
+            entry is not None
+            and entry["hash"] == source_hash
+            and entry["dest"] == dest_path
+            and os.path.exists(dest_path)
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "version": MANIFEST_VERSION,
+            "template_hash": self.template_hash,
+            "base_path": self.base_path,
+            "pages": self.pages,
+            "rewrites": self.rewrites,
+        }
+
+    @classmethod
+    def load(cls, path: str) -> "BuildManifest":
+        # NOTE: a missing, corrupt or outdated manifest just means nothing
+        #       is known about the previous build, so everything gets rebuilt
+        try:
+            with open(path, mode="r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict) or data.get("version") != MANIFEST_VERSION:
+            return cls()
+        return cls(
+            data.get("template_hash"),
+            data.get("base_path"),
+            data.get("pages"),
+            data.get("rewrites"),
+        )
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def __eq__(self, other):
+        return (
+            self.template_hash == other.template_hash
+            and self.base_path == other.base_path
+            and self.pages == other.pages
+            and self.rewrites == other.rewrites
+        )
+
+    def __repr__(self):
+        return f"BuildManifest(template_hash: {self.template_hash}, base_path: {self.base_path}, pages: {self.pages}, rewrites: {self.rewrites})"
@@ -0,0 +1,170 @@
+import json
+import os
+from htmlnode import HTMLNode
+
+DEFAULT_GRAPH_PATH = os.path.join(".flowery-cache", "dependencies.json")
+GRAPH_VERSION = 1
+
+LINK_ATTRIBUTES = {"a": "href", "img": "src"}
+
+
+def url_path(url: str) -> str | None:
+    """
+    Path of a root relative url without the leading slash, query and
+    fragment, None for any other url.
+    """
+    if not url.startswith("/"):
+        return None
+    for separator in ("?", "#"):
+        url = url.split(separator, 1)[0]
+    return url[1:]
+
+
+def linked_urls(node: HTMLNode) -> list[str]:
+    """
+    Paths of the root relative urls of every link and image in node, i.e.
+    of the LINK and IMAGE text nodes its markdown was parsed into.
+    """
+    urls = []
+    pending = [node]
+    while pending:
+        node = pending.pop()
+        if node.children:
+            pending.extend(reversed(node.children))
+            continue
+        attribute = LINK_ATTRIBUTES.get(node.tag)
+        if attribute is None or not node.props or attribute not in node.props:
+            continue
+        path = url_path(node.props[attribute])
+        if path is not None:
+            urls.append(path)
+    return urls
+
+
+class DependencyGraph:
+    """
+    Edges from every generated page to the inputs it was built from: its
+    markdown source, the template and the root relative urls it references,
+    which resolve to static assets or other generated pages.
+    """
+
+    def __init__(
+        self,
+        static_dir: str = "static",
+        pages: dict[str, dict] | None = None,
+    ) -> None:
+        self.static_dir = static_dir
+        self.pages = pages if pages is not None else {}
+
+    def add_page(
+        self, dest_path: str, source_path: str, template_path: str, urls: list[str]
+    ) -> None:
+        self.pages[dest_path] = {
+            "source": source_path,
+            "template": template_path,
+            "urls": sorted(set(urls)),
+        }
+
+    def retain(self, dest_paths: set[str]) -> None:
+        """
+        Forget every page that isn't in dest_paths anymore.
+        """
+        for dest_path in self.pages.keys() - dest_paths:
+            del self.pages[dest_path]
+
+    def resolve(self, url: str, dest_dir: str) -> tuple[str, str] | None:
+        """
+        ("asset", path) or ("page", path) the url path points at, None if it
+        doesn't point at anything known.
+        """
+        relative_path = url.replace("/", os.sep)
+        asset = os.path.join(self.static_dir, relative_path)
+        if relative_path and os.path.isfile(asset):
+            return "asset", asset
+        page = os.path.join(dest_dir, relative_path)
+        for candidate in (
+            page,
+            os.path.join(page, "index.html"),
+            f"{page.rstrip(os.sep)}.html",
+        ):
+            if os.path.normpath(candidate) in self.pages:
+                return "page", os.path.normpath(candidate)
+        return None
+
+    def dependencies(self, dest_path: str, dest_dir: str) -> dict[str, list[str]]:
+        """
+        Everything the page at dest_path depends on, by kind of edge.
+        """
+        entry = self.pages[os.path.normpath(dest_path)]
+        dependencies = {
+            "source": [entry["source"]],
+            "template": [entry["template"]],
+            "asset": [],
+            "page": [],
+            "missing": [],
+        }
+        for url in entry["urls"]:
+            resolved = self.resolve(url, dest_dir)
+            if resolved is None:
+                dependencies["missing"].append(f"/{url}")
+            else:
+                kind, path = resolved
+                dependencies[kind].append(path)
+        return dependencies
+
+    def dependents(self, path: str, dest_dir: str) -> list[str]:
+        """
+        Every page with an edge to path, be it its source, template, an
+        asset or another page.
+        """
+        path = os.path.normpath(path)
+        dependents = []
+        for dest_path in sorted(self.pages):
+            dependencies = self.dependencies(dest_path, dest_dir)
+            if any(path in paths for paths in dependencies.values()):
+                dependents.append(dest_path)
+        return dependents
+
+    def referencing(self, urls: set[str]) -> set[str]:
+        """
+        Pages that reference any of the url paths in urls.
+        """
+        return {
+            dest_path
+            for dest_path, entry in self.pages.items()
+            if not urls.isdisjoint(entry["urls"])
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "version": GRAPH_VERSION,
+            "static_dir": self.static_dir,
+            "pages": self.pages,
+        }
+
+    @classmethod
+    def load(cls, path: str, static_dir: str = "static") -> "DependencyGraph":
+        # NOTE: without a usable graph every page counts as unknown
+        try:
+            with open(path, mode="r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(static_dir)
+        if not isinstance(data, dict) or data.get("version") != GRAPH_VERSION:
+            return cls(static_dir)
+        return cls(data.get("static_dir", static_dir), data.get("pages"))
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def __eq__(self, other):
+        return self.static_dir == other.static_dir and self.pages == other.pages
+
+    def __repr__(self):
+        return f"DependencyGraph(static_dir: {self.static_dir}, pages: {self.pages})"
@@ -0,0 +1,286 @@
+import os
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from shutil import copy2
+from dump_files import sync_files
+from generate_page import (
+    find_pages,
+    generate_page,
+    generate_pages_recursively,
+    page_dest_path,
+    page_outputs,
+    remove_page,
+)
+
+RELOAD_PATH = "/__flowery/reload"
+RELOAD_SCRIPT = (
+    f'<script>new EventSource("{RELOAD_PATH}")'
+    ".onmessage = () => location.reload();</script>"
+)
+
+
+def _scan_dir(path: str, files: dict[str, tuple[int, int]]) -> None:
+    with os.scandir(path) as entries:
+        for entry in entries:
+            # NOTE: editors litter the tree with swap and backup files
+            if entry.name.startswith(".") or entry.name.endswith("~"):
+                continue
+            if entry.is_dir():
+                _scan_dir(entry.path, files)
+            elif entry.is_file():
+                stat = entry.stat()
+                files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+
+def scan_files(paths: list[str]) -> dict[str, tuple[int, int]]:
+    """
+    Map every file in paths (files or directories) to its mtime and size.
+    """
+    files = {}
+    for path in paths:
+        if os.path.isdir(path):
+            _scan_dir(path, files)
+        elif os.path.isfile(path):
+            stat = os.stat(path)
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+class PollingWatcher:
+    """
+    Detects added, modified and removed files by comparing a stat of every
+    file in paths against the previous poll.
+    """
+
+    def __init__(self, paths: list[str]) -> None:
+        self.paths = paths
+        self.files = scan_files(paths)
+
+    def poll(self) -> set[str]:
+        files = scan_files(self.paths)
+        changed = {
+            path
+            for path in files.keys() | self.files.keys()
+            if files.get(path) != self.files.get(path)
+        }
+        self.files = files
+        return changed
+
+
+def _relative_to(path: str, root: str) -> str | None:
+    relative_path = os.path.relpath(path, root)
+    if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+        return None
+    return relative_path
+
+
+class SiteRebuilder:
+    """
+    Regenerates only the outputs affected by a set of changed input files,
+    the compiled template stays cached in between.
+    """
+
+    def __init__(
+        self,
+        dir_path_content: str,
+        static_dir: str,
+        template_path: str,
+        dest_dir_path: str,
+        base_path: str = "/",
+        manifest_path: str | None = None,
+    ) -> None:
+        self.dir_path_content = dir_path_content
+        self.static_dir = static_dir
+        self.template_path = template_path
+        self.dest_dir_path = dest_dir_path
+        self.base_path = base_path
+        self.manifest_path = manifest_path
+
+    def build_all(self) -> None:
+        sync_files(
+            self.static_dir,
+            self.dest_dir_path,
+            keep=page_outputs(self.dir_path_content, self.dest_dir_path),
+        )
+        generate_pages_recursively(
+            self.dir_path_content,
+            self.template_path,
+            self.dest_dir_path,
+            self.base_path,
+            manifest_path=self.manifest_path,
+        )
+
+    def rebuild(self, changed: set[str]) -> int:
+        """
+        Bring the outputs of the changed files up to date and return how
+        many outputs were touched. Errors are reported and skipped so a
+        broken page doesn't stop the server.
+        """
+        pages = set()
+        assets = set()
+        if self.template_path in changed:
+            pages.update(source for source, _ in find_pages(self.dir_path_content, "."))
+        for path in changed:
+            if _relative_to(path, self.dir_path_content) is not None:
+                pages.add(path)
+            elif _relative_to(path, self.static_dir) is not None:
+                assets.add(path)
+
+        touched = 0
+        for source_path in sorted(pages):
+            dest_path = page_dest_path(
+                source_path, self.dir_path_content, self.dest_dir_path
+            )
+            try:
+                if os.path.exists(source_path):
+                    generate_page(
+                        source_path, self.template_path, dest_path, self.base_path
+                    )
+                else:
+                    remove_page(dest_path, self.dest_dir_path)
+                touched += 1
+            except Exception as e:
+                print(f"Failed to generate page from {source_path}: {e}")
+        for asset_path in sorted(assets):
+            dest_path = os.path.join(
+                self.dest_dir_path, os.path.relpath(asset_path, self.static_dir)
+            )
+            if os.path.exists(asset_path):
+                os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+                copy2(asset_path, dest_path)
+            elif os.path.exists(dest_path):
+                os.remove(dest_path)
+            touched += 1
+        return touched
+
+
+class ReloadNotifier:
+    """
+    Version counter that wakes up every waiting browser connection when
+    the site was rebuilt.
+    """
+
+    def __init__(self) -> None:
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def notify(self) -> None:
+        with self.condition:
+            self.version += 1
+            self.condition.notify_all()
+
+    def wait(self, version: int, timeout: float) -> int:
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+class DevRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Serves the generated site, injects the reload script into html pages
+    and streams reload events to them.
+    """
+
+    def do_GET(self):
+        if self.path == RELOAD_PATH:
+            self.send_reload_events()
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split("?", 1)[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        if path.endswith(".html") and os.path.isfile(path):
+            self.send_html(path)
+            return
+        super().do_GET()
+
+    def send_html(self, path: str) -> None:
+        with open(path, mode="rb") as f:
+            body = f.read()
+        script = RELOAD_SCRIPT.encode()
+        index = body.rfind(b"</body>")
+        if index == -1:
+            body += script
+        else:
+            body = body[:index] + script + body[index:]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_reload_events(self) -> None:
+        notifier: ReloadNotifier = self.server.notifier
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        version = notifier.version
+        try:
+            while True:
+                new_version = notifier.wait(version, timeout=15)
+                if new_version == version:
+                    self.wfile.write(b": keepalive\n\n")
+                else:
+                    version = new_version
+                    self.wfile.write(b"data: reload\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            return
+
+
+def make_server(
+    dest_dir_path: str, port: int, notifier: ReloadNotifier
+) -> ThreadingHTTPServer:
+    handler = partial(DevRequestHandler, directory=dest_dir_path)
+    server = ThreadingHTTPServer(("", port), handler)
+    server.notifier = notifier
+    return server
+
+
+def serve(
+    rebuilder: SiteRebuilder,
+    port: int = 8888,
+    watch: bool = True,
+    interval: float = 0.1,
+) -> None:
+    """
+    Build the site, serve it on localhost:port and with watch rebuild the
+    affected outputs whenever content, static files or the template change,
+    telling open browser tabs to reload afterwards.
+    """
+    rebuilder.build_all()
+    notifier = ReloadNotifier()
+    server = make_server(rebuilder.dest_dir_path, port, notifier)
+    print(f"Serving {rebuilder.dest_dir_path} on http://localhost:{port}")
+    if not watch:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    watcher = PollingWatcher(
+        [rebuilder.dir_path_content, rebuilder.static_dir, rebuilder.template_path]
+    )
+    try:
+        while True:
+            time.sleep(interval)
+            changed = watcher.poll()
+            if not changed:
+                continue
+            start = time.perf_counter()
+            touched = rebuilder.rebuild(changed)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"Rebuilt {touched} output(s) in {elapsed:.1f} ms")
+            notifier.notify()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -1,23 +1,200 @@
 import os
-from shutil import copy, rmtree
+import time
+from concurrent.futures import ThreadPoolExecutor
+from shutil import copy2, copystat, rmtree
 
 
-def move_and_update_all_files(source_dir: str, dest_dir: str) -> None:
+class SyncStats:
+    def __init__(self) -> None:
+        self.copied = 0
+        self.linked = 0
+        self.removed = 0
+        self.unchanged = 0
+        self.bytes_copied = 0
+        self.seconds = 0.0
+
+    def throughput(self) -> float:
+        """
+        Bytes copied per second of copying.
+        """
+        return self.bytes_copied / self.seconds if self.seconds else 0.0
+
+    def __eq__(self, other):
+        return (
+            self.copied == other.copied
+            and self.linked == other.linked
+            and self.removed == other.removed
+            and self.unchanged == other.unchanged
+            and self.bytes_copied == other.bytes_copied
+        )
+
+    def __repr__(self):
+        return f"SyncStats(copied: {self.copied}, linked: {self.linked}, removed: {self.removed}, unchanged: {self.unchanged}, bytes_copied: {self.bytes_copied}, seconds: {self.seconds})"
+
+
+def scan_tree(root: str) -> dict[str, os.stat_result]:
+    """
+    Map the path relative to root of every file below root to its stat.
+    """
+    files = {}
+    if not os.path.isdir(root):
+        return files
+    pending = [""]
+    while pending:
+        relative_dir = pending.pop()
+        with os.scandir(os.path.join(root, relative_dir)) as entries:
+            for entry in entries:
+                relative_path = os.path.join(relative_dir, entry.name)
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(relative_path)
+                else:
+                    files[relative_path] = entry.stat()
+    return files
+
+
+def _same_contents(from_path: str, to_path: str) -> bool:
+    with open(from_path, mode="rb") as a, open(to_path, mode="rb") as b:
+        while True:
+            chunk_a = a.read(1 << 16)
+            if chunk_a != b.read(1 << 16):
+                return False
+            if not chunk_a:
+                return True
+
+
+def is_up_to_date(
+    from_stat: os.stat_result,
+    to_stat: os.stat_result | None,
+    from_path: str,
+    to_path: str,
+    checksum: bool = False,
+) -> bool:
+    if to_stat is None or from_stat.st_size != to_stat.st_size:
+        return False
+    if from_stat.st_mtime_ns == to_stat.st_mtime_ns:
+        return True
+    if checksum and _same_contents(from_path, to_path):
+        # NOTE: take over the mtime so the next sync doesn't compare contents again
+        copystat(from_path, to_path)
+        return True
+    return False
+
+
+def copy_file(from_path: str, to_path: str, link: bool = False) -> bool:
+    """
+    Copy from_path to to_path including its mtime, or hard link it with
+    link=True. The data is copied in the kernel via copy_file_range (a
+    reflink on filesystems supporting it) or shutil's os.sendfile fast path.
+    Returns whether the file was linked.
     """
-    Delete dest_dir and recursively copy all contents from source_dir
-    to dest_dir.
+    if os.path.lexists(to_path):
+        os.remove(to_path)
+    if link:
+        try:
+            os.link(from_path, to_path)
+            return True
+        except OSError:
+            pass
+    if hasattr(os, "copy_file_range"):
+        try:
+            with open(from_path, mode="rb") as src, open(to_path, mode="wb") as dst:
+                remaining = os.fstat(src.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+            if remaining == 0:
+                copystat(from_path, to_path)
+                return False
+        except OSError:
+            pass
+    copy2(from_path, to_path)
+    return False
+
+
+def copy_files(
+    copies: list[tuple[str, str, int]],
+    stats: SyncStats,
+    workers: int = 1,
+    link: bool = False,
+) -> None:
+    """
+    Copy every (from_path, to_path, size) in copies, fanned out to a pool of
+    at most workers threads, and add the results to stats.
+    """
+    # NOTE: directories are created up front so the copying threads never race
+    for directory in sorted({os.path.dirname(to_path) for _, to_path, _ in copies}):
+        if os.path.isfile(directory):
+            os.remove(directory)
+        os.makedirs(directory, exist_ok=True)
+    for _, to_path, _ in copies:
+        if os.path.isdir(to_path):
+            rmtree(to_path)
+
+    def copy(job: tuple[str, str, int]) -> bool:
+        from_path, to_path, _ = job
+        return copy_file(from_path, to_path, link)
+
+    start = time.perf_counter()
+    if workers <= 1 or len(copies) <= 1:
+        linked = list(map(copy, copies))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            linked = list(executor.map(copy, copies))
+    stats.seconds += time.perf_counter() - start
+
+    for (_, _, size), was_linked in zip(copies, linked):
+        if was_linked:
+            stats.linked += 1
+        else:
+            stats.copied += 1
+            stats.bytes_copied += size
+    return
+
+
+def sync_files(
+    source_dir: str,
+    dest_dir: str,
+    keep: set[str] | None = None,
+    checksum: bool = False,
+    link: bool = False,
+    workers: int = 1,
+) -> SyncStats:
+    """
+    Make dest_dir mirror source_dir by only copying files whose size or mtime
+    (or with checksum=True, contents) differ and removing files that aren't
+    in source_dir anymore. Paths in keep, e.g. generated pages, are left alone.
     """
     if not os.path.exists(source_dir):
         raise ValueError("source directory doesn't exist")
+    keep = {os.path.normpath(path) for path in keep or set()}
 
-    if os.path.exists(dest_dir):
-        rmtree(dest_dir)
-    os.mkdir(dest_dir)
-    for object in os.listdir(source_dir):
-        from_path = os.path.join(source_dir, object)
-        to_path = os.path.join(dest_dir, object)
-        if os.path.isfile(from_path):
-            copy(from_path, to_path)
+    source_files = scan_tree(source_dir)
+    dest_files = scan_tree(dest_dir)
+    stats = SyncStats()
+
+    copies = []
+    for relative_path, from_stat in sorted(source_files.items()):
+        from_path = os.path.join(source_dir, relative_path)
+        to_path = os.path.join(dest_dir, relative_path)
+        to_stat = dest_files.get(relative_path)
+        if is_up_to_date(from_stat, to_stat, from_path, to_path, checksum):
+            stats.unchanged += 1
         else:
-            move_and_update_all_files(from_path, to_path)
-    return
+            copies.append((from_path, to_path, from_stat.st_size))
+    copy_files(copies, stats, workers, link)
+
+    for relative_path in sorted(dest_files.keys() - source_files.keys()):
+        if relative_path in keep:
+            continue
+        os.remove(os.path.join(dest_dir, relative_path))
+        stats.removed += 1
+    _remove_empty_dirs(dest_dir)
+    return stats
+
+
+def _remove_empty_dirs(root: str) -> None:
+    for directory, _, _ in sorted(os.walk(root), reverse=True):
+        if directory != root and not os.listdir(directory):
+            os.rmdir(directory)
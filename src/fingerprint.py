@@ -0,0 +1,151 @@
+import json
+import os
+from build_manifest import hash_file
+from dump_files import copy_file, scan_tree
+
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+ASSET_MANIFEST_VERSION = 1
+
+# NOTE: files like robots.txt, CNAME or favicon.ico are looked up by their
+#       name, only assets that are referenced from pages get fingerprinted
+FINGERPRINT_EXTENSIONS = (
+    ".css",
+    ".js",
+    ".mjs",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".gif",
+    ".webp",
+    ".avif",
+    ".svg",
+    ".woff",
+    ".woff2",
+    ".ttf",
+)
+
+FINGERPRINT_LENGTH = 10
+
+
+def fingerprinted_path(path: str, digest: str) -> str:
+    """
+    images/tom.png with digest abc123... => images/tom.abc123....png
+    """
+    root, extension = os.path.splitext(path)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+
+class AssetManifest:
+    """
+    Map the path of every fingerprinted static file, relative to the static
+    directory, to its fingerprinted path together with the size and mtime
+    its content hash was computed for.
+    """
+
+    def __init__(self, assets: dict[str, dict] | None = None) -> None:
+        self.assets = assets if assets is not None else {}
+
+    def add(self, path: str, digest: str, stat: os.stat_result) -> None:
+        self.assets[path] = {
+            "path": fingerprinted_path(path, digest),
+            "hash": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def current_hash(self, path: str, stat: os.stat_result) -> str | None:
+        entry = self.assets.get(path)
+        if (
+            entry is None
+            or entry["size"] != stat.st_size
+            or entry["mtime_ns"] != stat.st_mtime_ns
+        ):
+            return None
+        return entry["hash"]
+
+    def urls(self) -> dict[str, str]:
+        """
+        Original path => fingerprinted path, as url paths.
+        """
+        return {
+            path.replace(os.sep, "/"): entry["path"].replace(os.sep, "/")
+            for path, entry in self.assets.items()
+        }
+
+    def to_dict(self) -> dict:
+        return {"version": ASSET_MANIFEST_VERSION, "assets": self.assets}
+
+    @classmethod
+    def load(cls, path: str) -> "AssetManifest":
+        # NOTE: without a usable manifest every asset just gets hashed again
+        try:
+            with open(path, mode="r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict) or data.get("version") != ASSET_MANIFEST_VERSION:
+            return cls()
+        return cls(data.get("assets"))
+
+    def save(self, path: str) -> bool:
+        """
+        Return whether the manifest was written, an unchanged one is left
+        alone so it keeps its mtime and isn't precompressed again.
+        """
+        contents = json.dumps(self.to_dict(), indent=2, sort_keys=True)
+        try:
+            with open(path, mode="r") as f:
+                if f.read() == contents:
+                    return False
+        except OSError:
+            pass
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w") as f:
+            f.write(contents)
+        os.replace(tmp_path, path)
+        return True
+
+    def __eq__(self, other):
+        return self.assets == other.assets
+
+    def __repr__(self):
+        return f"AssetManifest(assets: {self.assets})"
+
+
+def fingerprint_assets(
+    source_dir: str, previous: AssetManifest | None = None
+) -> AssetManifest:
+    """
+    Fingerprint every asset in source_dir, reusing the content hashes in
+    previous for files whose size and mtime didn't change.
+    """
+    manifest = AssetManifest()
+    for relative_path, stat in sorted(scan_tree(source_dir).items()):
+        if not relative_path.lower().endswith(FINGERPRINT_EXTENSIONS):
+            continue
+        digest = previous.current_hash(relative_path, stat) if previous else None
+        if digest is None:
+            digest = hash_file(os.path.join(source_dir, relative_path))
+        manifest.add(relative_path, digest, stat)
+    return manifest
+
+
+def write_fingerprinted_files(dest_dir: str, manifest: AssetManifest) -> int:
+    """
+    Hard link (or copy) every asset already synced into dest_dir to its
+    fingerprinted path next to it. The original stays in place for
+    references that aren't rewritten, e.g. url() in stylesheets. Returns
+    the number of files written.
+    """
+    written = 0
+    for path, entry in manifest.assets.items():
+        to_path = os.path.join(dest_dir, entry["path"])
+        # NOTE: the name contains the content hash, an existing file is current
+        if os.path.exists(to_path):
+            continue
+        copy_file(os.path.join(dest_dir, path), to_path, link=True)
+        written += 1
+    return written
@@ -0,0 +1,24 @@
+import os
+
+# NOTE: helpers shared by the test modules, not named test_* so unittest
+#       discover doesn't collect it as one
+
+
+def write_file(path: str, contents: str) -> None:
+    """
+    Write contents to path, creating the directories leading up to it.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode="w") as f:
+        f.write(contents)
+
+
+def write_bytes(path: str, contents: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, mode="wb") as f:
+        f.write(contents)
+
+
+def read_file(path: str) -> str:
+    with open(path, mode="r") as f:
+        return f.read()
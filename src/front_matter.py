@@ -0,0 +1,98 @@
+from datetime import date
+from typing import Iterable, Iterator
+
+FRONT_MATTER_DELIMITER = "---"
+
+
+def parse_value(value: str) -> str | bool | list[str]:
+    """
+    [a, b] => ["a", "b"], true/false => bool, "quoted" => quoted, anything
+    else stays a string.
+    """
+    value = value.strip()
+    if value.startswith("[") and value.endswith("]"):
+        items = value[1:-1].split(",")
+        return [str(parse_value(item)) for item in items if item.strip()]
+    if value in ("true", "false"):
+        return value == "true"
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def parse_front_matter(lines: Iterable[str]) -> dict[str, str | bool | list[str]]:
+    """
+    The key: value pairs of the lines between the --- delimiters, blank and
+    # comment lines are skipped. A date has to be an ISO date, tags can also
+    be given comma separated.
+    """
+    metadata = {}
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        key, separator, value = stripped.partition(":")
+        if not separator or not key.strip():
+            raise ValueError(f'invalid front matter line: "{stripped}"')
+        metadata[key.strip()] = parse_value(value)
+    if "date" in metadata:
+        date.fromisoformat(str(metadata["date"]))
+    if isinstance(metadata.get("tags"), str):
+        metadata["tags"] = [tag.strip() for tag in metadata["tags"].split(",")]
+        metadata["tags"] = [tag for tag in metadata["tags"] if tag]
+    if "draft" in metadata and not isinstance(metadata["draft"], bool):
+        raise ValueError(f'draft has to be true or false: "{metadata["draft"]}"')
+    return metadata
+
+
+def split_front_matter(
+    markdown: str,
+) -> tuple[dict[str, str | bool | list[str]], str]:
+    """
+    The front matter of markdown and the markdown after it. Without a front
+    matter block, or one that is never closed, the markdown is left as is.
+    """
+    first_end = markdown.find("\n")
+    if first_end == -1 or markdown[:first_end].strip() != FRONT_MATTER_DELIMITER:
+        return {}, markdown
+    position = first_end + 1
+    while True:
+        end = markdown.find("\n", position)
+        line = markdown[position:] if end == -1 else markdown[position:end]
+        if line.strip() == FRONT_MATTER_DELIMITER:
+            header = markdown[first_end + 1 : position].split("\n")
+            body = "" if end == -1 else markdown[end + 1 :]
+            return parse_front_matter(header), body
+        if end == -1:
+            return {}, markdown
+        position = end + 1
+
+
+class FrontMatterReader:
+    """
+    Pass lines through without the front matter block at their start, which
+    is parsed into metadata as soon as it is read.
+    """
+
+    def __init__(self, lines: Iterable[str]) -> None:
+        self.lines = lines
+        self.metadata: dict[str, str | bool | list[str]] = {}
+
+    def __iter__(self) -> Iterator[str]:
+        lines = iter(self.lines)
+        for first_line in lines:
+            if first_line.strip() != FRONT_MATTER_DELIMITER:
+                yield first_line
+                break
+            header = []
+            for line in lines:
+                if line.strip() == FRONT_MATTER_DELIMITER:
+                    self.metadata = parse_front_matter(header)
+                    break
+                header.append(line)
+            else:
+                # NOTE: never closed, so it wasn't front matter after all
+                yield first_line
+                yield from header
+            break
+        yield from lines
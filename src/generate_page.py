@@ -1,55 +1,1146 @@
 import os
-from markdown_parsing import markdown_to_html_node
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Mapping
+from block_cache import BlockCache
+from build_manifest import DEFAULT_MANIFEST_PATH, BuildManifest, hash_file
+from htmlnode import HTMLNode, ParentNode
+from dependency_graph import DependencyGraph, linked_urls
+from front_matter import FrontMatterReader, split_front_matter
+from mapped_markdown import (
+    MappedFile,
+    find_mapped_title,
+    iter_mapped_blocks,
+    split_mapped_front_matter,
+)
+from markdown_parsing import (
+    BlockType,
+    block_inline_texts,
+    block_to_html_node,
+    iter_blocks,
+    typed_blocks_to_html_node,
+)
+from profiling import BuildProfile, PageProfile
+from render_cache import RenderCache
+from search_terms import PageTerms
+from template import Template, load_template, root_url_paths
+
+# NOTE: sources at least this large are memory mapped instead of read, see
+#       _generate_page_mapped
+MMAP_MIN_SIZE = 64 * 1024 * 1024
+
+
+class PageGenerationError(Exception):
+    def __init__(self, failures: list[tuple[str, str]]) -> None:
+        self.failures = failures
+        super().__init__(
+            f"failed to generate {len(failures)} page(s): "
+            + ", ".join(source for source, _ in failures)
+        )
 
 
 def extract_title(markdown: str) -> str:
-    lines = markdown.split("\n")
-    for line in lines:
+    # NOTE: walk the lines in place up to the first h1, splitting the whole
+    #       document would copy all of it just to find one line
+    start = 0
+    while True:
+        end = markdown.find("\n", start)
+        line = markdown[start:] if end == -1 else markdown[start:end]
         stripped = line.strip()
         if stripped.startswith("# "):
             return stripped[2:]
+        if end == -1:
+            break
+        start = end + 1
     raise Exception("no h1 header found in markdown")
 
 
-def generate_page(
-    from_path: str, template_path: str, dest_path: str, base_path: str = "/"
+class TitleScanner:
+    """
+    Pass lines through unchanged while remembering the title extract_title
+    would find in them.
+    """
+
+    def __init__(self, lines: Iterable[str]) -> None:
+        self.lines = lines
+        self.title: str | None = None
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self.lines:
+            if self.title is None:
+                stripped = line.strip()
+                if stripped.startswith("# "):
+                    self.title = stripped[2:]
+            yield line
+
+
+def write_page(
+    dest_path: str, write_contents: Callable[[Callable[[str], object]], None]
 ) -> None:
+    """
+    Create dest_path with whatever write_contents passes to the write
+    function it is given.
+    """
+    # NOTE: exist_ok because parallel workers may race creating the same directory
+    directory = os.path.dirname(dest_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # NOTE: the content is serialized straight into the file, a temporary file
+    #       keeps a half written page from replacing the previous one on errors
+    tmp_path = f"{dest_path}.tmp"
+    try:
+        with open(tmp_path, mode="w") as f:
+            write_contents(f.write)
+        os.replace(tmp_path, dest_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return
+
+
+def generate_page(
+    from_path: str,
+    template_path: str,
+    dest_path: str,
+    base_path: str = "/",
+    profile: PageProfile | None = None,
+    block_cache: BlockCache | None = None,
+    render_cache: RenderCache | None = None,
+    assets: Mapping[str, str] | None = None,
+    images: Mapping[str, str] | None = None,
+    terms: PageTerms | None = None,
+) -> list[str]:
+    """
+    Generate the page at dest_path from the markdown at from_path. Returns
+    the paths of the root relative urls the page and its template reference.
+    With terms the title and the terms of the page are added to it, unless
+    it was read from the render_cache.
+    """
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
-    markdown_contents = ""
-    final_html = ""
+    template = load_template(template_path, base_path, assets, images)
+    render_block = block_cache.render_block if block_cache is not None else None
+    if profile is not None:
+        urls = _generate_page_profiled(
+            from_path, template, dest_path, profile, render_block, terms
+        )
+        return urls + template.urls
+    # NOTE: huge pages skip the render cache, caching them would mean holding
+    #       all of their html in memory
+    if os.path.getsize(from_path) >= MMAP_MIN_SIZE:
+        urls = _generate_page_mapped(
+            from_path, template, dest_path, render_block, terms
+        )
+        if urls is not None:
+            return urls + template.urls
+    if render_cache is not None:
+        urls = _generate_page_cached(
+            from_path, template, dest_path, render_cache, render_block, terms
+        )
+        return urls + template.urls
+
+    # NOTE: the markdown is parsed block by block while reading the file
+    #       instead of reading it into memory as a whole first
     with open(from_path, mode="r") as f:
-        markdown_contents = f.read()
-    with open(template_path, mode="r") as f:
-        final_html = f.read()
-
-    html = markdown_to_html_node(markdown_contents).to_html()
-    title = extract_title(markdown_contents)
-
-    final_html = (
-        final_html.replace("{{ Content }}", html)
-        .replace("{{ Title }}", title)
-        .replace('href="/', f'href="{base_path}')
-        .replace('src="/', f'src="{base_path}')
+        title, html_node = render_node(FrontMatterReader(f), render_block, terms)
+
+    write_page(
+        dest_path,
+        lambda write: template.write(write, {"Title": title, "Content": html_node}),
     )
+    return linked_urls(html_node) + template.urls
 
-    directory = os.path.dirname(dest_path)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
 
-    with open(dest_path, mode="w") as f:
-        f.write(final_html)
-    return
+def render_node(
+    lines: Iterable[str],
+    render_block: Callable[[str, BlockType | None], HTMLNode] | None = None,
+    terms: PageTerms | None = None,
+) -> tuple[str, HTMLNode]:
+    """
+    Title and html node of the markdown lines, without front matter. With
+    terms the title and the terms of the markdown are added to it.
+    """
+    lines = TitleScanner(lines)
+    html_node = typed_blocks_to_html_node(iter_blocks(lines), render_block)
+    if lines.title is None:
+        raise Exception("no h1 header found in markdown")
+    if terms is not None:
+        terms.title = lines.title
+        terms.add_node(html_node)
+    return lines.title, html_node
 
 
-def generate_pages_recursively(
-    dir_path_content: str, template_path: str, dest_dir_path: str, base_path: str = "/"
-) -> None:
+def render_content(
+    markdown: str,
+    render_block: Callable[[str, BlockType | None], HTMLNode] | None = None,
+    render_cache: RenderCache | None = None,
+    terms: PageTerms | None = None,
+) -> str:
+    """
+    The html fragment of markdown, read from the render_cache if it has it.
+    With terms the title and the terms of markdown are added to it when it
+    is rendered.
+    """
+    key = None
+    if render_cache is not None:
+        key = render_cache.key(markdown)
+        html = render_cache.get(key)
+        if html is not None:
+            return html
+    _, html_node = render_node(markdown.split("\n"), render_block, terms)
+    html = html_node.to_html()
+    if render_cache is not None:
+        render_cache.put(key, html)
+    return html
+
+
+def _generate_page_cached(
+    from_path: str,
+    template: Template,
+    dest_path: str,
+    render_cache: RenderCache,
+    render_block: Callable[[str, BlockType | None], HTMLNode] | None = None,
+    terms: PageTerms | None = None,
+) -> list[str]:
+    # NOTE: the whole source is needed up front to hash it, on a hit the
+    #       markdown is never parsed at all
+    with open(from_path, mode="r") as f:
+        _, markdown = split_front_matter(f.read())
+    title = extract_title(markdown)
+    html = render_content(markdown, render_block, render_cache, terms)
+
+    write_page(
+        dest_path,
+        lambda write: template.write(write, {"Title": title, "Content": html}),
+    )
+    # NOTE: a cached page is never parsed, so its links and images are
+    #       taken from the html they were rendered into
+    return root_url_paths(html)
+
+
+def _generate_page_mapped(
+    from_path: str,
+    template: Template,
+    dest_path: str,
+    render_block: Callable[[str, BlockType | None], HTMLNode] | None = None,
+    terms: PageTerms | None = None,
+) -> list[str] | None:
+    """
+    generate_page for a source too large to hold in memory more than once.
+    The file is memory mapped and every block is decoded, rendered and
+    written on its own, so memory is bounded by the largest block instead
+    of the size of the file. None when the source has \\r line endings,
+    which only the text reader translates.
+    """
+    if render_block is None:
+        render_block = block_to_html_node
+    # NOTE: only distinct urls are kept, the dependency graph keeps no more
+    #       and a huge page may link the same few pages over and over
+    urls: dict[str, None] = {}
+    with MappedFile(from_path) as mapped:
+        data = mapped.data
+        if data.find(b"\r") != -1:
+            return None
+        _, start = split_mapped_front_matter(data)
+        title = find_mapped_title(data, start)
+        if title is None:
+            raise Exception("no h1 header found in markdown")
+        if terms is not None:
+            terms.title = title
+
+        def render_blocks() -> Iterator[HTMLNode]:
+            for block_type, block in iter_mapped_blocks(data, start):
+                html_node = render_block(block, block_type)
+                urls.update(dict.fromkeys(linked_urls(html_node)))
+                if terms is not None:
+                    terms.add_node(html_node)
+                yield html_node
+
+        # NOTE: the children are rendered while the page is written, the tree
+        #       of the whole page never exists at once
+        html_node = ParentNode("div", render_blocks())
+        write_page(
+            dest_path,
+            lambda write: template.write(write, {"Title": title, "Content": html_node}),
+        )
+    return list(urls)
+
+
+def _generate_page_profiled(
+    from_path: str,
+    template: Template,
+    dest_path: str,
+    profile: PageProfile,
+    render_block: Callable[[str, BlockType | None], HTMLNode] | None = None,
+    terms: PageTerms | None = None,
+) -> list[str]:
+    # NOTE: same steps as generate_page, but every stage runs to completion
+    #       on its own so it can be timed separately, the render cache is
+    #       skipped so the profile always covers the whole pipeline
+    with profile.stage("read"):
+        with open(from_path, mode="r") as f:
+            markdown = f.read()
+    profile.sizes["read"] = os.path.getsize(from_path)
+
+    with profile.stage("parse"):
+        _, markdown = split_front_matter(markdown)
+        blocks = list(iter_blocks(markdown.split("\n")))
+        title = extract_title(markdown)
+    profile.sizes["parse"] = sum(len(block) for _, block in blocks)
+
+    with profile.stage("inline"):
+        html_node = typed_blocks_to_html_node(blocks, render_block)
+    # NOTE: the inline markdown of every block, blocks the block cache
+    #       already rendered count all the same
+    profile.sizes["inline"] = sum(
+        len(text)
+        for block_type, block in blocks
+        for text in block_inline_texts(block, block_type)
+    )
+
+    if terms is not None:
+        terms.title = title
+        terms.add_node(html_node)
+
+    with profile.stage("serialize"):
+        html = html_node.to_html()
+    profile.sizes["serialize"] = len(html)
+
+    with profile.stage("template"):
+        page = template.render({"Title": title, "Content": html})
+    profile.sizes["template"] = len(page)
+
+    with profile.stage("write"):
+        write_page(dest_path, lambda write: write(page))
+    profile.sizes["write"] = os.path.getsize(dest_path)
+    return linked_urls(html_node)
+
+
+def find_pages(dir_path_content: str, dest_dir_path: str) -> list[tuple[str, str]]:
+    """
+    Recursively collect (source, destination) path pairs for every markdown
+    file in dir_path_content.
+    """
+    pages = []
     for file in os.listdir(dir_path_content):
         source_file_path = os.path.join(dir_path_content, file)
         dest_file_path = os.path.join(dest_dir_path, file)
         if os.path.isfile(source_file_path):
             dest_file_path = dest_file_path.replace(".md", ".html")
-            generate_page(source_file_path, template_path, dest_file_path, base_path)
+            pages.append((source_file_path, dest_file_path))
         else:
-            generate_pages_recursively(source_file_path, template_path, dest_file_path, base_path)
+            pages.extend(find_pages(source_file_path, dest_file_path))
+    return pages
+
+
+def page_outputs(dir_path_content: str, dest_dir_path: str) -> set[str]:
+    """
+    Paths relative to dest_dir_path of every page generated from dir_path_content.
+    """
+    return {
+        os.path.relpath(dest_file_path, dest_dir_path)
+        for _, dest_file_path in find_pages(dir_path_content, dest_dir_path)
+    }
+
+
+def page_dest_path(
+    source_file_path: str, dir_path_content: str, dest_dir_path: str
+) -> str:
+    """
+    The output path find_pages pairs with a markdown file in dir_path_content.
+    """
+    relative_path = os.path.relpath(source_file_path, dir_path_content)
+    return os.path.join(dest_dir_path, relative_path).replace(".md", ".html")
+
+
+def page_url(dest_path: str, dest_dir_path: str, base_path: str = "/") -> str:
+    """
+    The url a page generated to dest_path is served at, without index.html.
+    """
+    url = os.path.relpath(dest_path, dest_dir_path).replace(os.sep, "/")
+    if url == "index.html" or url.endswith("/index.html"):
+        url = url[: -len("index.html")]
+    return f"{base_path}{url}"
+
+
+# NOTE: every worker process keeps its own block cache for the whole build
+_worker_block_cache: BlockCache | None = None
+_worker_render_cache: RenderCache | None = None
+_worker_template: Template | None = None
+
+
+def _init_worker(
+    block_cache_bytes: int | None,
+    render_cache_dir: str | None,
+    template: Template | None = None,
+) -> None:
+    global _worker_block_cache, _worker_render_cache, _worker_template
+    if block_cache_bytes is not None:
+        _worker_block_cache = BlockCache(block_cache_bytes)
+    if render_cache_dir is not None:
+        _worker_render_cache = RenderCache(render_cache_dir)
+    _worker_template = template
+
+
+def _cache_counters() -> tuple[int, int, int, int]:
+    block_cache, render_cache = _worker_block_cache, _worker_render_cache
+    return (
+        block_cache.hits if block_cache is not None else 0,
+        block_cache.misses if block_cache is not None else 0,
+        render_cache.hits if render_cache is not None else 0,
+        render_cache.misses if render_cache is not None else 0,
+    )
+
+
+def _add_cache_counters(
+    counters: tuple[int, int, int, int],
+    block_cache: BlockCache | None,
+    render_cache: RenderCache | None,
+) -> None:
+    """
+    Add the hits and misses a worker reported, see _cache_counters, to the
+    caches of the main process.
+    """
+    block_hits, block_misses, render_hits, render_misses = counters
+    if block_cache is not None:
+        block_cache.hits += block_hits
+        block_cache.misses += block_misses
+    if render_cache is not None:
+        render_cache.hits += render_hits
+        render_cache.misses += render_misses
+
+
+def _generate_page_job(
+    job: tuple[
+        str,
+        str,
+        str,
+        str,
+        bool,
+        Mapping[str, str] | None,
+        Mapping[str, str] | None,
+        bool,
+    ],
+) -> tuple[
+    str | None,
+    PageProfile | None,
+    tuple[int, int, int, int],
+    list[str] | None,
+    PageTerms | None,
+]:
+    """
+    Generate a single page in a worker process. Returns the error if it
+    failed, its profile, how much the block cache hits and misses and the
+    render cache hits and misses grew while generating it, its urls and
+    its terms.
+    """
+    (
+        from_path,
+        template_path,
+        dest_path,
+        base_path,
+        profiled,
+        assets,
+        images,
+        collect_terms,
+    ) = job
+    profile = PageProfile(from_path) if profiled else None
+    terms = PageTerms() if collect_terms else None
+    before = _cache_counters()
+    try:
+        urls = generate_page(
+            from_path,
+            template_path,
+            dest_path,
+            base_path,
+            profile,
+            _worker_block_cache,
+            _worker_render_cache,
+            assets,
+            images,
+            terms,
+        )
+    except Exception as e:
+        return f"{type(e).__name__}: {e}", None, (0, 0, 0, 0), None, None
+    after = _cache_counters()
+    counters = tuple(a - b for a, b in zip(after, before))
+    return None, profile, counters, urls, terms
+
+
+def read_source(from_path: str) -> str:
+    with open(from_path, mode="r") as f:
+        return f.read()
+
+
+def _read_small_source(from_path: str) -> str | None:
+    """
+    The markdown at from_path, None if it is too large to read as a whole
+    and is memory mapped by generate_page instead.
+    """
+    # NOTE: a missing source is left for read_source to report
+    try:
+        if os.path.getsize(from_path) >= MMAP_MIN_SIZE:
+            return None
+    except OSError:
+        pass
+    return read_source(from_path)
+
+
+def record_page(
+    source_file_path: str,
+    dest_file_path: str,
+    template_path: str,
+    urls: list[str],
+    terms: PageTerms | None,
+    dependency_graph: DependencyGraph | None = None,
+    search_terms: dict[str, PageTerms] | None = None,
+) -> None:
+    """
+    Record a generated page in the dependency_graph and its terms in
+    search_terms, unless it was read from the render cache and has none.
+    """
+    if dependency_graph is not None:
+        dependency_graph.add_page(dest_file_path, source_file_path, template_path, urls)
+    if search_terms is not None and terms is not None and terms.title is not None:
+        search_terms[source_file_path] = terms
+
+
+def _render_page(
+    markdown: str,
+    template: Template,
+    render_block: Callable[[str, BlockType | None], HTMLNode] | None = None,
+    render_cache: RenderCache | None = None,
+    terms: PageTerms | None = None,
+) -> tuple[str, list[str]]:
+    """
+    The page generate_page writes for markdown and the paths of the root
+    relative urls it references. With terms the title and the terms of the
+    page are added to it, unless it was read from the render_cache.
+    """
+    _, markdown = split_front_matter(markdown)
+    title = extract_title(markdown)
+    html = render_content(markdown, render_block, render_cache, terms)
+    page = template.render({"Title": title, "Content": html})
+    # NOTE: like for a cached page the urls are taken from the html, which
+    #       holds the same links and images the markdown was parsed into
+    return page, root_url_paths(html) + template.urls
+
+
+def generate_pages_pipelined(
+    pages: list[tuple[str, str]],
+    template_path: str,
+    base_path: str = "/",
+    io_workers: int = 4,
+    queue_size: int | None = None,
+    block_cache: BlockCache | None = None,
+    render_cache: RenderCache | None = None,
+    assets: Mapping[str, str] | None = None,
+    images: Mapping[str, str] | None = None,
+    dependency_graph: DependencyGraph | None = None,
+    search_terms: dict[str, PageTerms] | None = None,
+) -> None:
+    """
+    Generate every (source, destination) page in pages with the sources
+    read and the pages written by io_workers threads each while this thread
+    parses and renders, so waiting on the filesystem overlaps with parsing.
+    At most queue_size sources are read ahead and queue_size rendered pages
+    wait to be written, which caps the memory of the build. Every failing
+    page is reported and a PageGenerationError listing them is raised at
+    the end.
+    """
+    template = load_template(template_path, base_path, assets, images)
+    render_block = block_cache.render_block if block_cache is not None else None
+    queue_size = queue_size or io_workers * 2
+    failures = []
+
+    def fail(source_file_path: str, e: Exception) -> None:
+        error = f"{type(e).__name__}: {e}"
+        print(f"Failed to generate page from {source_file_path}: {error}")
+        failures.append((source_file_path, error))
+
+    def new_terms() -> PageTerms | None:
+        return PageTerms() if search_terms is not None else None
+
+    def finish_page(
+        source_file_path: str,
+        dest_file_path: str,
+        urls: list[str],
+        terms: PageTerms | None,
+    ) -> None:
+        record_page(
+            source_file_path,
+            dest_file_path,
+            template_path,
+            urls,
+            terms,
+            dependency_graph,
+            search_terms,
+        )
+
+    def finish_write(
+        write: tuple[str, str, list[str], PageTerms | None, Future],
+    ) -> None:
+        source_file_path, dest_file_path, urls, terms, future = write
+        try:
+            future.result()
+        except Exception as e:
+            fail(source_file_path, e)
+            return
+        finish_page(source_file_path, dest_file_path, urls, terms)
+
+    pending = iter(pages)
+    reads: deque[tuple[str, str, Future]] = deque()
+    writes: deque[tuple[str, str, list[str], PageTerms | None, Future]] = deque()
+    with (
+        ThreadPoolExecutor(max_workers=io_workers) as readers,
+        ThreadPoolExecutor(max_workers=io_workers) as writers,
+    ):
+        while True:
+            for source_file_path, dest_file_path in islice(
+                pending, queue_size - len(reads)
+            ):
+                future = readers.submit(_read_small_source, source_file_path)
+                reads.append((source_file_path, dest_file_path, future))
+            if not reads:
+                break
+            source_file_path, dest_file_path, future = reads.popleft()
+            terms = new_terms()
+            try:
+                markdown = future.result()
+            except Exception as e:
+                fail(source_file_path, e)
+                continue
+            if markdown is None:
+                # NOTE: huge sources are memory mapped by generate_page
+                #       instead of being read ahead as a whole
+                try:
+                    urls = generate_page(
+                        source_file_path,
+                        template_path,
+                        dest_file_path,
+                        base_path,
+                        block_cache=block_cache,
+                        assets=assets,
+                        images=images,
+                        terms=terms,
+                    )
+                except Exception as e:
+                    fail(source_file_path, e)
+                    continue
+                finish_page(source_file_path, dest_file_path, urls, terms)
+                continue
+            print(
+                f"Generating page from {source_file_path} to {dest_file_path} "
+                f"using {template_path}"
+            )
+            try:
+                page, urls = _render_page(
+                    markdown, template, render_block, render_cache, terms
+                )
+            except Exception as e:
+                fail(source_file_path, e)
+                continue
+            future = writers.submit(write_page, dest_file_path, lambda w, p=page: w(p))
+            writes.append((source_file_path, dest_file_path, urls, terms, future))
+            if len(writes) > queue_size:
+                finish_write(writes.popleft())
+        while writes:
+            finish_write(writes.popleft())
+    if failures:
+        raise PageGenerationError(failures)
+    return
+
+
+def generate_pages(
+    pages: list[tuple[str, str]],
+    template_path: str,
+    base_path: str = "/",
+    jobs: int = 1,
+    build_profile: BuildProfile | None = None,
+    block_cache: BlockCache | None = None,
+    render_cache: RenderCache | None = None,
+    assets: Mapping[str, str] | None = None,
+    images: Mapping[str, str] | None = None,
+    dependency_graph: DependencyGraph | None = None,
+    io_workers: int = 0,
+    search_terms: dict[str, PageTerms] | None = None,
+) -> None:
+    """
+    Generate every (source, destination) page in pages. With jobs > 1 the
+    pages are spread across a pool of worker processes, every failing page
+    is reported and a PageGenerationError listing them is raised at the end.
+    With a build_profile the stages of every page are timed and added to it.
+    With a block_cache rendered blocks are reused across pages, worker
+    processes each get a cache of the same size and report their hits and
+    misses back to it. With a render_cache the html of unchanged sources is
+    read back from disk instead of being rendered again. References to the
+    asset paths in assets point at their fingerprinted paths instead. With
+    images every img tag is loaded lazily and gets the attributes of its src.
+    Every generated page is recorded in the dependency_graph and with
+    search_terms its title and terms are stored there by source, except for
+    pages read from the render_cache. With io_workers > 0 a build with a
+    single job reads and writes pages on that many threads while parsing,
+    see generate_pages_pipelined.
+    """
+    # NOTE: the profile times every stage of a page on its own, overlapping
+    #       them would only blur it
+    if io_workers > 0 and jobs <= 1 and build_profile is None and len(pages) > 1:
+        generate_pages_pipelined(
+            pages,
+            template_path,
+            base_path,
+            io_workers,
+            block_cache=block_cache,
+            render_cache=render_cache,
+            assets=assets,
+            images=images,
+            dependency_graph=dependency_graph,
+            search_terms=search_terms,
+        )
+        return
+    if jobs <= 1 or len(pages) <= 1:
+        for source_file_path, dest_file_path in pages:
+            profile = None
+            if build_profile is not None:
+                profile = PageProfile(source_file_path)
+            terms = PageTerms() if search_terms is not None else None
+            urls = generate_page(
+                source_file_path,
+                template_path,
+                dest_file_path,
+                base_path,
+                profile,
+                block_cache,
+                render_cache,
+                assets,
+                images,
+                terms,
+            )
+            if profile is not None:
+                build_profile.add(profile)
+            record_page(
+                source_file_path,
+                dest_file_path,
+                template_path,
+                urls,
+                terms,
+                dependency_graph,
+                search_terms,
+            )
+        return
+
+    profiled = build_profile is not None
+    collect_terms = search_terms is not None
+    page_jobs = [
+        (
+            source,
+            template_path,
+            dest,
+            base_path,
+            profiled,
+            assets,
+            images,
+            collect_terms,
+        )
+        for source, dest in pages
+    ]
+    chunksize = max(1, len(page_jobs) // (jobs * 4))
+    block_cache_bytes = block_cache.max_bytes if block_cache is not None else None
+    render_cache_dir = render_cache.directory if render_cache is not None else None
+    failures = []
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(block_cache_bytes, render_cache_dir),
+    ) as executor:
+        results = executor.map(_generate_page_job, page_jobs, chunksize=chunksize)
+        for (source_file_path, dest_file_path), result in zip(pages, results):
+            error, profile, counters, urls, terms = result
+            if error is not None:
+                print(f"Failed to generate page from {source_file_path}: {error}")
+                failures.append((source_file_path, error))
+                continue
+            if profile is not None:
+                build_profile.add(profile)
+            _add_cache_counters(counters, block_cache, render_cache)
+            record_page(
+                source_file_path,
+                dest_file_path,
+                template_path,
+                urls,
+                terms,
+                dependency_graph,
+                search_terms,
+            )
+    if failures:
+        raise PageGenerationError(failures)
+    return
+
+
+def new_build_manifest(
+    template_path: str,
+    base_path: str,
+    assets: Mapping[str, str] | None = None,
+    images: Mapping[str, str] | None = None,
+) -> BuildManifest:
+    """
+    Manifest of a build with the template at template_path, base_path and
+    the url rewrites of assets and images, without any pages yet.
+    """
+    rewrites = {
+        "assets": dict(assets) if assets else {},
+        "images": dict(images) if images is not None else None,
+    }
+    return BuildManifest(hash_file(template_path), base_path, rewrites=rewrites)
+
+
+def generate_pages_recursively(
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    base_path: str = "/",
+    jobs: int = 1,
+    build_profile: BuildProfile | None = None,
+    block_cache: BlockCache | None = None,
+    render_cache: RenderCache | None = None,
+    assets: Mapping[str, str] | None = None,
+    images: Mapping[str, str] | None = None,
+    dependency_graph: DependencyGraph | None = None,
+    io_workers: int = 0,
+    manifest_path: str | None = None,
+    search_terms: dict[str, PageTerms] | None = None,
+) -> None:
+    """
+    Generate every page below dir_path_content. With a manifest_path the
+    build is recorded there like an incremental build would record it, so
+    the next incremental build knows which of the pages are current.
+    """
+    pages = find_pages(dir_path_content, dest_dir_path)
+    manifest = None
+    if manifest_path is not None:
+        # NOTE: every output is about to be overwritten, a manifest left behind
+        #       would tell the next incremental build the old ones are current
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        manifest = new_build_manifest(template_path, base_path, assets, images)
+        for source_file_path, dest_file_path in pages:
+            manifest.add_page(
+                source_file_path, hash_file(source_file_path), dest_file_path
+            )
+    try:
+        generate_pages(
+            pages,
+            template_path,
+            base_path,
+            jobs,
+            build_profile,
+            block_cache,
+            render_cache,
+            assets,
+            images,
+            dependency_graph,
+            io_workers,
+            search_terms,
+        )
+    except PageGenerationError as e:
+        if manifest is not None:
+            for source_file_path, _ in e.failures:
+                manifest.pages.pop(source_file_path)
+            manifest.save(manifest_path)
+        raise
+    if manifest is not None:
+        manifest.save(manifest_path)
+    if dependency_graph is not None:
+        dependency_graph.retain({dest_file_path for _, dest_file_path in pages})
+    return
+
+
+def generate_pages_incrementally(
+    dir_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    base_path: str = "/",
+    manifest_path: str = DEFAULT_MANIFEST_PATH,
+    jobs: int = 1,
+    build_profile: BuildProfile | None = None,
+    block_cache: BlockCache | None = None,
+    render_cache: RenderCache | None = None,
+    assets: Mapping[str, str] | None = None,
+    images: Mapping[str, str] | None = None,
+    dependency_graph: DependencyGraph | None = None,
+    io_workers: int = 0,
+    search_terms: dict[str, PageTerms] | None = None,
+) -> None:
+    """
+    Only regenerate the pages whose markdown source changed since the build
+    recorded in the manifest at manifest_path and delete the outputs of
+    sources that were removed. A changed template or base_path invalidates
+    every page. A changed fingerprint or image attributes of a url only
+    invalidates the pages referencing it according to the dependency_graph
+    of the previous build, without a graph it invalidates every page.
+    """
+    previous = BuildManifest.load(manifest_path)
+    manifest = new_build_manifest(template_path, base_path, assets, images)
+    rebuild_all = (
+        previous.template_hash != manifest.template_hash
+        or previous.base_path != manifest.base_path
+        or (previous.rewrites.get("images") is None) != (images is None)
+    )
+    changed_urls = changed_rewrites(previous.rewrites, manifest.rewrites)
+    affected_pages = set()
+    if changed_urls and dependency_graph is None:
+        rebuild_all = True
+    elif changed_urls:
+        affected_pages = dependency_graph.referencing(changed_urls)
+
+    outdated_pages = []
+    for source_file_path, dest_file_path in find_pages(dir_path_content, dest_dir_path):
+        source_hash = hash_file(source_file_path)
+        if (
+            rebuild_all
+            or dest_file_path in affected_pages
+            or not previous.is_page_current(
+                source_file_path, source_hash, dest_file_path
+            )
+            or (
+                dependency_graph is not None
+                and dest_file_path not in dependency_graph.pages
+            )
+        ):
+            outdated_pages.append((source_file_path, dest_file_path))
+        manifest.add_page(source_file_path, source_hash, dest_file_path)
+
+    try:
+        generate_pages(
+            outdated_pages,
+            template_path,
+            base_path,
+            jobs,
+            build_profile,
+            block_cache,
+            render_cache,
+            assets,
+            images,
+            dependency_graph,
+            io_workers,
+            search_terms,
+        )
+    except PageGenerationError as e:
+        # NOTE: keep the pages that did succeed, the failed ones are retried next build
+        for source_file_path, _ in e.failures:
+            dest_file_path = manifest.pages.pop(source_file_path)["dest"]
+            if dependency_graph is not None:
+                dependency_graph.pages.pop(dest_file_path, None)
+        manifest.save(manifest_path)
+        raise
+
+    current_dests = {entry["dest"] for entry in manifest.pages.values()}
+    for source_file_path, entry in previous.pages.items():
+        if source_file_path in manifest.pages or entry["dest"] in current_dests:
+            continue
+        remove_page(entry["dest"], dest_dir_path)
+
+    if dependency_graph is not None:
+        dependency_graph.retain(current_dests)
+    manifest.save(manifest_path)
     return
+
+
+def changed_rewrites(
+    previous: dict[str, dict[str, str] | None],
+    current: dict[str, dict[str, str] | None],
+) -> set[str]:
+    """
+    Url paths whose fingerprinted path or image attributes differ between
+    the rewrites of two builds.
+    """
+    changed = set()
+    for kind in ("assets", "images"):
+        before = previous.get(kind) or {}
+        after = current.get(kind) or {}
+        for url in before.keys() | after.keys():
+            if before.get(url) != after.get(url):
+                changed.add(url)
+    return changed
+
+
+def remove_page(dest_path: str, dest_dir_path: str) -> None:
+    """
+    Delete a generated page and prune the directories it leaves empty,
+    never going above dest_dir_path.
+    """
+    if not os.path.exists(dest_path):
+        return
+    print(f"Removing stale page {dest_path}")
+    os.remove(dest_path)
+    root = os.path.abspath(dest_dir_path)
+    directory = os.path.dirname(os.path.abspath(dest_path))
+    while (
+        directory != root and directory.startswith(root) and not os.listdir(directory)
+    ):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+    return
+
+
+def render_markdown(
+    markdown: str,
+    template: Template | None = None,
+    render_block: Callable[[str, BlockType | None], HTMLNode] | None = None,
+    render_cache: RenderCache | None = None,
+) -> tuple[str, str]:
+    """
+    Title and html of markdown held in memory, the html is the filled in
+    template or without a template just the rendered content.
+    """
+    _, markdown = split_front_matter(markdown)
+    title = extract_title(markdown)
+    html = render_content(markdown, render_block, render_cache)
+    if template is not None:
+        html = template.render({"Title": title, "Content": html})
+    return title, html
+
+
+def _render_batch(
+    documents: list[tuple[str, str]],
+) -> tuple[list[tuple[str, str | None, str]], tuple[int, int, int, int]]:
+    """
+    Render documents in a worker process. Returns (path, title, html) of
+    every document, or (path, None, error) if it failed, and how much the
+    cache counters grew.
+    """
+    render_block = None
+    if _worker_block_cache is not None:
+        render_block = _worker_block_cache.render_block
+    before = _cache_counters()
+    results = []
+    for path, markdown in documents:
+        try:
+            title, html = render_markdown(
+                markdown, _worker_template, render_block, _worker_render_cache
+            )
+        except Exception as e:
+            results.append((path, None, f"{type(e).__name__}: {e}"))
+            continue
+        results.append((path, title, html))
+    after = _cache_counters()
+    return results, tuple(a - b for a, b in zip(after, before))
+
+
+class Renderer:
+    """
+    Render many markdown documents held in memory without touching the
+    filesystem. The compiled template, the caches and with jobs > 1 the pool
+    of worker processes are kept for every batch until the renderer is
+    closed, use it as a context manager.
+    """
+
+    def __init__(
+        self,
+        template: Template | None = None,
+        jobs: int = 1,
+        block_cache: BlockCache | None = None,
+        render_cache: RenderCache | None = None,
+        batch_size: int = 64,
+    ) -> None:
+        self.template = template
+        self.jobs = jobs
+        self.block_cache = block_cache
+        self.render_cache = render_cache
+        self.batch_size = batch_size
+        self.executor: ProcessPoolExecutor | None = None
+
+    def render(self, markdown: str) -> tuple[str, str]:
+        render_block = None
+        if self.block_cache is not None:
+            render_block = self.block_cache.render_block
+        return render_markdown(markdown, self.template, render_block, self.render_cache)
+
+    def render_many(
+        self, documents: Iterable[tuple[str, str]]
+    ) -> Iterator[tuple[str, str, str]]:
+        """
+        Stream (path, title, html) for every (path, markdown) in documents,
+        in order. Failing documents are reported and a PageGenerationError
+        listing them is raised once the rest of the batch is done.
+        """
+        failures = []
+        if self.jobs <= 1:
+            for path, markdown in documents:
+                try:
+                    title, html = self.render(markdown)
+                except Exception as e:
+                    failures.append((path, f"{type(e).__name__}: {e}"))
+                    continue
+                yield path, title, html
+        else:
+            for path, title, html in self._render_in_workers(documents):
+                if title is None:
+                    failures.append((path, html))
+                    continue
+                yield path, title, html
+        if failures:
+            for path, error in failures:
+                print(f"Failed to render {path}: {error}")
+            raise PageGenerationError(failures)
+
+    def _render_in_workers(
+        self, documents: Iterable[tuple[str, str]]
+    ) -> Iterator[tuple[str, str | None, str]]:
+        if self.executor is None:
+            block_cache_bytes = None
+            if self.block_cache is not None:
+                block_cache_bytes = self.block_cache.max_bytes
+            render_cache_dir = None
+            if self.render_cache is not None:
+                render_cache_dir = self.render_cache.directory
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.jobs,
+                initializer=_init_worker,
+                initargs=(block_cache_bytes, render_cache_dir, self.template),
+            )
+
+        # NOTE: documents are handed out in batches to amortize the pickling,
+        #       and only a few batches per worker are in flight at once so a
+        #       huge or endless iterable is never read into memory as a whole
+        documents = iter(documents)
+        pending: deque[Future] = deque()
+        while True:
+            while len(pending) < self.jobs * 2:
+                batch = list(islice(documents, self.batch_size))
+                if not batch:
+                    break
+                pending.append(self.executor.submit(_render_batch, batch))
+            if not pending:
+                return
+            results, counters = pending.popleft().result()
+            _add_cache_counters(counters, self.block_cache, self.render_cache)
+            yield from results
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self) -> "Renderer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def render_many(
+    documents: Iterable[tuple[str, str]],
+    template: Template | None = None,
+    jobs: int = 1,
+    block_cache: BlockCache | None = None,
+    render_cache: RenderCache | None = None,
+) -> Iterator[tuple[str, str, str]]:
+    """
+    Stream (path, title, html) for every (path, markdown) in documents, see
+    Renderer.render_many. To reuse the worker pool across several batches
+    use a Renderer directly.
+    """
+    with Renderer(template, jobs, block_cache, render_cache) as renderer:
+        yield from renderer.render_many(documents)
@@ -1,7 +1,11 @@
-from typing import Sequence, override
+from typing import Callable, Sequence, override
 
 
 class HTMLNode:
+    # NOTE: a page creates tens of thousands of nodes, slots keep them
+    #       free of a per instance __dict__
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(
         self,
         tag: str | None = None,
@@ -14,16 +18,22 @@ class HTMLNode:
         self.children = children
         self.props = props
 
-    def to_html(self):
+    def to_html(self) -> str:
+        chunks: list[str] = []
+        self.write_html(chunks.append)
+        return "".join(chunks)
+
+    def write_html(self, write: Callable[[str], object]) -> None:
+        """
+        Serialize the node in a single pass by handing every chunk of html
+        to write, e.g. a list's append or a file's write.
+        """
         raise NotImplementedError("to_html method not implemented")
 
     def props_to_html(self):
-        html_string = ""
         if not self.props:
-            return html_string
-        for attrib, value in self.props.items():
-            html_string += f' {attrib}="{value}"'
-        return html_string
+            return ""
+        return "".join(f' {attrib}="{value}"' for attrib, value in self.props.items())
 
     def __eq__(self, other):
         return (
@@ -38,6 +48,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self, tag: str | None, value: str, props: dict[str, str] | None = None
     ) -> None:
@@ -51,11 +63,16 @@ class LeafNode(HTMLNode):
 
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
+    def write_html(self, write: Callable[[str], object]) -> None:
+        write(self.to_html())
+
     def __repr__(self):
         return f"LeafNode(tag: {self.tag}, value: {self.value}, props: {self.props})"
 
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(
         self,
         tag: str,
@@ -64,16 +81,16 @@ class ParentNode(HTMLNode):
     ) -> None:
         super().__init__(tag, None, children, props)
 
-    def to_html(self):
+    def write_html(self, write: Callable[[str], object]) -> None:
         if not self.tag:
             raise ValueError("Parent node must have a tag.")
         if not self.children:
             raise ValueError("Parent node doesn't have any children")
 
-        child_html = ""
+        write(f"<{self.tag}{self.props_to_html()}>")
         for child in self.children:
-            child_html += child.to_html()
-        return f"<{self.tag}{self.props_to_html()}>{child_html}</{self.tag}>"
+            child.write_html(write)
+        write(f"</{self.tag}>")
 
     def __repr__(self):
         return f"ParentNode(tag: {self.tag}, children: {self.children}, props: {self.props})"
@@ -0,0 +1,247 @@
+import json
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from build_manifest import hash_file
+from dump_files import scan_tree
+
+# NOTE: Pillow is optional, without it images get their dimensions and lazy
+#       loading but no downscaled variants
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+DEFAULT_IMAGE_INDEX_PATH = os.path.join(".flowery-cache", "images.json")
+IMAGE_INDEX_VERSION = 1
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# NOTE: every start of frame marker except DHT (C4), JPG (C8) and DAC (CC)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7}
+JPEG_SOF_MARKERS |= {0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def read_image_size(path: str) -> tuple[int, int] | None:
+    """
+    Width and height of a PNG or JPEG image read from its header, None for
+    anything else.
+    """
+    with open(path, mode="rb") as f:
+        head = f.read(24)
+        if head.startswith(PNG_SIGNATURE) and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if not head.startswith(b"\xff\xd8"):
+            return None
+        # NOTE: walk the segments up to the first start of frame header
+        f.seek(2)
+        while True:
+            marker = f.read(2)
+            if len(marker) < 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] == 0xFF:
+                f.seek(-1, os.SEEK_CUR)
+                continue
+            if marker[1] in (0x01, *range(0xD0, 0xD8)):
+                continue
+            length = f.read(2)
+            if len(length) < 2:
+                return None
+            if marker[1] in JPEG_SOF_MARKERS:
+                frame = f.read(5)
+                if len(frame) < 5:
+                    return None
+                height, width = struct.unpack(">HH", frame[1:5])
+                return width, height
+            f.seek(struct.unpack(">H", length)[0] - 2, os.SEEK_CUR)
+
+
+def variant_path(path: str, digest: str, width: int) -> str:
+    """
+    images/tom.png => images/tom.<content hash>.480w.png, the hash makes an
+    existing variant always current.
+    """
+    root, extension = os.path.splitext(path)
+    return f"{root}.{digest[:10]}.{width}w{extension}"
+
+
+class ImageIndex:
+    """
+    Content hash of every image in the static directory, by path and the
+    size and mtime it was computed for, and the dimensions of every image,
+    by content hash.
+    """
+
+    def __init__(
+        self,
+        files: dict[str, dict] | None = None,
+        images: dict[str, dict] | None = None,
+    ) -> None:
+        self.files = files if files is not None else {}
+        self.images = images if images is not None else {}
+
+    def current_hash(self, path: str, stat: os.stat_result) -> str | None:
+        entry = self.files.get(path)
+        if (
+            entry is None
+            or entry["size"] != stat.st_size
+            or entry["mtime_ns"] != stat.st_mtime_ns
+        ):
+            return None
+        return entry["hash"]
+
+    def variant_widths(self, digest: str, widths: list[int]) -> list[int]:
+        """
+        The widths out of widths an image is downscaled to, never upscaled.
+        """
+        image = self.images[digest]
+        if image is None:
+            return []
+        return sorted(width for width in set(widths) if width < image["width"])
+
+    def variants(self, widths: list[int]) -> list[tuple[str, str, int]]:
+        """
+        (path, variant path, width) of every downscaled variant.
+        """
+        return [
+            (path, variant_path(path, entry["hash"], width), width)
+            for path, entry in sorted(self.files.items())
+            for width in self.variant_widths(entry["hash"], widths)
+        ]
+
+    def attributes(
+        self, base_path: str = "/", widths: list[int] | None = None
+    ) -> dict[str, str]:
+        """
+        Url path of every image => the attributes its img tags get: the
+        dimensions and with widths a srcset of the downscaled variants.
+        """
+        attributes = {}
+        for path, entry in self.files.items():
+            image = self.images[entry["hash"]]
+            if image is None:
+                continue
+            url = path.replace(os.sep, "/")
+            attribute = f' width="{image["width"]}" height="{image["height"]}"'
+            variant_widths = self.variant_widths(entry["hash"], widths or [])
+            if variant_widths:
+                candidates = [
+                    f"{base_path}{variant_path(url, entry['hash'], width)} {width}w"
+                    for width in variant_widths
+                ]
+                candidates.append(f"{base_path}{url} {image['width']}w")
+                attribute += f' srcset="{", ".join(candidates)}"'
+            attributes[url] = attribute
+        return attributes
+
+    def to_dict(self) -> dict:
+        return {
+            "version": IMAGE_INDEX_VERSION,
+            "files": self.files,
+            "images": self.images,
+        }
+
+    @classmethod
+    def load(cls, path: str) -> "ImageIndex":
+        # NOTE: without a usable index every image just gets read again
+        try:
+            with open(path, mode="r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict) or data.get("version") != IMAGE_INDEX_VERSION:
+            return cls()
+        return cls(data.get("files"), data.get("images"))
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def __eq__(self, other):
+        return self.files == other.files and self.images == other.images
+
+    def __repr__(self):
+        return f"ImageIndex(files: {self.files}, images: {self.images})"
+
+
+def index_images(source_dir: str, previous: ImageIndex | None = None) -> ImageIndex:
+    """
+    Index every PNG and JPEG image in source_dir. Images whose size and
+    mtime, or failing that whose content hash, are known from previous are
+    not read again.
+    """
+    previous = previous or ImageIndex()
+    index = ImageIndex()
+    for relative_path, stat in sorted(scan_tree(source_dir).items()):
+        if not relative_path.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        path = os.path.join(source_dir, relative_path)
+        digest = previous.current_hash(relative_path, stat)
+        if digest is None:
+            digest = hash_file(path)
+        index.files[relative_path] = {
+            "hash": digest,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+        if digest in index.images:
+            continue
+        if digest in previous.images:
+            index.images[digest] = previous.images[digest]
+            continue
+        size = read_image_size(path)
+        index.images[digest] = (
+            {"width": size[0], "height": size[1]} if size is not None else None
+        )
+    return index
+
+
+def resize_image(from_path: str, to_path: str, width: int) -> None:
+    if Image is None:
+        raise ValueError("downscaling images needs the Pillow package")
+    with Image.open(from_path) as image:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        tmp_path = f"{to_path}.tmp"
+        try:
+            resized.save(tmp_path, format=image.format)
+            os.replace(tmp_path, to_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def write_variants(
+    index: ImageIndex,
+    source_dir: str,
+    dest_dir: str,
+    widths: list[int],
+    workers: int = 8,
+) -> int:
+    """
+    Downscale every image in index to widths into dest_dir, fanned out to a
+    pool of at most workers threads, skipping variants that already exist.
+    Returns the number of variants written.
+    """
+    jobs = [
+        (os.path.join(source_dir, path), os.path.join(dest_dir, variant), width)
+        for path, variant, width in index.variants(widths)
+        if not os.path.exists(os.path.join(dest_dir, variant))
+    ]
+    for directory in sorted({os.path.dirname(to_path) for _, to_path, _ in jobs}):
+        os.makedirs(directory, exist_ok=True)
+
+    def resize(job: tuple[str, str, int]) -> None:
+        resize_image(*job)
+
+    if workers <= 1 or len(jobs) <= 1:
+        list(map(resize, jobs))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(resize, jobs))
+    return len(jobs)
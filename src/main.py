@@ -1,17 +1,503 @@
+import argparse
+import os
 import sys
-from dump_files import move_and_update_all_files
-from generate_page import generate_pages_recursively
+from contextlib import ExitStack
+from block_cache import BlockCache
+from build_manifest import DEFAULT_MANIFEST_PATH
+from blog import (
+    BLOG_SECTION,
+    DEFAULT_BLOG_MANIFEST_PATH,
+    DEFAULT_FEED_SIZE,
+    DEFAULT_FEED_TITLE,
+    DEFAULT_PAGE_SIZE,
+    FEED_NAME,
+    BlogManifest,
+    blog_pages,
+    feed_items,
+    write_blog,
+)
+from dependency_graph import DEFAULT_GRAPH_PATH, DependencyGraph
+from devserver import SiteRebuilder, serve
+from dump_files import scan_tree, sync_files
+from fingerprint import (
+    ASSET_MANIFEST_NAME,
+    AssetManifest,
+    fingerprint_assets,
+    write_fingerprinted_files,
+)
+from images import (
+    DEFAULT_IMAGE_INDEX_PATH,
+    Image,
+    ImageIndex,
+    index_images,
+    write_variants,
+)
+from generate_page import (
+    find_pages,
+    generate_pages_incrementally,
+    generate_pages_recursively,
+    page_outputs,
+)
+from metadata_index import (
+    DEFAULT_METADATA_INDEX_PATH,
+    METADATA_NAME,
+    MetadataIndex,
+    index_metadata,
+    write_public_index,
+)
+from precompress import (
+    FORMATS,
+    available_formats,
+    compressed_variants,
+    precompress_tree,
+)
+from profiling import BuildProfile, cprofile_to, format_bytes, tracemalloc_report
+from render_cache import DEFAULT_RENDER_CACHE_DIR, RenderCache
+from search_index import (
+    DEFAULT_SEARCH_CACHE_PATH,
+    SEARCH_DIR,
+    SearchIndex,
+    index_pages,
+    write_index_files,
+)
 
 
-def main():
+def build_site(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(description="flowery-press static site generator")
+    parser.add_argument("base_path", nargs="?", default="/")
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="keep the output directory and only regenerate pages whose inputs changed",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="number of worker processes generating pages, 0 uses every core",
+    )
+    parser.add_argument(
+        "--io-workers",
+        type=int,
+        default=0,
+        help="number of threads reading and writing pages while they are parsed, "
+        "overlaps file I/O with parsing in builds with a single job",
+    )
+    parser.add_argument(
+        "--checksum",
+        action="store_true",
+        help="compare static files by contents when their mtime differs",
+    )
+    parser.add_argument(
+        "--link-assets",
+        action="store_true",
+        help="hard link static files into the output instead of copying them",
+    )
+    parser.add_argument(
+        "--fingerprint-assets",
+        action="store_true",
+        help="add content hashes to the names of static assets referenced by pages",
+    )
+    parser.add_argument(
+        "--images",
+        action="store_true",
+        help="add the dimensions of images from static and lazy loading to img tags",
+    )
+    parser.add_argument(
+        "--image-widths",
+        type=lambda value: [int(width) for width in value.split(",")],
+        default=[],
+        help="comma separated widths of downscaled variants listed in a srcset "
+        "(needs the Pillow package), implies --images",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="write a sharded full-text search index of every page into search/",
+    )
+    parser.add_argument(
+        "--metadata-index",
+        action="store_true",
+        help="write the front matter and title of every page to metadata.json",
+    )
+    parser.add_argument(
+        "--blog",
+        action="store_true",
+        help="generate paginated listings of the posts in content/blog and of "
+        "every tag from their front matter",
+    )
+    parser.add_argument("--blog-page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    parser.add_argument(
+        "--site-url",
+        help="absolute url of the site, e.g. https://example.com, with --blog "
+        "an Atom feed of the newest posts is written to blog/atom.xml",
+    )
+    parser.add_argument("--feed-size", type=int, default=DEFAULT_FEED_SIZE)
+    parser.add_argument("--feed-title", default=DEFAULT_FEED_TITLE)
+    parser.add_argument(
+        "--feed-author",
+        help="author of the Atom feed, the host of --site-url by default",
+    )
+    parser.add_argument(
+        "--copy-workers",
+        type=int,
+        default=8,
+        help="number of threads copying static files",
+    )
+    parser.add_argument(
+        "--block-cache-mb",
+        type=float,
+        default=64,
+        help="megabytes of blocks repeated across pages to reuse, per worker, "
+        "0 disables it",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="append",
+        choices=list(FORMATS),
+        help="write compressed siblings of html, css, ... files for the file server, "
+        "can be given multiple times (br needs the brotli package)",
+    )
+    parser.add_argument(
+        "--compress-workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of threads writing compressed files",
+    )
+    parser.add_argument(
+        "--render-cache",
+        action="store_true",
+        help="keep the rendered html of every page on disk and reuse it across builds",
+    )
+    parser.add_argument(
+        "--render-cache-dir",
+        default=DEFAULT_RENDER_CACHE_DIR,
+        help="directory of the render cache, can be shared between builds and machines",
+    )
+    parser.add_argument(
+        "--render-cache-max-mb",
+        type=float,
+        help="evict the least recently used render cache entries beyond this size",
+    )
+    parser.add_argument(
+        "--render-cache-max-age-days",
+        type=float,
+        help="evict render cache entries not used for this many days",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time every stage of every page and print a summary at the end",
+    )
+    parser.add_argument(
+        "--profile-slowest",
+        type=int,
+        default=10,
+        help="number of slowest pages listed in the profile summary",
+    )
+    parser.add_argument(
+        "--cprofile", metavar="FILE", help="dump cProfile stats of the build to FILE"
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="print the top allocation sites of the build",
+    )
+    args = parser.parse_args(argv)
+    formats = sorted(set(args.precompress or []))
+    for format in formats:
+        if format not in available_formats():
+            parser.error(f"{format} compression is not available, install its package")
+    if args.image_widths and Image is None:
+        parser.error("--image-widths needs the Pillow package")
+    jobs = args.jobs if args.jobs > 0 else os.cpu_count() or 1
+    build_profile = BuildProfile() if args.profile else None
+    block_cache = None
+    if args.block_cache_mb > 0:
+        block_cache = BlockCache(int(args.block_cache_mb * 1024 * 1024))
+    render_cache = None
+    if args.render_cache:
+        render_cache = RenderCache(args.render_cache_dir)
+
     dir_to_build = "docs"
-    move_and_update_all_files("static", dir_to_build)
-    # generate_page("content/index.md", "template.html", "public/index.html")
-    if len(sys.argv) >= 2:
-        base_path = sys.argv[1]
-        generate_pages_recursively("content", "template.html", dir_to_build, base_path)
+    with ExitStack() as stack:
+        if args.cprofile:
+            stack.enter_context(cprofile_to(args.cprofile))
+        if args.tracemalloc:
+            stack.enter_context(tracemalloc_report())
+
+        content_pages = page_outputs("content", dir_to_build)
+        keep = set(content_pages)
+        asset_manifest = None
+        if args.fingerprint_assets:
+            asset_manifest_path = os.path.join(dir_to_build, ASSET_MANIFEST_NAME)
+            asset_manifest = fingerprint_assets(
+                "static", AssetManifest.load(asset_manifest_path)
+            )
+            keep.add(ASSET_MANIFEST_NAME)
+            keep |= {entry["path"] for entry in asset_manifest.assets.values()}
+        image_index = None
+        if args.images or args.image_widths:
+            image_index = index_images(
+                "static", ImageIndex.load(DEFAULT_IMAGE_INDEX_PATH)
+            )
+            variants = image_index.variants(args.image_widths)
+            keep |= {variant for _, variant, _ in variants}
+        metadata_index = None
+        if args.metadata_index or args.blog:
+            metadata_index, headers_read = index_metadata(
+                find_pages("content", dir_to_build),
+                dir_to_build,
+                args.base_path,
+                MetadataIndex.load(DEFAULT_METADATA_INDEX_PATH),
+            )
+            if args.metadata_index:
+                keep.add(METADATA_NAME)
+        listings = None
+        if args.blog:
+            listings = blog_pages(
+                metadata_index,
+                "content",
+                dir_to_build,
+                page_size=args.blog_page_size,
+            )
+            keep |= listings.keys()
+            feed = None
+            if args.site_url:
+                feed = feed_items(
+                    metadata_index, "content", dir_to_build, feed_size=args.feed_size
+                )
+                keep.add(os.path.join(BLOG_SECTION, FEED_NAME))
+        search_terms = None
+        if args.search_index:
+            # NOTE: the index is built from the terms the build collects, the
+            #       shards it no longer needs are removed once it is written
+            search_terms = {}
+            search_dir = os.path.join(dir_to_build, SEARCH_DIR)
+            keep |= {os.path.join(SEARCH_DIR, path) for path in scan_tree(search_dir)}
+        if formats:
+            # NOTE: compressed siblings of current pages and static files survive
+            #       the sync, the ones of removed files get deleted with them
+            keep |= compressed_variants(keep | scan_tree("static").keys(), formats)
+        stats = sync_files(
+            "static",
+            dir_to_build,
+            keep=keep,
+            checksum=args.checksum,
+            link=args.link_assets,
+            workers=args.copy_workers,
+        )
+        copied = format_bytes(stats.bytes_copied)
+        throughput = format_bytes(int(stats.throughput()))
+        print(
+            f"Synced static to {dir_to_build}: {stats.copied} copied "
+            f"({copied} at {throughput}/s), {stats.linked} linked, "
+            f"{stats.removed} removed, {stats.unchanged} unchanged"
+        )
+        images = None
+        if image_index is not None:
+            written = write_variants(
+                image_index,
+                "static",
+                dir_to_build,
+                args.image_widths,
+                workers=args.copy_workers,
+            )
+            image_index.save(DEFAULT_IMAGE_INDEX_PATH)
+            images = image_index.attributes(args.base_path, args.image_widths)
+            print(
+                f"Indexed {len(image_index.files)} images, {written} variants written"
+            )
+        assets = None
+        if asset_manifest is not None:
+            written = write_fingerprinted_files(dir_to_build, asset_manifest)
+            asset_manifest.save(asset_manifest_path)
+            assets = asset_manifest.urls()
+            print(
+                f"Fingerprinted {len(asset_manifest.assets)} assets, {written} written"
+            )
+        # generate_page("content/index.md", "template.html", "public/index.html")
+        dependency_graph = DependencyGraph.load(DEFAULT_GRAPH_PATH, "static")
+        try:
+            if args.incremental:
+                generate_pages_incrementally(
+                    "content",
+                    "template.html",
+                    dir_to_build,
+                    args.base_path,
+                    jobs=jobs,
+                    build_profile=build_profile,
+                    block_cache=block_cache,
+                    render_cache=render_cache,
+                    assets=assets,
+                    images=images,
+                    dependency_graph=dependency_graph,
+                    io_workers=args.io_workers,
+                    search_terms=search_terms,
+                )
+            else:
+                generate_pages_recursively(
+                    "content",
+                    "template.html",
+                    dir_to_build,
+                    args.base_path,
+                    jobs=jobs,
+                    build_profile=build_profile,
+                    block_cache=block_cache,
+                    render_cache=render_cache,
+                    assets=assets,
+                    images=images,
+                    dependency_graph=dependency_graph,
+                    io_workers=args.io_workers,
+                    manifest_path=DEFAULT_MANIFEST_PATH,
+                    search_terms=search_terms,
+                )
+        finally:
+            # NOTE: pages generated before a failure are recorded all the same
+            dependency_graph.save(DEFAULT_GRAPH_PATH)
+        if metadata_index is not None:
+            if args.metadata_index:
+                write_public_index(dir_to_build, metadata_index)
+            metadata_index.save(DEFAULT_METADATA_INDEX_PATH)
+            print(
+                f"Indexed metadata of {len(metadata_index.pages)} pages, "
+                f"{headers_read} headers read"
+            )
+        if listings is not None:
+            blog_manifest, written = write_blog(
+                listings,
+                dir_to_build,
+                "template.html",
+                args.base_path,
+                assets,
+                images,
+                feed,
+                args.site_url or "",
+                previous=BlogManifest.load(DEFAULT_BLOG_MANIFEST_PATH),
+                content_pages=content_pages,
+                feed_title=args.feed_title,
+                feed_author=args.feed_author,
+            )
+            blog_manifest.save(DEFAULT_BLOG_MANIFEST_PATH)
+            listed = len(listings.keys() - content_pages)
+            print(f"Generated {listed} blog listings, {written} files written")
+        if search_terms is not None:
+            search_index, tokenized = index_pages(
+                find_pages("content", dir_to_build),
+                dir_to_build,
+                args.base_path,
+                SearchIndex.load(DEFAULT_SEARCH_CACHE_PATH),
+                search_terms,
+            )
+            written = write_index_files(dir_to_build, search_index.files())
+            search_index.save(DEFAULT_SEARCH_CACHE_PATH)
+            print(
+                f"Indexed {len(search_index.pages)} pages for search, "
+                f"{tokenized} tokenized, {written} files written"
+            )
+        if formats:
+            compress_stats = precompress_tree(
+                dir_to_build, formats, workers=args.compress_workers
+            )
+            bytes_in = format_bytes(compress_stats.bytes_in)
+            bytes_out = format_bytes(compress_stats.bytes_out)
+            print(
+                f"Precompressed {dir_to_build}: {compress_stats.compressed} written "
+                f"({bytes_in} to {bytes_out}, {compress_stats.ratio():.1%}), "
+                f"{compress_stats.unchanged} unchanged, "
+                f"{compress_stats.removed} removed"
+            )
+
+    if block_cache is not None:
+        print(block_cache.summary())
+    if render_cache is not None:
+        max_bytes = None
+        if args.render_cache_max_mb is not None:
+            max_bytes = int(args.render_cache_max_mb * 1024 * 1024)
+        max_age_seconds = None
+        if args.render_cache_max_age_days is not None:
+            max_age_seconds = args.render_cache_max_age_days * 24 * 60 * 60
+        evicted = render_cache.prune(max_bytes, max_age_seconds)
+        print(f"{render_cache.summary()}, {evicted} evicted")
+    if build_profile is not None:
+        print(build_profile.summary(args.profile_slowest))
+
+
+def serve_site(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="main.py serve", description="build the site and serve it locally"
+    )
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="rebuild the outputs of changed files and reload open pages",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=0.1, help="seconds between checks for changes"
+    )
+    args = parser.parse_args(argv)
+    rebuilder = SiteRebuilder(
+        "content",
+        "static",
+        "template.html",
+        "docs",
+        manifest_path=DEFAULT_MANIFEST_PATH,
+    )
+    serve(rebuilder, args.port, args.watch, args.interval)
+
+
+def query_dependencies(argv: list[str]) -> None:
+    parser = argparse.ArgumentParser(
+        prog="main.py deps",
+        description="query the dependency graph recorded by the last build",
+    )
+    parser.add_argument(
+        "path",
+        nargs="?",
+        help="generated page to list the dependencies of, all pages if omitted",
+    )
+    parser.add_argument(
+        "--dependents",
+        action="store_true",
+        help="list the pages depending on path (a source, template, asset or page)",
+    )
+    parser.add_argument("--graph", default=DEFAULT_GRAPH_PATH)
+    args = parser.parse_args(argv)
+    graph = DependencyGraph.load(args.graph)
+    dir_to_build = "docs"
+
+    if args.dependents:
+        if args.path is None:
+            parser.error("--dependents needs a path")
+        for dest_path in graph.dependents(args.path, dir_to_build):
+            print(dest_path)
+        return
+    if args.path is not None:
+        if os.path.normpath(args.path) not in graph.pages:
+            parser.error(f"{args.path} is not a page recorded in {args.graph}")
+        for kind, paths in graph.dependencies(args.path, dir_to_build).items():
+            for path in paths:
+                print(f"{kind:<8} {path}")
+        return
+    for dest_path in sorted(graph.pages):
+        dependencies = graph.dependencies(dest_path, dir_to_build)
+        print(
+            f"{dest_path}: {dependencies['source'][0]}, {dependencies['template'][0]}, "
+            f"{len(dependencies['asset'])} assets, {len(dependencies['page'])} pages, "
+            f"{len(dependencies['missing'])} missing"
+        )
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == "serve":
+        serve_site(sys.argv[2:])
+    elif len(sys.argv) >= 2 and sys.argv[1] == "deps":
+        query_dependencies(sys.argv[2:])
     else:
-        generate_pages_recursively("content", "template.html", dir_to_build)
+        build_site(sys.argv[1:])
 
 
-main()
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import mmap
+from typing import Iterator
+from front_matter import FRONT_MATTER_DELIMITER, parse_front_matter
+from markdown_parsing import BlockType, block_to_block_type
+
+# NOTE: every ASCII character str.isspace() counts, bytes.strip() on its own
+#       leaves \x1c to \x1f where str.strip() removes them
+ASCII_WHITESPACE = bytes(c for c in range(128) if chr(c).isspace())
+
+
+class MappedFile:
+    """
+    The bytes of the file at path mapped into memory instead of read, pages
+    are only loaded as they are scanned and can be dropped again by the OS.
+    Empty files, which can't be mapped, are an empty bytes object.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.file = open(path, mode="rb")
+        try:
+            if self.file.seek(0, 2) == 0:
+                self.data = b""
+            else:
+                self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            self.file.close()
+            raise
+
+    def close(self) -> None:
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self) -> "MappedFile":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def line_at(data: bytes, index: int, start: int = 0) -> tuple[int, int]:
+    """
+    Start and end of the line of data containing index, not before start.
+    """
+    line_start = max(data.rfind(b"\n", start, index) + 1, start)
+    line_end = data.find(b"\n", index)
+    return line_start, len(data) if line_end == -1 else line_end
+
+
+def split_mapped_front_matter(
+    data: bytes,
+) -> tuple[dict[str, str | bool | list[str]], int]:
+    """
+    The front matter of the markdown in data and the offset the markdown
+    after it starts at, see split_front_matter. Only the delimiter lines and
+    the front matter itself are decoded.
+    """
+    first_end = data.find(b"\n")
+    if first_end == -1 or data[:first_end].decode().strip() != FRONT_MATTER_DELIMITER:
+        return {}, 0
+    position = first_end + 1
+    while True:
+        index = data.find(FRONT_MATTER_DELIMITER.encode(), position)
+        if index == -1:
+            return {}, 0
+        line_start, line_end = line_at(data, index, position)
+        if data[line_start:line_end].decode().strip() == FRONT_MATTER_DELIMITER:
+            header = data[first_end + 1 : line_start].decode().split("\n")
+            return parse_front_matter(header), min(line_end + 1, len(data))
+        position = line_end + 1
+
+
+def find_mapped_title(data: bytes, start: int = 0) -> str | None:
+    """
+    The text of the first line after start that is an h1 once stripped, as
+    TitleScanner finds it. Only lines containing "# " are decoded.
+    """
+    position = start
+    while True:
+        index = data.find(b"# ", position)
+        if index == -1:
+            return None
+        line_start, line_end = line_at(data, index, start)
+        line = data[line_start:line_end].decode().strip()
+        if line.startswith("# "):
+            return line[2:]
+        position = line_end + 1
+
+
+def bytes_block_type(block: bytes) -> BlockType | None:
+    """
+    block_to_block_type on the stripped bytes of a block. None when that
+    takes decoding, a heading marker followed by a non-ASCII character.
+    """
+    level = 0
+    while level < 7 and level < len(block) and block[level] == ord("#"):
+        level += 1
+    if 1 <= level <= 6 and level < len(block):
+        if block[level] >= 0x80:
+            return None
+        if chr(block[level]).isspace():
+            return BlockType.HEADING
+    if block.startswith(b"```") and block.endswith(b"```"):
+        return BlockType.CODE
+
+    if block.startswith(b">"):
+        if block.count(b"\n>") == block.count(b"\n"):
+            return BlockType.QUOTE
+    elif block.startswith(b"- "):
+        if block.count(b"\n- ") == block.count(b"\n"):
+            return BlockType.UNORDERED_LIST
+    elif block.startswith(b"1. "):
+        count = 2
+        start = block.find(b"\n") + 1
+        while start > 0:
+            if not block.startswith(f"{count}. ".encode(), start):
+                return BlockType.PARAGRAPH
+            count += 1
+            start = block.find(b"\n", start) + 1
+        return BlockType.ORDERED_LIST
+    return BlockType.PARAGRAPH
+
+
+def iter_mapped_blocks(data: bytes, start: int = 0) -> Iterator[tuple[BlockType, str]]:
+    """
+    The same (type, block) pairs iter_blocks yields for the lines of the
+    markdown in data after start. Block boundaries and types are found on
+    the bytes, only the block being yielded is decoded. Expects "\\n" line
+    endings, the universal newlines of a text file aren't translated.
+    """
+    # NOTE: an empty line closes a block and whitespace only lines never do,
+    #       so the text between two empty lines is at most one block with its
+    #       surrounding whitespace, including whitespace only lines, stripped
+    size = len(data)
+    position = start
+    while position < size:
+        end = data.find(b"\n\n", position)
+        if end == -1:
+            end = size
+        block = data[position:end].strip(ASCII_WHITESPACE)
+        position = end + 2
+        if not block:
+            continue
+        block_type = bytes_block_type(block)
+        text = block.decode()
+        # NOTE: non-ASCII whitespace at either end is only stripped as text
+        if text[0].isspace() or text[-1].isspace():
+            text = text.strip()
+            if not text:
+                continue
+            block_type = None
+        if block_type is None:
+            block_type = block_to_block_type(text)
+        yield block_type, text
@@ -1,6 +1,7 @@
 import re
 
 from enum import Enum
+from typing import Callable, Iterable, Iterator
 from htmlnode import HTMLNode, ParentNode
 from textnode import TextNode, TextType, text_node_to_html_node
 
@@ -25,28 +26,36 @@ def markdown_to_html_node(markdown: str) -> HTMLNode:
     return ParentNode("div", children)
 
 
-def block_to_html_node(block: str) -> HTMLNode:
-    block_type = block_to_block_type(block)
+def typed_blocks_to_html_node(
+    blocks: Iterable[tuple[BlockType, str]],
+    render_block: Callable[[str, BlockType | None], HTMLNode] | None = None,
+) -> HTMLNode:
+    if render_block is None:
+        render_block = block_to_html_node
+    children = []
+    for block_type, block in blocks:
+        html_node = render_block(block, block_type)
+        children.append(html_node)
+    return ParentNode("div", children)
+
+
+def block_to_html_node(block: str, block_type: BlockType | None = None) -> HTMLNode:
+    if block_type is None:
+        block_type = block_to_block_type(block)
     match block_type:
         case BlockType.PARAGRAPH:
-            raw_text = " ".join(block.split("\n"))
-            text_nodes = text_to_textnodes(raw_text)
-            child_html_nodes = list(map(text_node_to_html_node, text_nodes))
-            return ParentNode("p", child_html_nodes)
+            (text,) = block_inline_texts(block, block_type)
+            return ParentNode("p", text_to_children(text))
         case BlockType.HEADING:
             level, text = get_heading_data(block)
-            text_nodes = text_to_textnodes(text)
-            child_html_nodes = list(map(text_node_to_html_node, text_nodes))
-            return ParentNode(f"h{level}", child_html_nodes)
+            return ParentNode(f"h{level}", text_to_children(text))
         case BlockType.CODE:
-            node = TextNode(block[4:-3], TextType.PLAIN)
+            node = TextNode(get_code_text(block), TextType.PLAIN)
             child_html_node = text_node_to_html_node(node)
             return ParentNode("pre", [ParentNode("code", [child_html_node])])
         case BlockType.QUOTE:
-            raw_text = get_quote_text(block)
-            text_nodes = text_to_textnodes(raw_text)
-            child_html_nodes = list(map(text_node_to_html_node, text_nodes))
-            return ParentNode("blockquote", child_html_nodes)
+            (text,) = block_inline_texts(block, block_type)
+            return ParentNode("blockquote", text_to_children(text))
         case BlockType.UNORDERED_LIST:
             return parse_unordered_list(block)
         case BlockType.ORDERED_LIST:
@@ -55,6 +64,31 @@ def block_to_html_node(block: str) -> HTMLNode:
             raise ValueError(f'not supported block type: "{block_type}"')
 
 
+def block_inline_texts(block: str, block_type: BlockType) -> list[str]:
+    """
+    The inline markdown of block without its block syntax, the text of a
+    paragraph, heading or quote and one text per list item. Code blocks
+    have none, their contents are never parsed, see get_code_text.
+    """
+    match block_type:
+        case BlockType.PARAGRAPH:
+            return [" ".join(block.split("\n"))]
+        case BlockType.HEADING:
+            return [get_heading_data(block)[1]]
+        case BlockType.QUOTE:
+            return [get_quote_text(block)]
+        case BlockType.UNORDERED_LIST:
+            return [line[2:] for line in block.split("\n") if line.strip()]
+        case BlockType.ORDERED_LIST:
+            return [line[3:] for line in block.split("\n") if line.strip()]
+        case _:
+            return []
+
+
+def text_to_children(text: str) -> list[HTMLNode]:
+    return list(map(text_node_to_html_node, text_to_textnodes(text)))
+
+
 def get_heading_data(block: str) -> tuple[int, str]:
     level = 0
     for char in block[:7]:
@@ -73,62 +107,57 @@ def get_quote_text(block: str) -> str:
     return " ".join(pruned_lines)
 
 
+def get_code_text(block: str) -> str:
+    return block[4:-3]
+
+
 def parse_unordered_list(block: str) -> ParentNode:
-    lines = block.split("\n")
     list_items = []
-    for line in lines:
-        if not line.strip():
-            continue
-        item = line[2:]
-        text_nodes = text_to_textnodes(item)
-        html_child_nodes = list(map(text_node_to_html_node, text_nodes))
-        list_items.append(ParentNode("li", html_child_nodes))
+    for item in block_inline_texts(block, BlockType.UNORDERED_LIST):
+        list_items.append(ParentNode("li", text_to_children(item)))
     return ParentNode("ul", list_items)
 
 
 def parse_ordered_list(block: str) -> ParentNode:
-    lines = block.split("\n")
     list_items = []
-    for line in lines:
-        if not line.strip():
-            continue
-        item = line[3:]
-        text_nodes = text_to_textnodes(item)
-        html_child_nodes = list(map(text_node_to_html_node, text_nodes))
-        list_items.append(ParentNode("li", html_child_nodes))
+    for item in block_inline_texts(block, BlockType.ORDERED_LIST):
+        list_items.append(ParentNode("li", text_to_children(item)))
     return ParentNode("ol", list_items)
 
 
+def is_heading(block: str) -> bool:
+    """
+    Whether block starts with one to six # followed by whitespace.
+    """
+    level = 0
+    while level < 7 and level < len(block) and block[level] == "#":
+        level += 1
+    return 1 <= level <= 6 and level < len(block) and block[level].isspace()
+
+
 def block_to_block_type(block: str) -> BlockType:
-    # NOTE: change this to a simpler check that doesnt (mis)use a regexp
-    pattern = re.compile(r"^(#{1,6})\s")
-    if bool(pattern.match(block)):
+    if is_heading(block):
         return BlockType.HEADING
     elif block.startswith("```") and block.endswith("```"):
         return BlockType.CODE
-    lines = block.split("\n")
-    quote = True
-    unordered_list = True
-    for line in lines:
-        if not line.startswith(">"):
-            quote = False
-        if not line.startswith("- "):
-            unordered_list = False
-    if quote:
-        return BlockType.QUOTE
-    elif unordered_list:
-        return BlockType.UNORDERED_LIST
-
-    ordered_list = False
-    count = 1
-    if block.startswith("1. "):
-        ordered_list = True
-        for line in lines:
-            if not line.startswith(f"{count}. "):
-                ordered_list = False
-                break
+
+    # NOTE: the first line decides which line based block type is possible at
+    #       all, the other lines start right after a newline so counting them
+    #       checks all of them at once without splitting the block into lines
+    if block.startswith(">"):
+        if block.count("\n>") == block.count("\n"):
+            return BlockType.QUOTE
+    elif block.startswith("- "):
+        if block.count("\n- ") == block.count("\n"):
+            return BlockType.UNORDERED_LIST
+    elif block.startswith("1. "):
+        count = 2
+        start = block.find("\n") + 1
+        while start > 0:
+            if not block.startswith(f"{count}. ", start):
+                return BlockType.PARAGRAPH
             count += 1
-    if ordered_list:
+            start = block.find("\n", start) + 1
         return BlockType.ORDERED_LIST
     return BlockType.PARAGRAPH
 
@@ -141,16 +170,129 @@ def markdown_to_blocks(markdown: str) -> list[str]:
     )
 
 
+class _OpenBlock:
+    """
+    Lines of the block currently being read, classified one by one as they
+    are added so the finished block doesn't have to be split and scanned again.
+    """
+
+    def __init__(self, first_line: str) -> None:
+        self.lines = [first_line]
+        self.quote = True
+        self.unordered_list = True
+        self.ordered_list = True
+
+    def _classify(self, line: str) -> None:
+        count = len(self.lines)
+        self.quote = self.quote and line.startswith(">")
+        self.unordered_list = self.unordered_list and line.startswith("- ")
+        self.ordered_list = self.ordered_list and line.startswith(f"{count}. ")
+
+    def add(self, line: str) -> None:
+        # NOTE: the last line still gets stripped once the block ends,
+        #       so a line is only classified once the next one arrives
+        self._classify(self.lines[-1])
+        self.lines.append(line)
+
+    def close(self) -> tuple[BlockType, str]:
+        self.lines[-1] = self.lines[-1].rstrip()
+        self._classify(self.lines[-1])
+        block = "\n".join(self.lines)
+        if is_heading(block):
+            return BlockType.HEADING, block
+        elif block.startswith("```") and block.endswith("```"):
+            return BlockType.CODE, block
+        elif self.quote:
+            return BlockType.QUOTE, block
+        elif self.unordered_list:
+            return BlockType.UNORDERED_LIST, block
+        elif self.ordered_list:
+            return BlockType.ORDERED_LIST, block
+        return BlockType.PARAGRAPH, block
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[tuple[BlockType, str]]:
+    """
+    Read markdown line by line, e.g. straight from an open file, and yield
+    the same blocks as markdown_to_blocks together with their block type
+    while only ever holding the current block in memory.
+    """
+    block = None
+    # NOTE: whitespace only lines are dropped by stripping when they start or
+    #       end a block, so they are only kept once more text follows them
+    blank_lines = []
+    for line in lines:
+        if line.endswith("\n"):
+            line = line[:-1]
+        if not line:
+            if block is not None:
+                yield block.close()
+            block = None
+            blank_lines = []
+        elif line.isspace():
+            if block is not None:
+                blank_lines.append(line)
+        elif block is None:
+            block = _OpenBlock(line.lstrip())
+        else:
+            for blank_line in blank_lines:
+                block.add(blank_line)
+            blank_lines = []
+            block.add(line)
+    if block is not None:
+        yield block.close()
+
+
+# NOTE: one alternative per inline element, the regex engine tries them at every
+#       position while scanning left to right, so a single finditer over the text
+#       finds all elements in order without re-splitting already parsed parts,
+#       the lookahead lets the engine skip plain characters without trying each one
+INLINE_PATTERN = re.compile(
+    r"(?=[`*_!\[])"
+    r"(?:`([^`]*)`"
+    r"|\*\*(.*?)\*\*"
+    r"|_([^_]*)_"
+    r"|!\[(.*?)\]\((.*?)\)"
+    r"|(?<!!)\[(.*?)\]\((.*?)\))"
+)
+
+
 def text_to_textnodes(text: str) -> list[TextNode]:
-    node = TextNode(text, TextType.PLAIN)
-    nodes = split_nodes_delimiter([node], "_", TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
-    nodes = split_nodes_link(nodes)
-    nodes = split_nodes_image(nodes)
+    nodes = []
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        start = match.start()
+        if start > position:
+            nodes.append(plain_text_node(text[position:start]))
+        code, bold, italic, image_alt, image_url, link_text, link_url = match.groups()
+        if code is not None:
+            if code:
+                nodes.append(TextNode(code, TextType.CODE))
+        elif bold is not None:
+            if bold:
+                nodes.append(TextNode(bold, TextType.BOLD))
+        elif italic is not None:
+            if italic:
+                nodes.append(TextNode(italic, TextType.ITALIC))
+        elif image_url is not None:
+            nodes.append(TextNode(image_alt, TextType.IMAGE, image_url))
+        else:
+            nodes.append(TextNode(link_text, TextType.LINK, link_url))
+        position = match.end()
+    if position < len(text):
+        nodes.append(plain_text_node(text[position:]))
     return nodes
 
 
+def plain_text_node(text: str) -> TextNode:
+    # NOTE: any delimiter left over in plain text was never closed
+    if "`" in text or "**" in text or "_" in text:
+        raise ValueError(
+            "invalid markdown: there needs to be an even amount of delimiters."
+        )
+    return TextNode(text, TextType.PLAIN)
+
+
 def split_nodes_delimiter(
     old_nodes: list[TextNode], delimiter: str, text_type: TextType
 ) -> list[TextNode]:
@@ -176,17 +318,20 @@ def split_nodes_delimiter(
     return new_nodes
 
 
+# NOTE: markdown image => !["alt-text"]("uri")
+IMAGE_PATTERN = re.compile(r"!\[(.*?)\]\((.*?)\)")
+# NOTE: markdown link => ["alt-text"]("uri")
+#       (?<!x) is negative lookbehind to make sure we dont match on images and
+#       treat them as links
+LINK_PATTERN = re.compile(r"(?<!!)\[(.*?)\]\((.*?)\)")
+
+
 def extract_markdown_images(text: str) -> list[tuple[str, str]]:
-    # NOTE: markdown image => !["alt-text"]("uri")
-    regex = r"!\[(.*?)\]\((.*?)\)"
-    return re.findall(regex, text)
+    return IMAGE_PATTERN.findall(text)
 
 
 def extract_markdown_links(text: str) -> list[tuple[str, str]]:
-    # NOTE: markdown image => ["alt-text"]("uri")
-    #       (?<!x) is negative lookbehind to make sure we dont match on images and treat them as links
-    regex = r"(?<!!)\[(.*?)\]\((.*?)\)"
-    return re.findall(regex, text)
+    return LINK_PATTERN.findall(text)
 
 
 def split_nodes_image(old_nodes: list[TextNode]) -> list[TextNode]:
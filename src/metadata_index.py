@@ -0,0 +1,195 @@
+import json
+import os
+from front_matter import FrontMatterReader
+from generate_page import TitleScanner, page_url
+from markdown_parsing import BlockType, block_to_html_node, iter_blocks
+
+DEFAULT_METADATA_INDEX_PATH = os.path.join(".flowery-cache", "metadata.json")
+METADATA_INDEX_VERSION = 2
+METADATA_NAME = "metadata.json"
+
+
+def read_header(path: str) -> tuple[dict, str | None]:
+    """
+    The front matter of the markdown at path with its title, the first h1
+    unless the front matter sets one, and the html of its summary, the first
+    paragraph after the h1 unless the front matter sets one. The file is
+    only read up to that paragraph, never as a whole.
+    """
+    summary = None
+    with open(path, mode="r") as f:
+        reader = FrontMatterReader(f)
+        lines = TitleScanner(reader)
+        for block_type, block in iter_blocks(lines):
+            if lines.title is not None and block_type == BlockType.PARAGRAPH:
+                summary = block
+                break
+    metadata = dict(reader.metadata)
+    if "title" not in metadata:
+        if lines.title is None:
+            raise Exception("no h1 header found in markdown")
+        metadata["title"] = lines.title
+    if "summary" in metadata:
+        summary = str(metadata["summary"])
+    if summary is not None:
+        summary = block_to_html_node(summary, BlockType.PARAGRAPH).to_html()
+    return metadata, summary
+
+
+class MetadataIndex:
+    """
+    The front matter, title and summary of every page by source path, with
+    the destination and url of the page and the size and mtime of the source
+    they were read from.
+    """
+
+    def __init__(self, pages: dict[str, dict] | None = None) -> None:
+        self.pages = pages if pages is not None else {}
+
+    def current_entry(self, path: str, stat: os.stat_result) -> dict | None:
+        entry = self.pages.get(path)
+        if (
+            entry is None
+            or entry["size"] != stat.st_size
+            or entry["mtime_ns"] != stat.st_mtime_ns
+        ):
+            return None
+        return entry
+
+    def posts(self, section_dir: str, drafts: bool = False) -> list[tuple[str, dict]]:
+        """
+        (source path, entry) of every page below section_dir, except the
+        index.md of section_dir itself and without drafts unless drafts is
+        set, newest first.
+        """
+        section_dir = os.path.normpath(section_dir)
+        posts = [
+            (source_file_path, entry)
+            for source_file_path, entry in self.pages.items()
+            if source_file_path.startswith(section_dir + os.sep)
+            and source_file_path != os.path.join(section_dir, "index.md")
+            and (drafts or not entry["metadata"].get("draft", False))
+        ]
+        # NOTE: ISO dates sort as strings, undated posts go last
+        posts.sort(key=lambda post: post[1]["url"])
+        posts.sort(
+            key=lambda post: str(post[1]["metadata"].get("date", "")), reverse=True
+        )
+        return posts
+
+    def tags(self, section_dir: str, drafts: bool = False) -> dict[str, list[str]]:
+        """
+        Every tag of the posts below section_dir => their source paths,
+        newest first.
+        """
+        tags = {}
+        for source_file_path, entry in self.posts(section_dir, drafts):
+            for tag in entry["metadata"].get("tags", []):
+                tags.setdefault(tag, []).append(source_file_path)
+        return dict(sorted(tags.items()))
+
+    def public(self) -> list[dict]:
+        """
+        Url and metadata of every page that isn't a draft, for scripts
+        listing pages in the browser.
+        """
+        return [
+            {"url": entry["url"], **entry["metadata"]}
+            for _, entry in sorted(self.pages.items(), key=lambda p: p[1]["url"])
+            if not entry["metadata"].get("draft", False)
+        ]
+
+    def to_dict(self) -> dict:
+        return {"version": METADATA_INDEX_VERSION, "pages": self.pages}
+
+    @classmethod
+    def load(cls, path: str) -> "MetadataIndex":
+        # NOTE: without a usable index every header just gets read again
+        try:
+            with open(path, mode="r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict) or data.get("version") != METADATA_INDEX_VERSION:
+            return cls()
+        return cls(data.get("pages"))
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w") as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def __eq__(self, other):
+        return self.pages == other.pages
+
+    def __repr__(self):
+        return f"MetadataIndex(pages: {self.pages})"
+
+
+def index_metadata(
+    pages: list[tuple[str, str]],
+    dest_dir_path: str,
+    base_path: str = "/",
+    previous: MetadataIndex | None = None,
+) -> tuple[MetadataIndex, int]:
+    """
+    Index the metadata of every (source, destination) page in pages. Only
+    sources whose size or mtime differ from previous get their header read
+    again. Returns the index and the number of headers read. Pages whose
+    header fails to parse are left out.
+    """
+    previous = previous or MetadataIndex()
+    index = MetadataIndex()
+    read = 0
+    for source_file_path, dest_file_path in sorted(pages):
+        stat = os.stat(source_file_path)
+        entry = previous.current_entry(source_file_path, stat)
+        if entry is None:
+            read += 1
+            try:
+                metadata, summary = read_header(source_file_path)
+            except Exception as e:
+                # NOTE: the page build reports the error, the page is left
+                #       out of the index until it is fixed
+                print(
+                    f"Failed to read metadata of {source_file_path}: "
+                    f"{type(e).__name__}: {e}"
+                )
+                continue
+            entry = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "metadata": metadata,
+                "summary": summary,
+            }
+        index.pages[source_file_path] = {
+            **entry,
+            "dest": dest_file_path,
+            "url": page_url(dest_file_path, dest_dir_path, base_path),
+        }
+    return index, read
+
+
+def write_public_index(dest_dir_path: str, index: MetadataIndex) -> bool:
+    """
+    Write the public part of index to metadata.json in dest_dir_path unless
+    it is unchanged. Returns whether it was written.
+    """
+    path = os.path.join(dest_dir_path, METADATA_NAME)
+    contents = json.dumps(index.public(), indent=2, sort_keys=True)
+    try:
+        with open(path, mode="r") as f:
+            if f.read() == contents:
+                return False
+    except OSError:
+        pass
+    os.makedirs(dest_dir_path, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, mode="w") as f:
+        f.write(contents)
+    os.replace(tmp_path, path)
+    return True
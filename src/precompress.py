@@ -0,0 +1,179 @@
+import gzip
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dump_files import scan_tree
+
+# NOTE: brotli is optional, without it only gzip variants can be written
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+FORMATS = {"gzip": ".gz", "br": ".br"}
+
+COMPRESSIBLE_EXTENSIONS = (
+    ".html",
+    ".css",
+    ".js",
+    ".mjs",
+    ".json",
+    ".map",
+    ".svg",
+    ".xml",
+    ".txt",
+    ".ico",
+    ".webmanifest",
+)
+
+# NOTE: the compressed variant of a tiny file saves nothing worth a second file
+DEFAULT_MIN_SIZE = 256
+
+
+def available_formats() -> list[str]:
+    return [format for format in FORMATS if format != "br" or brotli is not None]
+
+
+def is_compressible(path: str) -> bool:
+    return path.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def variant_path(path: str, format: str) -> str:
+    return path + FORMATS[format]
+
+
+def compressed_variants(paths: set[str], formats: list[str]) -> set[str]:
+    """
+    Paths of the compressed variants precompress_tree writes for paths.
+    """
+    return {
+        variant_path(path, format)
+        for path in paths
+        if is_compressible(path)
+        for format in formats
+    }
+
+
+def compress_bytes(data: bytes, format: str) -> bytes:
+    if format == "gzip":
+        # NOTE: mtime=0 keeps the output the same for the same input
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    elif format == "br":
+        if brotli is None:
+            raise ValueError("brotli compression needs the brotli package")
+        return brotli.compress(data, quality=11)
+    raise ValueError(f'not supported compression format: "{format}"')
+
+
+class CompressStats:
+    def __init__(self) -> None:
+        self.compressed = 0
+        self.unchanged = 0
+        self.removed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    def ratio(self) -> float:
+        """
+        Size of the written variants relative to the files they were made from.
+        """
+        return self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+
+    def __eq__(self, other):
+        return (
+            self.compressed == other.compressed
+            and self.unchanged == other.unchanged
+            and self.removed == other.removed
+            and self.bytes_in == other.bytes_in
+            and self.bytes_out == other.bytes_out
+        )
+
+    def __repr__(self):
+        return f"CompressStats(compressed: {self.compressed}, unchanged: {self.unchanged}, removed: {self.removed}, bytes_in: {self.bytes_in}, bytes_out: {self.bytes_out}, seconds: {self.seconds})"
+
+
+def compress_file(path: str, formats: list[str]) -> list[tuple[int, int]]:
+    """
+    Write a compressed variant of path for every format, carrying over the
+    mtime of path. Returns the (original, compressed) size of every variant.
+    """
+    with open(path, mode="rb") as f:
+        data = f.read()
+    stat = os.stat(path)
+    sizes = []
+    for format in formats:
+        compressed = compress_bytes(data, format)
+        to_path = variant_path(path, format)
+        tmp_path = f"{to_path}.tmp"
+        try:
+            with open(tmp_path, mode="wb") as f:
+                f.write(compressed)
+            os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(tmp_path, to_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        sizes.append((len(data), len(compressed)))
+    return sizes
+
+
+def precompress_tree(
+    root: str,
+    formats: list[str],
+    workers: int = 8,
+    min_size: int = DEFAULT_MIN_SIZE,
+) -> CompressStats:
+    """
+    Write .gz and/or .br siblings of every compressible file below root that
+    is at least min_size bytes, fanned out to a pool of at most workers
+    threads. A variant with the same mtime as its file is up to date and
+    skipped, variants whose file is gone are removed.
+    """
+    files = scan_tree(root)
+    stats = CompressStats()
+
+    jobs = []
+    for relative_path, stat in sorted(files.items()):
+        if not is_compressible(relative_path) or stat.st_size < min_size:
+            continue
+        outdated = []
+        for format in formats:
+            variant = files.get(variant_path(relative_path, format))
+            if variant is not None and variant.st_mtime_ns == stat.st_mtime_ns:
+                stats.unchanged += 1
+            else:
+                outdated.append(format)
+        if outdated:
+            jobs.append((os.path.join(root, relative_path), outdated))
+
+    for relative_path in sorted(files):
+        for suffix in FORMATS.values():
+            if not relative_path.endswith(suffix):
+                continue
+            original = relative_path[: -len(suffix)]
+            # NOTE: only variants this stage writes, e.g. not an archive.tar.gz
+            if not is_compressible(original):
+                continue
+            stat = files.get(original)
+            if stat is None or stat.st_size < min_size:
+                os.remove(os.path.join(root, relative_path))
+                stats.removed += 1
+
+    def compress(job: tuple[str, list[str]]) -> list[tuple[int, int]]:
+        return compress_file(*job)
+
+    start = time.perf_counter()
+    if workers <= 1 or len(jobs) <= 1:
+        results = list(map(compress, jobs))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(compress, jobs))
+    stats.seconds += time.perf_counter() - start
+
+    for sizes in results:
+        for size_in, size_out in sizes:
+            stats.compressed += 1
+            stats.bytes_in += size_in
+            stats.bytes_out += size_out
+    return stats
@@ -0,0 +1,150 @@
+import cProfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator
+
+PAGE_STAGES = ("read", "parse", "inline", "serialize", "template", "write")
+
+
+class PageProfile:
+    """
+    Wall time and bytes handled by every stage of generating a single page.
+    """
+
+    def __init__(self, source_path: str) -> None:
+        self.source_path = source_path
+        self.timings: dict[str, float] = {}
+        self.sizes: dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = self.timings.get(name, 0.0) + (
+                time.perf_counter() - start
+            )
+
+    def total(self) -> float:
+        return sum(self.timings.values())
+
+    def __eq__(self, other):
+        return (
+            self.source_path == other.source_path
+            and self.timings == other.timings
+            and self.sizes == other.sizes
+        )
+
+    def __repr__(self):
+        return f"PageProfile(source_path: {self.source_path}, timings: {self.timings}, sizes: {self.sizes})"
+
+
+def format_bytes(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class BuildProfile:
+    """
+    Collects the PageProfile of every generated page and summarizes them.
+    """
+
+    def __init__(self) -> None:
+        self.pages: list[PageProfile] = []
+
+    def add(self, page: PageProfile) -> None:
+        self.pages.append(page)
+
+    def stage_totals(self) -> dict[str, tuple[float, int]]:
+        totals = {}
+        for stage in PAGE_STAGES:
+            seconds = sum(page.timings.get(stage, 0.0) for page in self.pages)
+            size = sum(page.sizes.get(stage, 0) for page in self.pages)
+            totals[stage] = (seconds, size)
+        return totals
+
+    def slowest(self, count: int) -> list[PageProfile]:
+        return sorted(self.pages, key=lambda page: page.total(), reverse=True)[:count]
+
+    def histogram(self) -> list[tuple[str, int]]:
+        """
+        Number of pages per total page time, in buckets doubling from 1ms.
+        """
+        buckets = [0]
+        for page in self.pages:
+            index = 0
+            upper = 0.001
+            while page.total() >= upper:
+                index += 1
+                upper *= 2
+            buckets.extend([0] * (index + 1 - len(buckets)))
+            buckets[index] += 1
+        labels = ["< 1 ms"]
+        for index in range(1, len(buckets)):
+            labels.append(f"{2 ** (index - 1)}-{2 ** index} ms")
+        return list(zip(labels, buckets))
+
+    def summary(self, slowest: int = 10) -> str:
+        lines = [
+            f"Build profile: {len(self.pages)} pages, "
+            f"{sum(page.total() for page in self.pages):.3f}s spent in page generation"
+        ]
+        lines.append("Stage totals:")
+        for stage, (seconds, size) in self.stage_totals().items():
+            lines.append(f"  {stage:<10} {seconds:9.4f}s {format_bytes(size):>10}")
+
+        lines.append(f"Slowest {min(slowest, len(self.pages))} pages:")
+        for page in self.slowest(slowest):
+            stages = ", ".join(
+                f"{stage} {page.timings[stage] * 1000:.1f}ms"
+                for stage in PAGE_STAGES
+                if stage in page.timings
+            )
+            lines.append(f"  {page.total():9.4f}s {page.source_path} ({stages})")
+
+        lines.append("Page time histogram:")
+        histogram = self.histogram()
+        most = max((count for _, count in histogram), default=0)
+        for label, count in histogram:
+            bar = "#" * (round(count / most * 40) if most else 0)
+            lines.append(f"  {label:>14} {count:6} {bar}")
+        return "\n".join(lines)
+
+
+@contextmanager
+def cprofile_to(path: str) -> Iterator[None]:
+    """
+    Run the body under cProfile and dump the stats to path, they can be
+    inspected with python3 -m pstats.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+@contextmanager
+def tracemalloc_report(limit: int = 10) -> Iterator[None]:
+    """
+    Trace allocations of the body and print the peak and the lines that
+    allocated the most memory still alive at the end.
+    """
+    tracemalloc.start()
+    try:
+        yield
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    print(f"Peak traced memory: {format_bytes(peak)}")
+    print(f"Top {limit} allocation sites:")
+    for statistic in snapshot.statistics("lineno")[:limit]:
+        print(f"  {statistic}")
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import time
+import uuid
+from functools import lru_cache
+
+DEFAULT_RENDER_CACHE_DIR = os.path.join(".flowery-cache", "render")
+
+# NOTE: every module that influences the html of a page, changing any of them
+#       changes the parser version and with it every cache key
+PARSER_MODULES = ("markdown_parsing.py", "textnode.py", "htmlnode.py")
+
+
+@lru_cache(maxsize=1)
+def parser_version() -> str:
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for module in PARSER_MODULES:
+        with open(os.path.join(directory, module), mode="rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """
+    Content addressed directory mapping the hash of a markdown source and
+    the parser version to the html fragment rendered from it. Entries are
+    written to a temporary file and renamed into place, so any number of
+    builds can share the directory.
+    """
+
+    def __init__(self, directory: str = DEFAULT_RENDER_CACHE_DIR) -> None:
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, markdown: str) -> str:
+        digest = hashlib.sha256(parser_version().encode())
+        digest.update(markdown.encode())
+        return digest.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.html")
+
+    def get(self, key: str) -> str | None:
+        path = self.path(key)
+        try:
+            with open(path, mode="r", encoding="utf-8") as f:
+                html = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        # NOTE: the mtime marks when an entry was last used, eviction goes by it
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return html
+
+    def put(self, key: str, html: str) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, mode="w", encoding="utf-8") as f:
+                f.write(html)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def entries(self) -> list[tuple[str, int, float]]:
+        """
+        (path, size, mtime) of every entry in the cache.
+        """
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        with os.scandir(self.directory) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as files:
+                    for entry in files:
+                        if entry.name.endswith(".html"):
+                            stat = entry.stat()
+                            entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def prune(
+        self, max_bytes: int | None = None, max_age_seconds: float | None = None
+    ) -> int:
+        """
+        Remove entries unused for longer than max_age_seconds, then the least
+        recently used ones until the cache fits in max_bytes. Returns the
+        number of removed entries.
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        size = sum(entry_size for _, entry_size, _ in entries)
+        cutoff = time.time() - max_age_seconds if max_age_seconds is not None else None
+        removed = 0
+        for path, entry_size, mtime in entries:
+            too_old = cutoff is not None and mtime < cutoff
+            too_big = max_bytes is not None and size > max_bytes
+            if not too_old and not too_big:
+                break
+            removed += self._remove(path)
+            size -= entry_size
+        return removed
+
+    def _remove(self, path: str) -> int:
+        # NOTE: another build may have evicted the same entry already
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        return 1
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (
+            f"Render cache: {self.hits} hits, {self.misses} misses "
+            f"({rate:.1%} hit rate) in {self.directory}"
+        )
@@ -0,0 +1,258 @@
+import json
+import os
+from typing import Mapping
+from build_manifest import hash_file
+from dump_files import scan_tree
+from front_matter import split_front_matter
+from generate_page import extract_title, page_url, read_source
+from markdown_parsing import iter_blocks, typed_blocks_to_html_node
+from search_terms import PageTerms
+
+DEFAULT_SEARCH_CACHE_PATH = os.path.join(".flowery-cache", "search.json")
+SEARCH_CACHE_VERSION = 1
+SEARCH_INDEX_VERSION = 1
+SEARCH_DIR = "search"
+
+# NOTE: terms are sharded by their first characters, a client looking up a
+#       term only fetches the shard named after its prefix
+DEFAULT_PREFIX_LENGTH = 2
+
+
+def page_terms(markdown: str) -> dict[str, list[int]]:
+    """
+    Every term of the page => the positions of the words it occurs at, for
+    pages the build didn't just generate.
+    """
+    terms = PageTerms()
+    terms.add_node(typed_blocks_to_html_node(iter_blocks(markdown.split("\n"))))
+    return terms.terms
+
+
+def shard_name(term: str, prefix_length: int = DEFAULT_PREFIX_LENGTH) -> str:
+    """
+    Shard of term, the hex code points of its first prefix_length characters,
+    e.g. "hello" => "68-65".
+    """
+    return "-".join(f"{ord(char):x}" for char in term[:prefix_length])
+
+
+def encode_postings(postings: list[tuple[int, list[int]]]) -> list[int]:
+    """
+    Flatten the (page id, positions) postings of a term into one list of
+    delta encoded integers: per page the id minus the previous id, the
+    number of positions and every position minus the previous one.
+    """
+    encoded = []
+    previous_id = 0
+    for page_id, positions in sorted(postings):
+        encoded.append(page_id - previous_id)
+        encoded.append(len(positions))
+        previous_position = 0
+        for position in positions:
+            encoded.append(position - previous_position)
+            previous_position = position
+        previous_id = page_id
+    return encoded
+
+
+def decode_postings(encoded: list[int]) -> list[tuple[int, list[int]]]:
+    postings = []
+    page_id = 0
+    i = 0
+    while i < len(encoded):
+        page_id += encoded[i]
+        count = encoded[i + 1]
+        positions = []
+        position = 0
+        for delta in encoded[i + 2 : i + 2 + count]:
+            position += delta
+            positions.append(position)
+        postings.append((page_id, positions))
+        i += 2 + count
+    return postings
+
+
+class SearchIndex:
+    """
+    The terms of every page by source path, with the url, title and page id
+    they are indexed under and the size, mtime and content hash of the
+    source they were read from.
+    """
+
+    def __init__(self, pages: dict[str, dict] | None = None) -> None:
+        self.pages = pages if pages is not None else {}
+
+    def current_entry(self, path: str, stat: os.stat_result) -> dict | None:
+        entry = self.pages.get(path)
+        if (
+            entry is None
+            or entry["size"] != stat.st_size
+            or entry["mtime_ns"] != stat.st_mtime_ns
+        ):
+            return None
+        return entry
+
+    def postings(self) -> dict[str, list[tuple[int, list[int]]]]:
+        """
+        Every term => the (page id, positions) of the pages it occurs in.
+        """
+        postings = {}
+        for entry in self.pages.values():
+            for term, positions in entry["terms"].items():
+                postings.setdefault(term, []).append((entry["id"], positions))
+        return postings
+
+    def files(self, prefix_length: int = DEFAULT_PREFIX_LENGTH) -> dict[str, bytes]:
+        """
+        Path relative to the output directory => contents of every file of
+        the index: search/pages.json with the url and title of every page id
+        and a search/terms/<shard>.json with the encoded postings of every
+        term per shard.
+        """
+        ids = [entry["id"] for entry in self.pages.values()]
+        pages = [None] * (max(ids, default=-1) + 1)
+        for entry in self.pages.values():
+            pages[entry["id"]] = [entry["url"], entry["title"]]
+        shards = {}
+        for term, postings in sorted(self.postings().items()):
+            shard = shards.setdefault(shard_name(term, prefix_length), {})
+            shard[term] = encode_postings(postings)
+        files = {
+            os.path.join(SEARCH_DIR, "pages.json"): {
+                "version": SEARCH_INDEX_VERSION,
+                "prefix_length": prefix_length,
+                "pages": pages,
+            }
+        }
+        for name, shard in shards.items():
+            files[os.path.join(SEARCH_DIR, "terms", f"{name}.json")] = shard
+        return {
+            path: json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+            for path, data in files.items()
+        }
+
+    def to_dict(self) -> dict:
+        return {"version": SEARCH_CACHE_VERSION, "pages": self.pages}
+
+    @classmethod
+    def load(cls, path: str) -> "SearchIndex":
+        # NOTE: without a usable cache every page just gets tokenized again
+        try:
+            with open(path, mode="r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if not isinstance(data, dict) or data.get("version") != SEARCH_CACHE_VERSION:
+            return cls()
+        return cls(data.get("pages"))
+
+    def save(self, path: str) -> None:
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="w") as f:
+            json.dump(self.to_dict(), f, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def __eq__(self, other):
+        return self.pages == other.pages
+
+    def __repr__(self):
+        return f"SearchIndex(pages: {self.pages})"
+
+
+def index_pages(
+    pages: list[tuple[str, str]],
+    dest_dir_path: str,
+    base_path: str = "/",
+    previous: SearchIndex | None = None,
+    generated: Mapping[str, PageTerms] | None = None,
+) -> tuple[SearchIndex, int]:
+    """
+    Index every (source, destination) page in pages. Sources whose size and
+    mtime, or failing that whose content hash, are known from previous keep
+    their terms and page id without being tokenized again, the ids of
+    removed pages are handed out to new ones. The terms of the other pages
+    are taken from generated, the terms the build collected by source, and
+    only the sources missing from it are read and parsed. Returns the index
+    and the number of pages whose terms changed. Pages that fail to parse
+    are left out.
+    """
+    generated = generated or {}
+    previous = previous or SearchIndex()
+    index = SearchIndex()
+    new_pages = []
+    for source_file_path, dest_file_path in sorted(pages):
+        stat = os.stat(source_file_path)
+        entry = previous.current_entry(source_file_path, stat)
+        source_hash = None
+        if entry is None:
+            source_hash = hash_file(source_file_path)
+            entry = previous.pages.get(source_file_path)
+            if entry is not None and entry["hash"] != source_hash:
+                entry = {"id": entry["id"]}
+        entry = dict(entry) if entry is not None else {}
+        entry["url"] = page_url(dest_file_path, dest_dir_path, base_path)
+        entry["size"] = stat.st_size
+        entry["mtime_ns"] = stat.st_mtime_ns
+        if source_hash is not None:
+            entry["hash"] = source_hash
+        index.pages[source_file_path] = entry
+        if "terms" not in entry:
+            new_pages.append(source_file_path)
+
+    for source_file_path in new_pages:
+        entry = index.pages[source_file_path]
+        if source_file_path in generated:
+            terms = generated[source_file_path]
+            entry["title"] = terms.title
+            entry["terms"] = terms.terms
+            continue
+        try:
+            _, markdown = split_front_matter(read_source(source_file_path))
+            entry["title"] = extract_title(markdown)
+            entry["terms"] = page_terms(markdown)
+        except Exception as e:
+            # NOTE: the page build reports the error, the page is left out of
+            #       the index until it is fixed
+            print(f"Failed to index page {source_file_path}: {type(e).__name__}: {e}")
+            del index.pages[source_file_path]
+
+    used_ids = {entry["id"] for entry in index.pages.values() if "id" in entry}
+    free_ids = (page_id for page_id in range(len(pages)) if page_id not in used_ids)
+    for source_file_path in sorted(index.pages):
+        entry = index.pages[source_file_path]
+        if "id" not in entry:
+            entry["id"] = next(free_ids)
+    return index, len(new_pages)
+
+
+def write_index_files(dest_dir_path: str, files: dict[str, bytes]) -> int:
+    """
+    Write the files of the index into dest_dir_path, skipping the ones whose
+    contents didn't change, and remove the shards that aren't in files
+    anymore. Returns the number of files written.
+    """
+    # NOTE: the compressed siblings of removed shards are left for
+    #       precompress_tree, it removes variants whose file is gone
+    for relative_path in scan_tree(os.path.join(dest_dir_path, SEARCH_DIR)):
+        relative_path = os.path.join(SEARCH_DIR, relative_path)
+        if relative_path.endswith(".json") and relative_path not in files:
+            os.remove(os.path.join(dest_dir_path, relative_path))
+    written = 0
+    for relative_path, contents in sorted(files.items()):
+        path = os.path.join(dest_dir_path, relative_path)
+        try:
+            with open(path, mode="rb") as f:
+                if f.read() == contents:
+                    continue
+        except OSError:
+            pass
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode="wb") as f:
+            f.write(contents)
+        os.replace(tmp_path, path)
+        written += 1
+    return written
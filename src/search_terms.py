@@ -0,0 +1,47 @@
+import re
+from htmlnode import HTMLNode
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    return [token.lower() for token in TOKEN_PATTERN.findall(text)]
+
+
+class PageTerms:
+    """
+    Title and terms of a page, every term => the positions of the words it
+    occurs at. Filled in from the html nodes the blocks of the page are
+    rendered into, so the build indexes a page without parsing it again.
+    """
+
+    def __init__(
+        self, title: str | None = None, terms: dict[str, list[int]] | None = None
+    ) -> None:
+        self.title = title
+        self.terms = terms if terms is not None else {}
+        self.words = sum(len(positions) for positions in self.terms.values())
+
+    def add_node(self, node: HTMLNode) -> None:
+        """
+        Add every word of the text a reader sees in node, in order: the text
+        of its leaves, including code, and the alt text of its images.
+        """
+        pending = [node]
+        while pending:
+            node = pending.pop()
+            if node.children:
+                pending.extend(reversed(node.children))
+                continue
+            text = node.value
+            if node.tag == "img" and node.props:
+                text = node.props.get("alt")
+            for word in tokenize(text or ""):
+                self.terms.setdefault(word, []).append(self.words)
+                self.words += 1
+
+    def __eq__(self, other):
+        return self.title == other.title and self.terms == other.terms
+
+    def __repr__(self):
+        return f"PageTerms(title: {self.title}, terms: {self.terms})"
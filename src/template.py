@@ -0,0 +1,188 @@
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Mapping
+from htmlnode import HTMLNode, ParentNode
+
+SLOT_PATTERN = re.compile(r"\{\{ (\w+) \}\}")
+ROOT_URL_PATTERN = re.compile(r'(href|src)="/([^"?#]*)')
+IMG_PATTERN = re.compile(r'<img src="([^"]*)"')
+
+
+def rebase_urls(html: str, base_path: str) -> str:
+    if base_path == "/":
+        return html
+    return html.replace('href="/', f'href="{base_path}').replace(
+        'src="/', f'src="{base_path}'
+    )
+
+
+def rewrite_urls(html: str, base_path: str, assets: Mapping[str, str]) -> str:
+    """
+    Rebase root relative href and src urls like rebase_urls, pointing the
+    ones of assets at their fingerprinted path on the way.
+    """
+    if not assets:
+        return rebase_urls(html, base_path)
+
+    def rewrite(match: re.Match) -> str:
+        attribute, path = match.groups()
+        return f'{attribute}="{base_path}{assets.get(path, path)}'
+
+    return ROOT_URL_PATTERN.sub(rewrite, html)
+
+
+def root_url_paths(html: str) -> list[str]:
+    """
+    Paths of the root relative href and src urls in html, without the
+    leading slash, query and fragment.
+    """
+    return [path for _, path in ROOT_URL_PATTERN.findall(html)]
+
+
+def annotate_images(html: str, images: Mapping[str, str]) -> str:
+    """
+    Let the browser load and decode every image lazily, adding the attributes
+    in images for the path of its root relative src, e.g. its dimensions.
+    """
+    if "<img" not in html:
+        return html
+
+    def annotate(match: re.Match) -> str:
+        src = match.group(1)
+        attributes = images.get(src[1:], "") if src.startswith("/") else ""
+        return f'<img src="{src}"{attributes} loading="lazy" decoding="async"'
+
+    return IMG_PATTERN.sub(annotate, html)
+
+
+class Template:
+    """
+    A template split once into literal segments and the {{ Slot }} names
+    between them, with the base_path, the fingerprinted asset paths and
+    with images the img attributes already applied to the literals.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        base_path: str = "/",
+        assets: Mapping[str, str] | None = None,
+        images: Mapping[str, str] | None = None,
+    ) -> None:
+        self.base_path = base_path
+        self.assets = dict(assets) if assets else {}
+        self.images = dict(images) if images is not None else None
+        self.urls = root_url_paths(source)
+        parts = SLOT_PATTERN.split(self.rewrite(source))
+        self.literals = parts[0::2]
+        self.slots = parts[1::2]
+
+    def rewrite(self, html: str) -> str:
+        # NOTE: both rewrites only ever touch href="/, src="/ and <img
+        if '="/' not in html and "<img" not in html:
+            return html
+        if self.images is not None:
+            html = annotate_images(html, self.images)
+        return rewrite_urls(html, self.base_path, self.assets)
+
+    def write_rewritten(self, write: Callable[[str], object], node: HTMLNode) -> None:
+        """
+        Serialize node into write with its urls rewritten. The html of every
+        child of the node is rewritten as a whole rather than chunk by chunk.
+        """
+        # NOTE: rewriting every chunk costs a call per chunk, rewriting every
+        #       block at once is as cheap as rewriting the whole page while
+        #       never holding more than one block of it in memory
+        if not isinstance(node, ParentNode) or not node.tag or not node.children:
+            chunks: list[str] = []
+            node.write_html(chunks.append)
+            write(self.rewrite("".join(chunks)))
+            return
+        write(self.rewrite(f"<{node.tag}{node.props_to_html()}>"))
+        for child in node.children:
+            chunks = []
+            child.write_html(chunks.append)
+            write(self.rewrite("".join(chunks)))
+        write(f"</{node.tag}>")
+
+    def write(
+        self, write: Callable[[str], object], values: Mapping[str, str | HTMLNode]
+    ) -> None:
+        """
+        Hand the filled in template to write chunk by chunk, HTMLNode values
+        are serialized straight into write. Slots without a value are kept
+        as they are.
+        """
+        rewrites = self.base_path != "/" or self.assets or self.images is not None
+        write(self.literals[0])
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            value = values.get(slot)
+            if value is None:
+                write(f"{{{{ {slot} }}}}")
+            elif not rewrites:
+                if isinstance(value, HTMLNode):
+                    value.write_html(write)
+                else:
+                    write(value)
+            elif isinstance(value, HTMLNode):
+                self.write_rewritten(write, value)
+            else:
+                write(self.rewrite(value))
+            write(literal)
+
+    def render(self, values: Mapping[str, str | HTMLNode]) -> str:
+        chunks: list[str] = []
+        self.write(chunks.append, values)
+        return "".join(chunks)
+
+    def __eq__(self, other):
+        return (
+            self.base_path == other.base_path
+            and self.assets == other.assets
+            and self.images == other.images
+            and self.literals == other.literals
+            and self.slots == other.slots
+        )
+
+    def __repr__(self):
+        return f"Template(base_path: {self.base_path}, assets: {self.assets}, images: {self.images}, literals: {self.literals}, slots: {self.slots})"
+
+
+def load_template(
+    template_path: str,
+    base_path: str = "/",
+    assets: Mapping[str, str] | None = None,
+    images: Mapping[str, str] | None = None,
+) -> Template:
+    """
+    Compile the template at template_path, reusing the compiled template
+    for as long as the file stays unchanged.
+    """
+    stat = os.stat(template_path)
+    return _compile_template_file(
+        template_path,
+        base_path,
+        stat.st_mtime_ns,
+        stat.st_size,
+        tuple(sorted(assets.items())) if assets else (),
+        tuple(sorted(images.items())) if images is not None else None,
+    )
+
+
+@lru_cache(maxsize=16)
+def _compile_template_file(
+    template_path: str,
+    base_path: str,
+    mtime_ns: int,
+    size: int,
+    assets: tuple[tuple[str, str], ...],
+    images: tuple[tuple[str, str], ...] | None,
+) -> Template:
+    with open(template_path, mode="r") as f:
+        return Template(
+            f.read(),
+            base_path,
+            dict(assets),
+            dict(images) if images is not None else None,
+        )
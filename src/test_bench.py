@@ -0,0 +1,55 @@
+import unittest
+
+from bench.classify import compare_classifiers, regex_block_to_block_type
+from bench.corpus import SHAPES, generate_document
+from bench.stages import STAGES, run_stages
+from markdown_parsing import (
+    block_to_block_type,
+    markdown_to_blocks,
+    markdown_to_html_node,
+)
+
+
+class TestBench(unittest.TestCase):
+    def test_generate_document_is_deterministic(self):
+        for shape in SHAPES:
+            self.assertEqual(generate_document(shape, 5), generate_document(shape, 5))
+        self.assertNotEqual(
+            generate_document("mixed", 5, seed=1), generate_document("mixed", 5)
+        )
+
+    def test_generate_document_size(self):
+        for shape in SHAPES:
+            markdown = generate_document(shape, 10)
+            self.assertEqual(len(markdown_to_blocks(markdown)), 11)
+
+    def test_generated_documents_parse(self):
+        for shape in SHAPES:
+            html = markdown_to_html_node(generate_document(shape, 20)).to_html()
+            self.assertTrue(html.startswith("<div><h1>"))
+
+    def test_unknown_shape(self):
+        self.assertRaises(ValueError, generate_document, "tables", 10)
+
+    def test_run_stages(self):
+        result = run_stages(generate_document("mixed", 10), repeat=1)
+        self.assertEqual(set(result["stages"]), set(STAGES))
+        self.assertEqual(result["blocks"], 11)
+        self.assertGreater(result["memory"]["peak_bytes"], 0)
+
+    def test_classifier_matches_regex_baseline(self):
+        for shape in SHAPES:
+            for block in markdown_to_blocks(generate_document(shape, 50)):
+                self.assertEqual(
+                    block_to_block_type(block), regex_block_to_block_type(block)
+                )
+
+    def test_compare_classifiers(self):
+        blocks = markdown_to_blocks(generate_document("mixed", 10))
+        result = compare_classifiers(blocks, repeat=1)
+        self.assertGreater(result["regex_ns_per_block"], 0)
+        self.assertGreater(result["single_pass_ns_per_block"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+
+from block_cache import BlockCache, estimate_size
+from markdown_parsing import BlockType, block_to_html_node
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_hits_and_misses(self):
+        cache = BlockCache()
+        first = cache.render_block("some **bold** text", BlockType.PARAGRAPH)
+        second = cache.render_block("some **bold** text", BlockType.PARAGRAPH)
+        cache.render_block("- a list")
+        self.assertIs(first, second)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+        self.assertAlmostEqual(cache.hit_rate(), 1 / 3)
+
+    def test_same_output_as_uncached(self):
+        cache = BlockCache()
+        for block in ("# heading", "> a quote", "1. one\n2. two", "```\ncode\n```"):
+            self.assertEqual(
+                cache.render_block(block).to_html(),
+                block_to_html_node(block).to_html(),
+            )
+
+    def test_least_recently_used_evicted(self):
+        blocks = ["first block", "second block", "third block"]
+        sizes = []
+        for block in blocks:
+            cache = BlockCache()
+            cache.render_block(block)
+            sizes.append(cache.size)
+        cache = BlockCache(max_bytes=sizes[0] + sizes[1] + sizes[2] // 2)
+        cache.render_block(blocks[0])
+        cache.render_block(blocks[1])
+        cache.render_block(blocks[0])
+        cache.render_block(blocks[2])
+        self.assertEqual(list(cache.entries), [blocks[0], blocks[2]])
+        self.assertEqual(cache.evictions, 1)
+        self.assertLessEqual(cache.size, cache.max_bytes)
+
+    def test_oversized_block_not_cached(self):
+        cache = BlockCache(max_bytes=10)
+        cache.render_block("a paragraph far too big for the cache")
+        self.assertEqual(len(cache.entries), 0)
+        self.assertEqual(cache.size, 0)
+
+    def test_entry_size_grows_with_block(self):
+        cache = BlockCache()
+        cache.render_block("short")
+        self.assertEqual(cache.size, estimate_size("short"))
+        self.assertGreater(estimate_size("a much longer block"), cache.size)
+
+    def test_summary(self):
+        cache = BlockCache()
+        cache.render_block("text")
+        self.assertIn("0 hits, 1 misses", cache.summary())
+        self.assertIn("1 entries", cache.summary())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,277 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+from unittest import mock
+
+import blog
+from blog import (
+    BlogManifest,
+    blog_pages,
+    feed_items,
+    listing_path,
+    paginate,
+    tag_slug,
+    write_blog,
+)
+from metadata_index import MetadataIndex, index_metadata
+from fixtures import read_file, write_file
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+class TestPagination(unittest.TestCase):
+    def test_paginate(self):
+        pages = paginate([{"n": n} for n in range(5)], "Blog", "blog", 2)
+        self.assertEqual(
+            list(pages),
+            [
+                os.path.join("blog", "index.html"),
+                os.path.join("blog", "page", "2", "index.html"),
+                os.path.join("blog", "page", "3", "index.html"),
+            ],
+        )
+        second = pages[listing_path("blog", 2)]
+        self.assertEqual(second["items"], [{"n": 2}, {"n": 3}])
+        self.assertEqual(second["newer"], "/blog/")
+        self.assertEqual(second["older"], "/blog/page/3/")
+        self.assertIsNone(pages[listing_path("blog", 1)]["newer"])
+        self.assertIsNone(pages[listing_path("blog", 3)]["older"])
+
+    def test_empty_listing_has_one_page(self):
+        self.assertEqual(
+            paginate([], "Blog", "blog", 10),
+            {
+                listing_path("blog", 1): {
+                    "title": "Blog",
+                    "items": [],
+                    "newer": None,
+                    "older": None,
+                }
+            },
+        )
+
+    def test_tag_slug(self):
+        self.assertEqual(tag_slug("Middle Earth!"), "middle-earth")
+
+
+class TestBlog(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.content = os.path.join(tmp.name, "content")
+        self.dest = os.path.join(tmp.name, "docs")
+        self.template = os.path.join(tmp.name, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        post_tags = ["tolkien", "tolkien, songs", "songs", "tolkien"]
+        for day, tags in enumerate(post_tags, start=1):
+            self.write_post(day, tags, f"summary of [post {day}](/blog/post{day}/)")
+
+    def write_post(self, day: int, tags: str, summary: str) -> None:
+        write_file(
+            os.path.join(self.content, "blog", f"post{day}", "index.md"),
+            f"---\ndate: 2024-01-0{day}\ntags: {tags}\n---\n"
+            f"# Post {day}\n\n{summary}\n\nthe rest",
+        )
+
+    def pages(self) -> list[tuple[str, str]]:
+        home = os.path.join(self.content, "index.md")
+        pages = [(home, os.path.join(self.dest, "index.html"))]
+        for name in sorted(os.listdir(os.path.join(self.content, "blog"))):
+            pages.append(
+                (
+                    os.path.join(self.content, "blog", name, "index.md"),
+                    os.path.join(self.dest, "blog", name, "index.html"),
+                )
+            )
+        return pages
+
+    def build(
+        self,
+        previous: BlogManifest | None = None,
+        page_size: int = 2,
+        content_pages: set[str] | None = None,
+    ) -> tuple[BlogManifest, int, list[str]]:
+        index, _ = index_metadata(self.pages(), self.dest, "/fp/", MetadataIndex())
+        listings = blog_pages(index, self.content, self.dest, page_size=page_size)
+        feed = feed_items(index, self.content, self.dest, feed_size=3)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            manifest, written = write_blog(
+                listings,
+                self.dest,
+                self.template,
+                "/fp/",
+                feed=feed,
+                site_url="https://example.com/",
+                previous=previous,
+                content_pages=content_pages or set(),
+            )
+        generated = [
+            os.path.relpath(line.split()[-1], self.dest)
+            for line in output.getvalue().splitlines()
+            if line.startswith("Generating")
+        ]
+        return manifest, written, generated
+
+    def test_listings(self):
+        _, written, generated = self.build()
+        self.assertEqual(written, 6)
+        self.assertEqual(
+            sorted(generated),
+            [
+                os.path.join("blog", "atom.xml"),
+                os.path.join("blog", "index.html"),
+                os.path.join("blog", "page", "2", "index.html"),
+                os.path.join("blog", "tags", "songs", "index.html"),
+                os.path.join("blog", "tags", "tolkien", "index.html"),
+                os.path.join("blog", "tags", "tolkien", "page", "2", "index.html"),
+            ],
+        )
+        first = read_file(os.path.join(self.dest, "blog", "index.html"))
+        self.assertTrue(first.startswith("<title>Blog</title><div><h1>Blog</h1>"))
+        self.assertIn(
+            '<li><a href="/fp/blog/post4/">Post 4</a>'
+            '<time datetime="2024-01-04">2024-01-04</time>'
+            '<p class="tags"><a href="/fp/blog/tags/tolkien/">tolkien</a></p>'
+            '<p>summary of <a href="/fp/blog/post4/">post 4</a></p></li>',
+            first,
+        )
+        self.assertLess(first.index("Post 4"), first.index("Post 3"))
+        self.assertNotIn("Post 2", first)
+        self.assertIn('<nav><a href="/fp/blog/page/2/">Older posts</a></nav>', first)
+        songs = os.path.join(self.dest, "blog", "tags", "songs", "index.html")
+        songs = read_file(songs)
+        self.assertIn("Posts tagged songs", songs)
+        self.assertIn("Post 3", songs)
+        self.assertIn("Post 2", songs)
+        self.assertNotIn("Post 4", songs)
+
+    def test_feed(self):
+        self.build()
+        feed = ElementTree.parse(os.path.join(self.dest, "blog", "atom.xml"))
+        self.assertEqual(feed.find(f"{ATOM}title").text, "Blog")
+        self.assertEqual(feed.find(f"{ATOM}author/{ATOM}name").text, "example.com")
+        self.assertEqual(feed.find(f"{ATOM}updated").text, "2024-01-04T00:00:00Z")
+        entries = feed.findall(f"{ATOM}entry")
+        self.assertEqual(
+            [entry.find(f"{ATOM}id").text for entry in entries],
+            [
+                "https://example.com/fp/blog/post4/",
+                "https://example.com/fp/blog/post3/",
+                "https://example.com/fp/blog/post2/",
+            ],
+        )
+        self.assertEqual(
+            entries[0].find(f"{ATOM}summary").text,
+            '<p>summary of <a href="https://example.com/fp/blog/post4/">post 4</a></p>',
+        )
+        categories = entries[1].findall(f"{ATOM}category")
+        self.assertEqual([category.get("term") for category in categories], ["songs"])
+
+    def test_feed_title_and_author(self):
+        index, _ = index_metadata(self.pages(), self.dest, "/", MetadataIndex())
+        with contextlib.redirect_stdout(io.StringIO()):
+            manifest, _ = write_blog(
+                {},
+                self.dest,
+                self.template,
+                feed=feed_items(index, self.content, self.dest),
+                site_url="https://example.com",
+                feed_title="Songs & tales",
+                feed_author="Tom",
+            )
+            _, written = write_blog(
+                {},
+                self.dest,
+                self.template,
+                feed=feed_items(index, self.content, self.dest),
+                site_url="https://example.com",
+                feed_title="Songs & tales",
+                feed_author="Goldberry",
+                previous=manifest,
+            )
+        self.assertEqual(written, 1)
+        feed = ElementTree.parse(os.path.join(self.dest, "blog", "atom.xml"))
+        self.assertEqual(feed.find(f"{ATOM}title").text, "Songs & tales")
+        self.assertEqual(feed.find(f"{ATOM}author/{ATOM}name").text, "Goldberry")
+
+    def test_content_page_wins_over_listing(self):
+        index_page = os.path.join("blog", "index.html")
+        manifest, _, _ = self.build()
+        write_file(os.path.join(self.dest, index_page), "written from index.md")
+        again, _, generated = self.build(manifest, content_pages={index_page})
+        self.assertNotIn(index_page, generated)
+        self.assertNotIn(index_page, again.pages)
+        self.assertIn(os.path.join("blog", "page", "2", "index.html"), again.pages)
+        self.assertEqual(
+            read_file(os.path.join(self.dest, index_page)), "written from index.md"
+        )
+
+    def test_unchanged_build_writes_nothing(self):
+        manifest, _, _ = self.build()
+        again, written, _ = self.build(manifest)
+        self.assertEqual(written, 0)
+        self.assertEqual(again, manifest)
+
+    def test_changed_post_rewrites_only_pages_including_it(self):
+        manifest, _, _ = self.build()
+        self.write_post(1, "tolkien", "a new summary")
+        with mock.patch.object(blog, "feed_entry", wraps=blog.feed_entry) as entry:
+            _, written, generated = self.build(manifest)
+        # NOTE: post 1 is too old for the feed and the first pages
+        entry.assert_not_called()
+        self.assertEqual(
+            sorted(generated),
+            [
+                os.path.join("blog", "page", "2", "index.html"),
+                os.path.join("blog", "tags", "tolkien", "page", "2", "index.html"),
+            ],
+        )
+        self.assertIn(
+            "a new summary",
+            read_file(os.path.join(self.dest, "blog", "page", "2", "index.html")),
+        )
+
+    def test_changed_post_rerenders_only_its_feed_entry(self):
+        manifest, _, _ = self.build()
+        self.write_post(3, "songs", "a new summary")
+        with mock.patch.object(blog, "feed_entry", wraps=blog.feed_entry) as entry:
+            _, _, generated = self.build(manifest)
+        self.assertEqual(entry.call_count, 1)
+        self.assertIn(os.path.join("blog", "atom.xml"), generated)
+        tolkien = os.path.join("blog", "tags", "tolkien", "index.html")
+        self.assertNotIn(tolkien, generated)
+        self.assertIn(
+            "a new summary", read_file(os.path.join(self.dest, "blog", "atom.xml"))
+        )
+
+    def test_removed_listing_pages_are_deleted(self):
+        manifest, _, _ = self.build()
+        _, _, generated = self.build(manifest, page_size=10)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.dest, "blog", "page", "2", "index.html"))
+        )
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog", "page")))
+        self.assertIn(os.path.join("blog", "index.html"), generated)
+
+    def test_drafts_are_not_listed(self):
+        write_file(
+            os.path.join(self.content, "blog", "post9", "index.md"),
+            "---\ndate: 2024-01-09\ndraft: true\n---\n# Draft",
+        )
+        self.build()
+        self.assertNotIn(
+            "Draft", read_file(os.path.join(self.dest, "blog", "index.html"))
+        )
+        self.assertNotIn(
+            "Draft", read_file(os.path.join(self.dest, "blog", "atom.xml"))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from build_manifest import BuildManifest, hash_bytes, hash_file
+
+
+class TestBuildManifest(unittest.TestCase):
+    def test_hash_file_matches_hash_bytes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "page.md")
+            with open(path, mode="wb") as f:
+                f.write(b"# Hello")
+            self.assertEqual(hash_file(path), hash_bytes(b"# Hello"))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cache", "manifest.json")
+            manifest = BuildManifest(
+                "abc", "/flowery-press/", rewrites={"assets": {"a.css": "a.1.css"}}
+            )
+            manifest.add_page("content/index.md", "123", "docs/index.html")
+            manifest.save(path)
+            self.assertEqual(BuildManifest.load(path), manifest)
+
+    def test_load_missing(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = BuildManifest.load(os.path.join(tmp, "manifest.json"))
+            self.assertEqual(manifest, BuildManifest())
+
+    def test_load_corrupt(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "manifest.json")
+            with open(path, mode="w") as f:
+                f.write("{not json")
+            self.assertEqual(BuildManifest.load(path), BuildManifest())
+
+    def test_is_page_current(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            dest = os.path.join(tmp, "index.html")
+            manifest = BuildManifest()
+            manifest.add_page("content/index.md", "123", dest)
+            self.assertFalse(manifest.is_page_current("content/index.md", "123", dest))
+            with open(dest, mode="w") as f:
+                f.write("<html></html>")
+            self.assertTrue(manifest.is_page_current("content/index.md", "123", dest))
+            self.assertFalse(manifest.is_page_current("content/index.md", "456", dest))
+            self.assertFalse(manifest.is_page_current("content/other.md", "123", dest))
+
+
+if __name__ == "__main__":
+    unittest.main()
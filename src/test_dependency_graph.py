@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+from dependency_graph import DependencyGraph, linked_urls, url_path
+from htmlnode import LeafNode, ParentNode
+from markdown_parsing import markdown_to_html_node
+from fixtures import write_file
+
+
+class TestDependencyGraph(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.static = os.path.join(tmp.name, "static")
+        self.dest = os.path.join(tmp.name, "docs")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "tom.png"), "png")
+        self.home = os.path.join(self.dest, "index.html")
+        self.post = os.path.join(self.dest, "blog", "post", "index.html")
+        self.graph = DependencyGraph(self.static)
+        self.graph.add_page(
+            self.home,
+            "content/index.md",
+            "template.html",
+            ["index.css", "blog/post/", "images/tom.png", "nowhere"],
+        )
+        self.graph.add_page(
+            self.post, "content/blog/post/index.md", "template.html", ["index.css", ""]
+        )
+
+    def test_url_path(self):
+        self.assertEqual(url_path("/images/tom.png"), "images/tom.png")
+        self.assertEqual(url_path("/blog/?page=2#top"), "blog/")
+        self.assertIsNone(url_path("https://example.com/"))
+        self.assertIsNone(url_path("relative.html"))
+
+    def test_linked_urls(self):
+        node = markdown_to_html_node(
+            "# [home](/)\n\n- ![tom](/images/tom.png)\n- [out](https://x.org)"
+        )
+        self.assertEqual(linked_urls(node), ["", "images/tom.png"])
+        self.assertEqual(linked_urls(ParentNode("p", [LeafNode("a", "no href")])), [])
+
+    def test_dependencies(self):
+        self.assertEqual(
+            self.graph.dependencies(self.home, self.dest),
+            {
+                "source": ["content/index.md"],
+                "template": ["template.html"],
+                "asset": [
+                    os.path.join(self.static, "images", "tom.png"),
+                    os.path.join(self.static, "index.css"),
+                ],
+                "page": [self.post],
+                "missing": ["/nowhere"],
+            },
+        )
+        self.assertEqual(
+            self.graph.dependencies(self.post, self.dest)["page"], [self.home]
+        )
+
+    def test_dependents(self):
+        self.assertEqual(
+            self.graph.dependents(os.path.join(self.static, "index.css"), self.dest),
+            [self.post, self.home],
+        )
+        self.assertEqual(
+            self.graph.dependents(
+                os.path.join(self.static, "images", "tom.png"), self.dest
+            ),
+            [self.home],
+        )
+        self.assertEqual(self.graph.dependents(self.home, self.dest), [self.post])
+        self.assertEqual(
+            self.graph.dependents("template.html", self.dest), [self.post, self.home]
+        )
+
+    def test_referencing(self):
+        self.assertEqual(self.graph.referencing({"images/tom.png"}), {self.home})
+        self.assertEqual(self.graph.referencing({"other.css"}), set())
+
+    def test_retain(self):
+        self.graph.retain({self.post})
+        self.assertEqual(list(self.graph.pages), [self.post])
+
+    def test_save_and_load(self):
+        path = os.path.join(self.dest, "dependencies.json")
+        self.graph.save(path)
+        self.assertEqual(DependencyGraph.load(path), self.graph)
+        self.assertEqual(
+            DependencyGraph.load(os.path.join(self.dest, "missing.json"), self.static),
+            DependencyGraph(self.static),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+import urllib.request
+
+from devserver import (
+    RELOAD_SCRIPT,
+    PollingWatcher,
+    ReloadNotifier,
+    SiteRebuilder,
+    make_server,
+)
+from fixtures import read_file, write_file
+
+
+class TestPollingWatcher(unittest.TestCase):
+    def test_poll(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            page = os.path.join(tmp, "content", "index.md")
+            write_file(page, "# Home")
+            watcher = PollingWatcher([os.path.join(tmp, "content")])
+            self.assertEqual(watcher.poll(), set())
+
+            write_file(page, "# New Home")
+            self.assertEqual(watcher.poll(), {page})
+
+            other = os.path.join(tmp, "content", "blog", "index.md")
+            write_file(other, "# Blog")
+            write_file(os.path.join(tmp, "content", ".index.md.swp"), "swap")
+            self.assertEqual(watcher.poll(), {other})
+
+            os.remove(page)
+            self.assertEqual(watcher.poll(), {page})
+
+
+class TestSiteRebuilder(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.content = os.path.join(tmp.name, "content")
+        self.static = os.path.join(tmp.name, "static")
+        self.dest = os.path.join(tmp.name, "docs")
+        self.template = os.path.join(tmp.name, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "index.md"), "# Blog")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        self.rebuilder = SiteRebuilder(
+            self.content, self.static, self.template, self.dest
+        )
+        self.rebuild()
+
+    def rebuild(self, changed: set[str] | None = None) -> int:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if changed is None:
+                return self.rebuilder.build_all()
+            return self.rebuilder.rebuild(changed)
+
+    def test_content_change(self):
+        page = os.path.join(self.content, "index.md")
+        write_file(page, "# New Home")
+        self.assertEqual(self.rebuild({page}), 1)
+        self.assertEqual(
+            read_file(os.path.join(self.dest, "index.html")),
+            "<title>New Home</title><div><h1>New Home</h1></div>",
+        )
+
+    def test_content_removed(self):
+        page = os.path.join(self.content, "blog", "index.md")
+        os.remove(page)
+        self.assertEqual(self.rebuild({page}), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+
+    def test_template_change(self):
+        write_file(self.template, "<h1>{{ Title }}</h1>")
+        self.assertEqual(self.rebuild({self.template}), 2)
+        self.assertEqual(
+            read_file(os.path.join(self.dest, "blog", "index.html")), "<h1>Blog</h1>"
+        )
+
+    def test_static_change(self):
+        stylesheet = os.path.join(self.static, "css", "extra.css")
+        write_file(stylesheet, "p {}")
+        self.assertEqual(self.rebuild({stylesheet}), 1)
+        self.assertEqual(read_file(os.path.join(self.dest, "css", "extra.css")), "p {}")
+        os.remove(stylesheet)
+        self.rebuild({stylesheet})
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "css", "extra.css")))
+
+    def test_broken_page_is_skipped(self):
+        page = os.path.join(self.content, "index.md")
+        write_file(page, "no title")
+        self.assertEqual(self.rebuild({page}), 0)
+
+
+class TestReloadNotifier(unittest.TestCase):
+    def test_wait_times_out(self):
+        notifier = ReloadNotifier()
+        self.assertEqual(notifier.wait(0, timeout=0.01), 0)
+
+    def test_wait_wakes_up(self):
+        notifier = ReloadNotifier()
+        threading.Timer(0.01, notifier.notify).start()
+        self.assertEqual(notifier.wait(0, timeout=5), 1)
+
+
+class TestDevServer(unittest.TestCase):
+    def test_html_gets_reload_script(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            write_file(os.path.join(tmp, "index.html"), "<body><p>hi</p></body>")
+            write_file(os.path.join(tmp, "index.css"), "body {}")
+            server = make_server(tmp, 0, ReloadNotifier())
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+            url = f"http://localhost:{server.server_address[1]}"
+            with contextlib.redirect_stderr(io.StringIO()):
+                with urllib.request.urlopen(f"{url}/") as response:
+                    self.assertEqual(
+                        response.read().decode(),
+                        f"<body><p>hi</p>{RELOAD_SCRIPT}</body>",
+                    )
+                with urllib.request.urlopen(f"{url}/index.css") as response:
+                    self.assertEqual(response.read().decode(), "body {}")
+
+
+if __name__ == "__main__":
+    unittest.main()
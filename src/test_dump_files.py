@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+
+from dump_files import copy_file, scan_tree, sync_files
+from fixtures import read_file, write_file
+
+
+class TestSyncFiles(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.static = os.path.join(tmp.name, "static")
+        self.dest = os.path.join(tmp.name, "docs")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "tom.png"), "png")
+
+    def test_scan_tree(self):
+        self.assertEqual(
+            sorted(scan_tree(self.static)),
+            ["images/tom.png", "index.css"],
+        )
+        self.assertEqual(scan_tree(self.dest), {})
+
+    def test_first_sync_copies_everything(self):
+        stats = sync_files(self.static, self.dest)
+        self.assertEqual(stats.copied, 2)
+        self.assertEqual(stats.bytes_copied, 10)
+        self.assertEqual(read_file(os.path.join(self.dest, "images", "tom.png")), "png")
+
+    def test_second_sync_copies_nothing(self):
+        sync_files(self.static, self.dest)
+        stats = sync_files(self.static, self.dest)
+        self.assertEqual((stats.copied, stats.unchanged), (0, 2))
+
+    def test_changed_file_is_copied(self):
+        sync_files(self.static, self.dest)
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        stats = sync_files(self.static, self.dest)
+        self.assertEqual((stats.copied, stats.unchanged), (1, 1))
+        self.assertEqual(
+            read_file(os.path.join(self.dest, "index.css")), "body { margin: 0 }"
+        )
+
+    def test_orphans_removed_and_kept_pages_preserved(self):
+        sync_files(self.static, self.dest)
+        write_file(os.path.join(self.dest, "index.html"), "<p>home</p>")
+        write_file(os.path.join(self.dest, "old", "stale.html"), "<p>old</p>")
+        os.remove(os.path.join(self.static, "images", "tom.png"))
+        stats = sync_files(self.static, self.dest, keep={"index.html"})
+        self.assertEqual(stats.removed, 2)
+        self.assertEqual(sorted(os.listdir(self.dest)), ["index.css", "index.html"])
+
+    def test_checksum_skips_touched_file(self):
+        sync_files(self.static, self.dest)
+        source = os.path.join(self.static, "index.css")
+        os.utime(source, ns=(0, 0))
+        stats = sync_files(self.static, self.dest, checksum=True)
+        self.assertEqual((stats.copied, stats.unchanged), (0, 2))
+        self.assertEqual(os.stat(os.path.join(self.dest, "index.css")).st_mtime_ns, 0)
+
+    def test_link(self):
+        stats = sync_files(self.static, self.dest, link=True)
+        self.assertEqual(stats.linked + stats.copied, 2)
+        if stats.linked:
+            self.assertTrue(
+                os.path.samefile(
+                    os.path.join(self.static, "index.css"),
+                    os.path.join(self.dest, "index.css"),
+                )
+            )
+
+    def test_parallel_sync_matches_serial(self):
+        for i in range(20):
+            write_file(os.path.join(self.static, "many", f"{i}.txt"), str(i) * i)
+        stats = sync_files(self.static, self.dest, workers=4)
+        self.assertEqual(stats.copied, 22)
+        self.assertEqual(scan_tree(self.dest).keys(), scan_tree(self.static).keys())
+        self.assertEqual(read_file(os.path.join(self.dest, "many", "7.txt")), "7" * 7)
+        self.assertGreater(stats.throughput(), 0)
+
+    def test_missing_source(self):
+        self.assertRaises(
+            ValueError, sync_files, os.path.join(self.static, "nope"), self.dest
+        )
+
+    def test_copy_file_keeps_mtime(self):
+        source = os.path.join(self.static, "index.css")
+        target = os.path.join(self.static, "copy.css")
+        os.utime(source, ns=(1_000_000_000, 1_000_000_000))
+        self.assertFalse(copy_file(source, target))
+        self.assertEqual(read_file(target), "body {}")
+        self.assertEqual(os.stat(target).st_mtime_ns, 1_000_000_000)
+
+
+if __name__ == "__main__":
+    unittest.main()
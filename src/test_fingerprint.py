@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import fingerprint
+from build_manifest import hash_bytes
+from dump_files import sync_files
+from fingerprint import (
+    AssetManifest,
+    fingerprint_assets,
+    fingerprinted_path,
+    write_fingerprinted_files,
+)
+from fixtures import write_file
+
+
+class TestFingerprint(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.static = os.path.join(tmp.name, "static")
+        self.dest = os.path.join(tmp.name, "docs")
+        self.manifest_path = os.path.join(self.dest, "asset-manifest.json")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "tom.png"), "png")
+        write_file(os.path.join(self.static, "robots.txt"), "User-agent: *")
+
+    def test_fingerprinted_path(self):
+        self.assertEqual(
+            fingerprinted_path(os.path.join("images", "tom.png"), "0123456789abcdef"),
+            os.path.join("images", "tom.0123456789.png"),
+        )
+        self.assertEqual(
+            fingerprinted_path("LICENSE", "0123456789ab"), "LICENSE.0123456789"
+        )
+
+    def test_fingerprint_assets(self):
+        manifest = fingerprint_assets(self.static)
+        digest = hash_bytes(b"body {}")
+        self.assertEqual(
+            manifest.urls(),
+            {
+                "index.css": f"index.{digest[:10]}.css",
+                "images/tom.png": f"images/tom.{hash_bytes(b'png')[:10]}.png",
+            },
+        )
+
+    def test_unchanged_assets_are_not_hashed_again(self):
+        previous = fingerprint_assets(self.static)
+        with mock.patch.object(fingerprint, "hash_file") as hash_file:
+            self.assertEqual(fingerprint_assets(self.static, previous), previous)
+        hash_file.assert_not_called()
+
+    def test_changed_asset_gets_new_name(self):
+        previous = fingerprint_assets(self.static)
+        write_file(os.path.join(self.static, "index.css"), "body { margin: 0 }")
+        manifest = fingerprint_assets(self.static, previous)
+        self.assertNotEqual(manifest.urls()["index.css"], previous.urls()["index.css"])
+        self.assertEqual(
+            manifest.urls()["images/tom.png"], previous.urls()["images/tom.png"]
+        )
+
+    def test_write_fingerprinted_files(self):
+        manifest = fingerprint_assets(self.static)
+        keep = {entry["path"] for entry in manifest.assets.values()}
+        sync_files(self.static, self.dest, keep=keep)
+        self.assertEqual(write_fingerprinted_files(self.dest, manifest), 2)
+        self.assertEqual(write_fingerprinted_files(self.dest, manifest), 0)
+        with open(os.path.join(self.dest, manifest.urls()["index.css"])) as f:
+            self.assertEqual(f.read(), "body {}")
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.css")))
+
+    def test_save_and_load(self):
+        manifest = fingerprint_assets(self.static)
+        self.assertTrue(manifest.save(self.manifest_path))
+        self.assertEqual(AssetManifest.load(self.manifest_path), manifest)
+        self.assertFalse(manifest.save(self.manifest_path))
+        self.assertEqual(
+            AssetManifest.load(os.path.join(self.dest, "missing.json")),
+            AssetManifest(),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+
+from front_matter import (
+    FrontMatterReader,
+    parse_front_matter,
+    parse_value,
+    split_front_matter,
+)
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_parse_value(self):
+        self.assertEqual(parse_value(" [a, 'b c', ] "), ["a", "b c"])
+        self.assertEqual(parse_value("true"), True)
+        self.assertEqual(parse_value('"true"'), "true")
+        self.assertEqual(parse_value("Tom: Bombadil"), "Tom: Bombadil")
+
+    def test_parse_front_matter(self):
+        metadata = parse_front_matter(
+            [
+                "title: Tom: the oldest\n",
+                "\n",
+                "# a comment\n",
+                "date: 2024-03-01\n",
+                "tags: tolkien, songs\n",
+                "draft: false\n",
+            ]
+        )
+        self.assertEqual(
+            metadata,
+            {
+                "title": "Tom: the oldest",
+                "date": "2024-03-01",
+                "tags": ["tolkien", "songs"],
+                "draft": False,
+            },
+        )
+
+    def test_invalid_front_matter(self):
+        with self.assertRaises(ValueError):
+            parse_front_matter(["no separator"])
+        with self.assertRaises(ValueError):
+            parse_front_matter(["date: yesterday"])
+        with self.assertRaises(ValueError):
+            parse_front_matter(["draft: maybe"])
+
+    def test_split_front_matter(self):
+        markdown = "---\ntags: [a]\n---\n# Title\n\n---"
+        self.assertEqual(
+            split_front_matter(markdown), ({"tags": ["a"]}, "# Title\n\n---")
+        )
+        self.assertEqual(
+            split_front_matter("---\ntags: [a]\n---"), ({"tags": ["a"]}, "")
+        )
+
+    def test_split_without_front_matter(self):
+        for markdown in ("# Title\n\n---\n", "---\nnever: closed\n# Title", "---"):
+            self.assertEqual(split_front_matter(markdown), ({}, markdown))
+
+    def test_reader_matches_split(self):
+        for markdown in (
+            "---\ntitle: A\n---\n# Title\n\ntext",
+            "---\ntitle: A\n---",
+            "---\nnever: closed\n# Title",
+            "# Title\n---\n",
+            "",
+        ):
+            reader = FrontMatterReader(markdown.splitlines(keepends=True))
+            body = "".join(reader)
+            self.assertEqual((reader.metadata, body), split_front_matter(markdown))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,32 @@
+import contextlib
+import io
+import os
+import tempfile
 import unittest
+from unittest import mock
 
-from generate_page import extract_title
+import generate_page
+from generate_page import (
+    PageGenerationError,
+    Renderer,
+    TitleScanner,
+    extract_title,
+    find_pages,
+    generate_pages_incrementally,
+    generate_pages_pipelined,
+    generate_pages_recursively,
+    page_url,
+    render_many,
+)
+from block_cache import BlockCache
+from dependency_graph import DependencyGraph
+from front_matter import split_front_matter
+from profiling import PAGE_STAGES, BuildProfile
+from render_cache import RenderCache
+from search_index import page_terms
+from search_terms import PageTerms
+from template import load_template
+from fixtures import read_file, write_file
 
 
 class TestGeneratePage(unittest.TestCase):
@@ -61,3 +87,581 @@ class TestGeneratePage(unittest.TestCase):
         - prepare food
         """
         self.assertRaises(Exception, extract_title, markdown)
+
+    def test_extract_title_after_front_matter(self):
+        _, markdown = split_front_matter("---\n# draft: true\n---\n\n# Title")
+        self.assertEqual(extract_title(markdown), "Title")
+
+    def test_page_url(self):
+        self.assertEqual(page_url("docs/index.html", "docs", "/fp/"), "/fp/")
+        self.assertEqual(
+            page_url("docs/blog/a/index.html", "docs", "/fp/"), "/fp/blog/a/"
+        )
+        self.assertEqual(page_url("docs/about.html", "docs"), "/about.html")
+
+    def test_title_scanner(self):
+        markdown = "intro\n  # My todo-list\n\n# second h1\n"
+        lines = TitleScanner(io.StringIO(markdown))
+        self.assertEqual("".join(lines), markdown)
+        self.assertEqual(lines.title, extract_title(markdown))
+
+    def test_title_scanner_no_h1(self):
+        lines = TitleScanner(["## not a title\n"])
+        list(lines)
+        self.assertIsNone(lines.title)
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.content = os.path.join(tmp.name, "content")
+        self.dest = os.path.join(tmp.name, "docs")
+        self.template = os.path.join(tmp.name, "template.html")
+        self.manifest = os.path.join(tmp.name, ".flowery-cache", "manifest.json")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "post", "index.md"), "# Post")
+
+    def build(self, base_path="/", assets=None, graph=None) -> list[str]:
+        with (
+            mock.patch.object(
+                generate_page, "generate_page", wraps=generate_page.generate_page
+            ) as generate,
+            contextlib.redirect_stdout(io.StringIO()),
+        ):
+            generate_pages_incrementally(
+                self.content,
+                self.template,
+                self.dest,
+                base_path,
+                self.manifest,
+                assets=assets,
+                dependency_graph=graph,
+            )
+        return sorted(call.args[0] for call in generate.call_args_list)
+
+    def test_find_pages(self):
+        self.assertEqual(
+            sorted(find_pages(self.content, self.dest)),
+            [
+                (
+                    os.path.join(self.content, "blog", "post", "index.md"),
+                    os.path.join(self.dest, "blog", "post", "index.html"),
+                ),
+                (
+                    os.path.join(self.content, "index.md"),
+                    os.path.join(self.dest, "index.html"),
+                ),
+            ],
+        )
+
+    def test_first_build_renders_everything(self):
+        self.assertEqual(len(self.build()), 2)
+        self.assertEqual(
+            read_file(os.path.join(self.dest, "index.html")),
+            "<title>Home</title><div><h1>Home</h1></div>",
+        )
+
+    def test_unchanged_build_renders_nothing(self):
+        self.build()
+        self.assertEqual(self.build(), [])
+
+    def test_only_changed_page_is_rendered(self):
+        self.build()
+        write_file(os.path.join(self.content, "index.md"), "# New Home")
+        self.assertEqual(self.build(), [os.path.join(self.content, "index.md")])
+        self.assertEqual(
+            read_file(os.path.join(self.dest, "index.html")),
+            "<title>New Home</title><div><h1>New Home</h1></div>",
+        )
+
+    def test_missing_output_is_rendered(self):
+        self.build()
+        os.remove(os.path.join(self.dest, "index.html"))
+        self.assertEqual(self.build(), [os.path.join(self.content, "index.md")])
+
+    def test_template_change_renders_everything(self):
+        self.build()
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.assertEqual(len(self.build()), 2)
+
+    def test_base_path_change_renders_everything(self):
+        self.build()
+        self.assertEqual(len(self.build("/flowery-press/")), 2)
+
+    def test_assets_change_renders_everything(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n![tom](/tom.png)")
+        self.build(assets={"tom.png": "tom.0123456789.png"})
+        self.assertEqual(self.build(assets={"tom.png": "tom.0123456789.png"}), [])
+        self.assertEqual(len(self.build(assets={"tom.png": "tom.abcdefabcd.png"})), 2)
+        self.assertIn(
+            'src="/tom.abcdefabcd.png"',
+            read_file(os.path.join(self.dest, "index.html")),
+        )
+
+    def test_assets_change_renders_referencing_pages(self):
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n![tom](/tom.png)")
+        graph = DependencyGraph()
+        self.build(assets={"tom.png": "tom.0123456789.png"}, graph=graph)
+        self.assertEqual(
+            graph.pages[os.path.join(self.dest, "index.html")]["urls"], ["tom.png"]
+        )
+        self.assertEqual(
+            self.build(assets={"tom.png": "tom.abcdefabcd.png"}, graph=graph),
+            [os.path.join(self.content, "index.md")],
+        )
+        self.assertEqual(
+            self.build(
+                assets={"tom.png": "tom.abcdefabcd.png", "a.css": "a.1.css"},
+                graph=graph,
+            ),
+            [],
+        )
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post", "index.md"))
+        self.assertEqual(self.build(), [])
+        self.assertFalse(os.path.exists(os.path.join(self.dest, "blog")))
+        self.assertTrue(os.path.exists(os.path.join(self.dest, "index.html")))
+
+    def full_build(self, base_path="/") -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursively(
+                self.content,
+                self.template,
+                self.dest,
+                base_path,
+                manifest_path=self.manifest,
+            )
+
+    def test_full_build_with_other_base_path_renders_everything_again(self):
+        write_file(self.template, '<a href="/">{{ Title }}</a>{{ Content }}')
+        self.build()
+        self.full_build("/flowery-press/")
+        self.assertEqual(len(self.build()), 2)
+        self.assertEqual(
+            read_file(os.path.join(self.dest, "index.html")),
+            '<a href="/">Home</a><div><h1>Home</h1></div>',
+        )
+
+    def test_full_build_with_other_template_renders_everything_again(self):
+        self.build()
+        template = read_file(self.template)
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.full_build()
+        write_file(self.template, template)
+        self.assertEqual(len(self.build()), 2)
+        self.assertEqual(
+            read_file(os.path.join(self.dest, "index.html")),
+            "<title>Home</title><div><h1>Home</h1></div>",
+        )
+
+    def test_incremental_build_after_full_build_renders_nothing(self):
+        self.full_build()
+        self.assertEqual(self.build(), [])
+
+    def test_failed_page_of_full_build_is_rendered_again(self):
+        write_file(os.path.join(self.content, "index.md"), "no title")
+        with self.assertRaises(Exception):
+            self.full_build()
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        self.assertIn(os.path.join(self.content, "index.md"), self.build())
+
+
+class TestParallelBuild(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.content = os.path.join(tmp.name, "content")
+        self.template = os.path.join(tmp.name, "template.html")
+        write_file(self.template, '<title>{{ Title }}</title><a href="/">{{ Content }}')
+        for i in range(8):
+            write_file(
+                os.path.join(self.content, f"post{i}", "index.md"),
+                f"# Post {i}\n\nSome **bold** [link](/post{i})\n\n- a\n- b",
+            )
+
+    def build(self, dest: str, jobs: int) -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursively(
+                self.content, self.template, dest, "/flowery-press/", jobs
+            )
+
+    def test_parallel_output_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        parallel = os.path.join(self.root, "parallel")
+        self.build(serial, 1)
+        self.build(parallel, 4)
+        for i in range(8):
+            path = os.path.join(f"post{i}", "index.html")
+            self.assertEqual(
+                read_file(os.path.join(parallel, path)),
+                read_file(os.path.join(serial, path)),
+            )
+
+    def test_profiled_output_matches_serial(self):
+        plain = os.path.join(self.root, "plain")
+        profiled = os.path.join(self.root, "profiled")
+        self.build(plain, 1)
+        build_profile = BuildProfile()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursively(
+                self.content,
+                self.template,
+                profiled,
+                "/flowery-press/",
+                jobs=2,
+                build_profile=build_profile,
+            )
+        self.assertEqual(len(build_profile.pages), 8)
+        for page in build_profile.pages:
+            self.assertEqual(set(page.timings), set(PAGE_STAGES))
+        for i in range(8):
+            path = os.path.join(f"post{i}", "index.html")
+            self.assertEqual(
+                read_file(os.path.join(profiled, path)),
+                read_file(os.path.join(plain, path)),
+            )
+
+    def test_profiled_inline_size_is_inline_markdown(self):
+        write_file(
+            os.path.join(self.content, "code", "index.md"),
+            "# Code\n\n> a *b*\n\n```\nnot inline\n```",
+        )
+        build_profile = BuildProfile()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursively(
+                os.path.join(self.content, "code"),
+                self.template,
+                os.path.join(self.root, "docs"),
+                build_profile=build_profile,
+            )
+        [page] = build_profile.pages
+        self.assertEqual(page.sizes["inline"], len("Code") + len("a *b*"))
+
+    def test_block_cache_counts_across_workers(self):
+        for i in range(4):
+            write_file(
+                os.path.join(self.content, f"shared{i}", "index.md"),
+                f"# Shared {i}\n\nthe same _footer_ everywhere",
+            )
+        for jobs in (1, 3):
+            block_cache = BlockCache()
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursively(
+                    self.content,
+                    self.template,
+                    os.path.join(self.root, f"docs{jobs}"),
+                    jobs=jobs,
+                    block_cache=block_cache,
+                )
+            self.assertEqual(block_cache.hits + block_cache.misses, 32)
+            self.assertGreaterEqual(block_cache.hits, 1)
+
+    def test_render_cache_reused_across_builds(self):
+        plain = os.path.join(self.root, "plain")
+        self.build(plain, 1)
+        cache_dir = os.path.join(self.root, "cache")
+        for jobs, build in ((2, "cold"), (1, "warm")):
+            render_cache = RenderCache(cache_dir)
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursively(
+                    self.content,
+                    self.template,
+                    os.path.join(self.root, build),
+                    "/flowery-press/",
+                    jobs,
+                    render_cache=render_cache,
+                )
+            for i in range(8):
+                path = os.path.join(f"post{i}", "index.html")
+                self.assertEqual(
+                    read_file(os.path.join(self.root, build, path)),
+                    read_file(os.path.join(plain, path)),
+                )
+        self.assertEqual((render_cache.hits, render_cache.misses), (8, 0))
+
+    def test_search_terms_collected_by_every_build(self):
+        expected = {
+            os.path.join(self.content, f"post{i}", "index.md"): PageTerms(
+                f"Post {i}",
+                page_terms(f"# Post {i}\n\nSome **bold** [link](/)\n\n- a\n- b"),
+            )
+            for i in range(8)
+        }
+        cache_dir = os.path.join(self.root, "cache")
+        builds = {
+            "serial": {},
+            "parallel": {"jobs": 3},
+            "pipelined": {"io_workers": 2},
+            "profiled": {"build_profile": BuildProfile()},
+            "cold": {"render_cache": RenderCache(cache_dir)},
+        }
+        for build, kwargs in builds.items():
+            search_terms = {}
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_pages_recursively(
+                    self.content,
+                    self.template,
+                    os.path.join(self.root, build),
+                    search_terms=search_terms,
+                    **kwargs,
+                )
+            self.assertEqual(search_terms, expected, build)
+        # NOTE: pages read back from the render cache are never parsed
+        search_terms = {}
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursively(
+                self.content,
+                self.template,
+                os.path.join(self.root, "warm"),
+                render_cache=RenderCache(cache_dir),
+                search_terms=search_terms,
+            )
+        self.assertEqual(search_terms, {})
+
+    def test_parallel_reports_every_failing_page(self):
+        write_file(os.path.join(self.content, "broken1", "index.md"), "no title")
+        write_file(os.path.join(self.content, "broken2", "index.md"), "a _b")
+        with self.assertRaises(PageGenerationError) as cm:
+            self.build(os.path.join(self.root, "docs"), 4)
+        self.assertEqual(
+            sorted(source for source, _ in cm.exception.failures),
+            [
+                os.path.join(self.content, "broken1", "index.md"),
+                os.path.join(self.content, "broken2", "index.md"),
+            ],
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(self.root, "docs", "post0", "index.html"))
+        )
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_front_matter_is_not_rendered(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        template = os.path.join(tmp.name, "template.html")
+        write_file(template, "<title>{{ Title }}</title>{{ Content }}")
+        for name, front_matter in (("plain", ""), ("meta", "---\ntags: [a]\n---\n")):
+            for i in range(2):
+                write_file(
+                    os.path.join(tmp.name, name, f"post{i}.md"),
+                    f"{front_matter}# Post {i}\n\n---\n\ntext",
+                )
+        builds = {
+            "streamed": {},
+            "cached": {"render_cache": RenderCache(os.path.join(tmp.name, "c"))},
+            "profiled": {"build_profile": BuildProfile()},
+            "pipelined": {"io_workers": 2},
+        }
+        for build, kwargs in builds.items():
+            for name in ("plain", "meta"):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    generate_pages_recursively(
+                        os.path.join(tmp.name, name),
+                        template,
+                        os.path.join(tmp.name, f"{build}-{name}"),
+                        **kwargs,
+                    )
+            for i in range(2):
+                meta = os.path.join(tmp.name, f"{build}-meta", f"post{i}.html")
+                plain = os.path.join(tmp.name, f"{build}-plain", f"post{i}.html")
+                self.assertEqual(read_file(meta), read_file(plain))
+        [(_, title, html)] = render_many([("a.md", "---\ndraft: true\n---\n# A")])
+        self.assertEqual((title, html), ("A", "<div><h1>A</h1></div>"))
+
+
+class TestPipelinedBuild(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.content = os.path.join(tmp.name, "content")
+        self.template = os.path.join(tmp.name, "template.html")
+        write_file(self.template, '<title>{{ Title }}</title><a href="/">{{ Content }}')
+        for i in range(12):
+            write_file(
+                os.path.join(self.content, f"post{i}", "index.md"),
+                f"# Post {i}\n\nSome **bold** [link](/post{i})\n\n- a\n- b",
+            )
+
+    def build(self, dest: str, io_workers: int, **kwargs) -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursively(
+                self.content,
+                self.template,
+                dest,
+                "/flowery-press/",
+                io_workers=io_workers,
+                **kwargs,
+            )
+
+    def assert_same_pages(self, dest: str, expected: str) -> None:
+        for i in range(12):
+            path = os.path.join(f"post{i}", "index.html")
+            self.assertEqual(
+                read_file(os.path.join(dest, path)),
+                read_file(os.path.join(expected, path)),
+            )
+
+    def test_output_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        pipelined = os.path.join(self.root, "pipelined")
+        serial_graph = DependencyGraph()
+        pipelined_graph = DependencyGraph()
+        self.build(serial, 0, dependency_graph=serial_graph)
+        with mock.patch.object(
+            generate_page, "generate_pages_pipelined", wraps=generate_pages_pipelined
+        ) as pipelined_build:
+            self.build(pipelined, 3, dependency_graph=pipelined_graph)
+        pipelined_build.assert_called_once()
+        self.assert_same_pages(pipelined, serial)
+        self.assertEqual(
+            [entry["urls"] for entry in pipelined_graph.pages.values()],
+            [entry["urls"] for entry in serial_graph.pages.values()],
+        )
+
+    def test_render_cache_output_matches_serial(self):
+        serial = os.path.join(self.root, "serial")
+        self.build(serial, 0)
+        render_cache = RenderCache(os.path.join(self.root, "cache"))
+        for build in ("cold", "warm"):
+            self.build(os.path.join(self.root, build), 2, render_cache=render_cache)
+            self.assert_same_pages(os.path.join(self.root, build), serial)
+        self.assertEqual((render_cache.hits, render_cache.misses), (12, 12))
+
+    def test_reads_ahead_at_most_queue_size(self):
+        pages = find_pages(self.content, os.path.join(self.root, "docs"))
+        in_flight = []
+        read_source = generate_page.read_source
+
+        def tracking_read(path: str) -> str:
+            in_flight.append(path)
+            return read_source(path)
+
+        rendered = []
+        render_page = generate_page._render_page
+
+        def tracking_render(*args):
+            rendered.append(len(in_flight))
+            return render_page(*args)
+
+        with (
+            contextlib.redirect_stdout(io.StringIO()),
+            mock.patch.object(generate_page, "read_source", tracking_read),
+            mock.patch.object(generate_page, "_render_page", tracking_render),
+        ):
+            generate_pages_pipelined(pages, self.template, io_workers=2, queue_size=3)
+        # NOTE: when the n-th page is rendered at most 3 more have been read
+        for n, read in enumerate(rendered, start=1):
+            self.assertLessEqual(read, n + 2)
+
+    def test_reports_every_failing_page(self):
+        write_file(os.path.join(self.content, "broken1", "index.md"), "no title")
+        write_file(os.path.join(self.content, "broken2", "index.md"), "a _b")
+        with self.assertRaises(PageGenerationError) as cm:
+            self.build(os.path.join(self.root, "docs"), 2)
+        self.assertEqual(
+            sorted(source for source, _ in cm.exception.failures),
+            [
+                os.path.join(self.content, "broken1", "index.md"),
+                os.path.join(self.content, "broken2", "index.md"),
+            ],
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(self.root, "docs", "post0", "index.html"))
+        )
+
+    def test_reports_failing_writes(self):
+        # NOTE: a directory in the way of the page makes its write fail
+        os.makedirs(os.path.join(self.root, "docs", "post3", "index.html"))
+        graph = DependencyGraph()
+        with self.assertRaises(PageGenerationError) as cm:
+            self.build(os.path.join(self.root, "docs"), 2, dependency_graph=graph)
+        self.assertEqual(
+            [source for source, _ in cm.exception.failures],
+            [os.path.join(self.content, "post3", "index.md")],
+        )
+        self.assertEqual(len(graph.pages), 11)
+
+
+class TestRenderMany(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.template_path = os.path.join(tmp.name, "template.html")
+        write_file(
+            self.template_path, '<title>{{ Title }}</title><a href="/">{{ Content }}'
+        )
+        self.documents = [
+            (f"post{i}.md", f"# Post {i}\n\nSome **bold** [link](/post{i})\n\n- a")
+            for i in range(10)
+        ]
+
+    def test_matches_generate_page(self):
+        template = load_template(self.template_path, "/flowery-press/")
+        results = list(render_many(self.documents, template))
+        self.assertEqual(
+            [path for path, _, _ in results], [path for path, _ in self.documents]
+        )
+        for path, markdown in self.documents:
+            write_file(os.path.join(self.root, "content", path), markdown)
+        with contextlib.redirect_stdout(io.StringIO()):
+            generate_pages_recursively(
+                os.path.join(self.root, "content"),
+                self.template_path,
+                os.path.join(self.root, "docs"),
+                "/flowery-press/",
+            )
+        for i, (_, title, html) in enumerate(results):
+            self.assertEqual(title, f"Post {i}")
+            self.assertEqual(
+                html, read_file(os.path.join(self.root, "docs", f"post{i}.html"))
+            )
+
+    def test_without_template_renders_content(self):
+        [(path, title, html)] = render_many([("a.md", "# A\n\n_b_")])
+        self.assertEqual(
+            (path, title, html), ("a.md", "A", "<div><h1>A</h1><p><i>b</i></p></div>")
+        )
+
+    def test_parallel_matches_serial(self):
+        serial = list(render_many(self.documents))
+        with Renderer(jobs=3, batch_size=2) as renderer:
+            parallel = list(renderer.render_many(iter(self.documents)))
+            # NOTE: the worker pool is kept for the next batch
+            executor = renderer.executor
+            again = list(renderer.render_many(self.documents[:3]))
+            self.assertIs(renderer.executor, executor)
+        self.assertIsNone(renderer.executor)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(again, serial[:3])
+
+    def test_caches_count_across_workers(self):
+        documents = self.documents + self.documents
+        for jobs in (1, 2):
+            block_cache = BlockCache()
+            render_cache = RenderCache(os.path.join(self.root, f"cache{jobs}"))
+            with Renderer(None, jobs, block_cache, render_cache, batch_size=5) as r:
+                list(r.render_many(documents[:10]))
+                list(r.render_many(documents[10:]))
+            self.assertEqual((render_cache.hits, render_cache.misses), (10, 10))
+            self.assertEqual(block_cache.hits + block_cache.misses, 30)
+
+    def test_reports_every_failing_document(self):
+        documents = [("broken.md", "no title")] + self.documents + [("b.md", "a _b")]
+        for jobs in (1, 3):
+            rendered = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                with self.assertRaises(PageGenerationError) as cm:
+                    for path, _, _ in render_many(documents, jobs=jobs):
+                        rendered.append(path)
+            self.assertEqual(
+                [path for path, _ in cm.exception.failures], ["broken.md", "b.md"]
+            )
+            self.assertEqual(rendered, [path for path, _ in self.documents])
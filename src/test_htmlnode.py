@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from htmlnode import HTMLNode, LeafNode, ParentNode
@@ -94,6 +95,48 @@ class TestHTMLNode(unittest.TestCase):
             "<div><span><b>grandchild</b></span></div>",
         )
 
+    def test_write_html_chunks(self):
+        node = ParentNode(
+            "div",
+            [
+                ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text")]),
+                LeafNode("a", "link", {"href": "/home"}),
+            ],
+        )
+        chunks = []
+        node.write_html(chunks.append)
+        self.assertEqual(
+            chunks,
+            [
+                "<div>",
+                "<p>",
+                "<b>bold</b>",
+                " text",
+                "</p>",
+                '<a href="/home">link</a>',
+                "</div>",
+            ],
+        )
+        self.assertEqual("".join(chunks), node.to_html())
+
+    def test_write_html_to_file(self):
+        node = ParentNode("ul", [ParentNode("li", [LeafNode(None, "item")])])
+        buffer = io.StringIO()
+        node.write_html(buffer.write)
+        self.assertEqual(buffer.getvalue(), "<ul><li>item</li></ul>")
+
+    def test_write_html_no_children(self):
+        node = ParentNode("div", [])
+        self.assertRaises(ValueError, node.write_html, [].append)
+
+    def test_nodes_have_no_instance_dict(self):
+        for node in (HTMLNode("p"), LeafNode("b", "bold"), ParentNode("p", [])):
+            self.assertFalse(hasattr(node, "__dict__"))
+            self.assertRaises(AttributeError, setattr, node, "unknown", 1)
+
+    def test_html_node_to_html_not_implemented(self):
+        self.assertRaises(NotImplementedError, HTMLNode("p", "text").to_html)
+
 
 if __name__ == "__main__":
     unittest.main()
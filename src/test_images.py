@@ -0,0 +1,123 @@
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import images
+from images import (
+    Image,
+    ImageIndex,
+    index_images,
+    read_image_size,
+    variant_path,
+    write_variants,
+)
+from fixtures import write_bytes
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR"
+
+
+def png(width: int, height: int) -> bytes:
+    return PNG_HEADER + struct.pack(">II", width, height) + b"\x08\x02\x00\x00\x00"
+
+
+def jpeg(width: int, height: int) -> bytes:
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + b"\x00" * 9
+    frame = struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    sof0 = b"\xff\xc0" + frame
+    return b"\xff\xd8" + app0 + b"\xff" + sof0 + b"\xff\xd9"
+
+
+class TestImages(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.static = os.path.join(tmp.name, "static")
+        self.dest = os.path.join(tmp.name, "docs")
+        write_bytes(os.path.join(self.static, "images", "tom.png"), png(1026, 388))
+        write_bytes(os.path.join(self.static, "images", "tim.jpg"), jpeg(640, 480))
+        write_bytes(os.path.join(self.static, "index.css"), b"body {}")
+
+    def test_read_image_size(self):
+        self.assertEqual(
+            read_image_size(os.path.join(self.static, "images", "tom.png")),
+            (1026, 388),
+        )
+        self.assertEqual(
+            read_image_size(os.path.join(self.static, "images", "tim.jpg")),
+            (640, 480),
+        )
+        self.assertIsNone(read_image_size(os.path.join(self.static, "index.css")))
+
+    def test_truncated_jpeg(self):
+        path = os.path.join(self.static, "broken.jpg")
+        write_bytes(path, jpeg(640, 480)[:12])
+        self.assertIsNone(read_image_size(path))
+
+    def test_attributes(self):
+        index = index_images(self.static)
+        self.assertEqual(
+            index.attributes(),
+            {
+                "images/tom.png": ' width="1026" height="388"',
+                "images/tim.jpg": ' width="640" height="480"',
+            },
+        )
+
+    def test_attributes_with_srcset(self):
+        index = index_images(self.static)
+        digest = index.files[os.path.join("images", "tim.jpg")]["hash"]
+        self.assertEqual(
+            index.attributes("/flowery-press/", [320, 960])["images/tim.jpg"],
+            ' width="640" height="480" srcset="'
+            f"/flowery-press/images/tim.{digest[:10]}.320w.jpg 320w, "
+            '/flowery-press/images/tim.jpg 640w"',
+        )
+        self.assertEqual(
+            [width for _, _, width in index.variants([320, 960])], [320, 320, 960]
+        )
+
+    def test_unchanged_images_are_not_read_again(self):
+        previous = index_images(self.static)
+        with (
+            mock.patch.object(images, "hash_file") as hash_file,
+            mock.patch.object(images, "read_image_size") as read_size,
+        ):
+            self.assertEqual(index_images(self.static, previous), previous)
+        hash_file.assert_not_called()
+        read_size.assert_not_called()
+
+    def test_copied_image_is_not_read_again(self):
+        previous = index_images(self.static)
+        write_bytes(os.path.join(self.static, "copy.png"), png(1026, 388))
+        with mock.patch.object(images, "read_image_size") as read_size:
+            index = index_images(self.static, previous)
+        read_size.assert_not_called()
+        self.assertEqual(index.attributes()["copy.png"], ' width="1026" height="388"')
+
+    def test_save_and_load(self):
+        path = os.path.join(self.dest, "images.json")
+        index = index_images(self.static)
+        index.save(path)
+        self.assertEqual(ImageIndex.load(path), index)
+
+    def test_variant_path(self):
+        self.assertEqual(
+            variant_path("images/tom.png", "0123456789abcdef", 480),
+            "images/tom.0123456789.480w.png",
+        )
+
+    @unittest.skipIf(Image is None, "Pillow is not installed")
+    def test_write_variants(self):
+        path = os.path.join(self.static, "images", "tom.png")
+        Image.new("RGB", (1026, 388)).save(path)
+        index = index_images(self.static)
+        self.assertEqual(write_variants(index, self.static, self.dest, [513]), 1)
+        self.assertEqual(write_variants(index, self.static, self.dest, [513]), 0)
+        _, variant, _ = index.variants([513])[0]
+        self.assertEqual(read_image_size(os.path.join(self.dest, variant)), (513, 194))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+import tracemalloc
+import unittest
+from unittest import mock
+
+import generate_page
+from front_matter import FrontMatterReader, split_front_matter
+from generate_page import TitleScanner
+from mapped_markdown import (
+    MappedFile,
+    find_mapped_title,
+    iter_mapped_blocks,
+    split_mapped_front_matter,
+)
+from markdown_parsing import iter_blocks
+from fixtures import write_file
+
+DOCUMENTS = [
+    "",
+    "\n",
+    "# Title",
+    "# Title\n\nparagraph\nmore",
+    "\n\n\n# Title\n\n\n\nparagraph\n\n",
+    "  # Title  \n   \n  text  \n \t \n  more  \n\n",
+    "a\n  \nb\n\n  \n\nc",
+    "> quote\n> more\n\n>not\nquote",
+    "- a\n- b\n\n- a\nb",
+    "1. a\n2. b\n3. c\n\n1. a\n3. b",
+    "```\ncode\n\nmore\n```",
+    "```\ncode\n```",
+    "####### seven\n\n###### six\n\n#nospace\n\n#\ttab",
+    "# nbsp\n\n#　ideographic\n\n#é",
+    " # Title \n\n \n\n\x1cparagraph\x1c\n\n ",
+    "\x1c\n\n\x1f- a\n- b\x1e",
+    "text\n# not a title line\n\n# Title",
+    "## Sub\n\nx # y\n\n  # Title",
+    "---\ntitle: Front\ntags: a, b\n---\n# Title\n\nbody",
+    "---\ntitle: Front\n---",
+    "---\ntitle: Front\n---\n",
+    "  ---  \ntitle: Front\n ---\n\n# Title",
+    "---\ntitle: never closed\n\n# Title",
+    "---\ntitle: a---b\nrule: ----\n---\n# Title",
+    "# Title\n---\nnot: front matter\n---",
+]
+
+
+class TestMappedMarkdown(unittest.TestCase):
+    def assert_same_as_text_reader(self, markdown: str) -> None:
+        data = markdown.encode()
+        reader = FrontMatterReader(io.StringIO(markdown))
+        lines = TitleScanner(reader)
+        blocks = list(iter_blocks(lines))
+        metadata, start = split_mapped_front_matter(data)
+        self.assertEqual(metadata, reader.metadata, repr(markdown))
+        self.assertEqual(list(iter_mapped_blocks(data, start)), blocks, repr(markdown))
+        self.assertEqual(find_mapped_title(data, start), lines.title, repr(markdown))
+        self.assertEqual(data[start:].decode(), split_front_matter(markdown)[1])
+
+    def test_same_as_text_reader(self):
+        for markdown in DOCUMENTS:
+            self.assert_same_as_text_reader(markdown)
+
+    def test_same_as_text_reader_on_random_documents(self):
+        pieces = ["a", "é", " ", "\t", "\n", "\n", "\n\n", "#", "# ", ">", "- "]
+        pieces += ["1. ", "2. ", "```", " ", "\x1c", "---\n", "k: v\n"]
+        generator = random.Random(25)
+        for _ in range(2000):
+            markdown = "".join(generator.choices(pieces, k=generator.randint(0, 30)))
+            try:
+                split_front_matter(markdown)
+            except ValueError:
+                continue
+            self.assert_same_as_text_reader(markdown)
+
+    def test_empty_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "empty.md")
+            write_file(path, "")
+            with MappedFile(path) as mapped:
+                self.assertEqual(list(iter_mapped_blocks(mapped.data)), [])
+
+
+class TestGeneratePageMapped(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.template = os.path.join(tmp.name, "template.html")
+        write_file(self.template, "<title>{{ Title }}</title>{{ Content }}")
+
+    def write_source(self, markdown: str, newline: str | None = None) -> None:
+        with open(os.path.join(self.root, "page.md"), mode="w", newline=newline) as f:
+            f.write(markdown)
+
+    def build(self, mapped: bool) -> list[str]:
+        source = os.path.join(self.root, "page.md")
+        dest = os.path.join(self.root, "page.html")
+        min_size = 0 if mapped else generate_page.MMAP_MIN_SIZE
+        with (
+            mock.patch.object(generate_page, "MMAP_MIN_SIZE", min_size),
+            contextlib.redirect_stdout(io.StringIO()),
+        ):
+            return generate_page.generate_page(source, self.template, dest, "/fp/")
+
+    def generate(
+        self, markdown: str, mapped: bool, newline: str | None = None
+    ) -> tuple[str, list[str]]:
+        self.write_source(markdown, newline)
+        urls = self.build(mapped)
+        with open(os.path.join(self.root, "page.html"), mode="r") as f:
+            return f.read(), urls
+
+    def test_same_page_as_text_reader(self):
+        markdown = (
+            "---\ntitle: Front\n---\n# The _Title_\n\n"
+            "see [here](/here/) and ![img](/a.png)\n\n> quote\n\n"
+            "- a\n- b\n\n1. a\n2. b\n\n```\ncode\n```"
+        )
+        self.assertEqual(self.generate(markdown, True), self.generate(markdown, False))
+        _, urls = self.generate(markdown, True)
+        self.assertEqual(urls, ["here/", "a.png"])
+
+    def test_carriage_returns_fall_back_to_text_reader(self):
+        markdown = "# Title\n\nline\n\nmore"
+        with mock.patch.object(
+            generate_page, "iter_mapped_blocks", wraps=generate_page.iter_mapped_blocks
+        ) as mapped_blocks:
+            page, _ = self.generate(markdown, True, newline="\r\n")
+        mapped_blocks.assert_not_called()
+        self.assertEqual(page, self.generate(markdown, False)[0])
+
+    def test_missing_title(self):
+        with self.assertRaisesRegex(Exception, "no h1 header"):
+            self.generate("", True)
+
+    def test_memory_is_bounded_by_the_largest_block(self):
+        block = "some **bold** and _italic_ `code` text " * 20
+        markdown = "# Title\n\n" + "\n\n".join([block] * 2000)
+        self.write_source(markdown)
+        tracemalloc.start()
+        try:
+            self.build(True)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertGreater(len(markdown), 1_500_000)
+        self.assertLess(peak, len(markdown) // 4)
+
+    def test_pipelined_build_maps_huge_sources(self):
+        pages = []
+        for name, markdown in [("small", "# Small"), ("huge", "# Huge\n\n" + "a" * 99)]:
+            source = os.path.join(self.root, f"{name}.md")
+            write_file(source, markdown)
+            pages.append((source, os.path.join(self.root, f"{name}.html")))
+        with (
+            mock.patch.object(generate_page, "MMAP_MIN_SIZE", 50),
+            mock.patch.object(
+                generate_page, "read_source", wraps=generate_page.read_source
+            ) as read_source,
+            contextlib.redirect_stdout(io.StringIO()),
+        ):
+            generate_page.generate_pages_pipelined(pages, self.template, io_workers=2)
+        read_source.assert_called_once_with(pages[0][0])
+        with open(pages[1][1], mode="r") as f:
+            self.assertIn(f"<h1>Huge</h1><p>{'a' * 99}</p>", f.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
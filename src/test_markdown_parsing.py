@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from src.htmlnode import LeafNode, ParentNode
@@ -14,6 +15,8 @@ from markdown_parsing import (
     text_to_textnodes,
     extract_markdown_images,
     extract_markdown_links,
+    iter_blocks,
+    typed_blocks_to_html_node,
 )
 
 
@@ -206,6 +209,40 @@ class TestMarkdownParsing(unittest.TestCase):
             ],
         )
 
+    def test_text_to_textnodes_matches_split_pipeline(self):
+        texts = [
+            "plain text only",
+            "**bold** at the start and _italic at the end_",
+            "`code` and **bold** and _italic_ next to ![image](/a.png)[link](/b)",
+            "![first](/1.png) text [a](/a) text ![second](/2.png) [b](/b)",
+            "_italic with **bold** inside_ stays literal",
+            "empty ** ** and ____ markers",
+        ]
+        for text in texts:
+            nodes = split_nodes_delimiter(
+                [TextNode(text, TextType.PLAIN)], "_", TextType.ITALIC
+            )
+            nodes = split_nodes_delimiter(nodes, "**", TextType.BOLD)
+            nodes = split_nodes_delimiter(nodes, "`", TextType.CODE)
+            nodes = split_nodes_image(split_nodes_link(nodes))
+            self.assertListEqual(text_to_textnodes(text), nodes)
+
+    def test_text_to_textnodes_underscore_in_url(self):
+        self.assertListEqual(
+            text_to_textnodes("see [the docs](/my_docs) and `snake_case`"),
+            [
+                TextNode("see ", TextType.PLAIN),
+                TextNode("the docs", TextType.LINK, "/my_docs"),
+                TextNode(" and ", TextType.PLAIN),
+                TextNode("snake_case", TextType.CODE),
+            ],
+        )
+
+    def test_text_to_textnodes_unclosed_delimiter(self):
+        self.assertRaises(ValueError, text_to_textnodes, "this is **not closed")
+        self.assertRaises(ValueError, text_to_textnodes, "this is _not closed")
+        self.assertRaises(ValueError, text_to_textnodes, "this is `not closed")
+
     def test_markdown_to_blocks(self):
         markdown = """
 This is **bolded** paragraph
@@ -244,6 +281,60 @@ This is **bolded** paragraph
             ],
         )
 
+    def test_iter_blocks(self):
+        markdown = """
+# heading
+
+  This is a paragraph
+  \t
+with two lines  
+
+- a list
+- with items
+
+\t
+1. an ordered
+2. list
+
+> a quote
+> block
+
+```
+code
+```
+"""
+        self.assertEqual(
+            list(iter_blocks(io.StringIO(markdown))),
+            [
+                (BlockType.HEADING, "# heading"),
+                (
+                    BlockType.PARAGRAPH,
+                    "This is a paragraph\n  \t\nwith two lines",
+                ),
+                (BlockType.UNORDERED_LIST, "- a list\n- with items"),
+                (BlockType.ORDERED_LIST, "1. an ordered\n2. list"),
+                (BlockType.QUOTE, "> a quote\n> block"),
+                (BlockType.CODE, "```\ncode\n```"),
+            ],
+        )
+
+    def test_iter_blocks_matches_markdown_to_blocks(self):
+        markdown = "\n\n\n- a\n- b\n1. c\n\n  \n\n> q\n>\n\n1. x\n3. y\n  "
+        self.assertEqual(
+            list(iter_blocks(io.StringIO(markdown))),
+            [
+                (block_to_block_type(block), block)
+                for block in markdown_to_blocks(markdown)
+            ],
+        )
+
+    def test_typed_blocks_to_html_node(self):
+        markdown = "# title\n\nsome _text_\n\n- item"
+        self.assertEqual(
+            typed_blocks_to_html_node(iter_blocks(io.StringIO(markdown))).to_html(),
+            markdown_to_html_node(markdown).to_html(),
+        )
+
     def test_block_to_block_type(self):
         self.assertEqual(
             block_to_block_type("This is a **bolded** paragraph"), BlockType.PARAGRAPH
@@ -291,6 +382,17 @@ This is **bolded** paragraph
             BlockType.HEADING,
         )
 
+    def test_block_to_block_type_edge_cases(self):
+        self.assertEqual(block_to_block_type("#\th1"), BlockType.HEADING)
+        self.assertEqual(block_to_block_type("#"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("#h1"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("> a\nb"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("- a\n-b"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("2. a\n3. b"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("1. a\n2. b\n2. c"), BlockType.PARAGRAPH)
+        self.assertEqual(block_to_block_type("- a\n- "), BlockType.UNORDERED_LIST)
+        self.assertEqual(block_to_block_type(""), BlockType.PARAGRAPH)
+
     def test_paragraph(self):
         md = """
 This is **bolded** paragraph
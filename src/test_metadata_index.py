@@ -0,0 +1,147 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from metadata_index import (
+    MetadataIndex,
+    index_metadata,
+    read_header,
+    write_public_index,
+)
+from fixtures import write_file
+
+
+class TestMetadataIndex(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.content = os.path.join(tmp.name, "content")
+        self.dest = os.path.join(tmp.name, "docs")
+        posts = {
+            "index.md": "# Home",
+            os.path.join("blog", "index.md"): "# Blog",
+            os.path.join("blog", "tom", "index.md"): (
+                "---\ndate: 2024-03-01\ntags: [tolkien, songs]\n---\n# Tom"
+            ),
+            os.path.join("blog", "majesty", "index.md"): (
+                "---\ndate: 2024-05-01\ntags: tolkien\ntitle: Majesty\n---\n# M"
+            ),
+            os.path.join("blog", "draft", "index.md"): (
+                "---\ndate: 2024-06-01\ntags: [songs]\ndraft: true\n---\n# Draft"
+            ),
+            os.path.join("blog", "undated", "index.md"): "# Undated",
+        }
+        self.pages = []
+        for path, markdown in posts.items():
+            source_file_path = os.path.join(self.content, path)
+            write_file(source_file_path, markdown)
+            dest_file_path = os.path.join(self.dest, path.replace(".md", ".html"))
+            self.pages.append((source_file_path, dest_file_path))
+        self.blog = os.path.join(self.content, "blog")
+
+    def index(self, previous: MetadataIndex | None = None) -> tuple[MetadataIndex, int]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return index_metadata(self.pages, self.dest, "/fp/", previous)
+
+    def test_read_header_stops_at_title(self):
+        path = os.path.join(self.content, "long.md")
+        write_file(path, "---\ntags: [a]\n---\n# Long\n\n" + "text\n\n" * 100_000)
+        # NOTE: bytes that can't be decoded far behind the title only fail
+        #       a read of the whole file
+        with open(path, mode="ab") as f:
+            f.write(b"\xff\xfe")
+        self.assertEqual(
+            read_header(path), ({"tags": ["a"], "title": "Long"}, "<p>text</p>")
+        )
+
+    def test_read_header_summary(self):
+        path = os.path.join(self.content, "summary.md")
+        write_file(path, "intro\n\n# Title\n\n## Sub\n\nthe **first**\nlines\n\nmore")
+        self.assertEqual(
+            read_header(path),
+            ({"title": "Title"}, "<p>the <b>first</b> lines</p>"),
+        )
+        write_file(path, "---\nsummary: _short_\n---\n# Title\n\ntext")
+        self.assertEqual(
+            read_header(path),
+            ({"summary": "_short_", "title": "Title"}, "<p><i>short</i></p>"),
+        )
+        write_file(path, "# Title")
+        self.assertEqual(read_header(path), ({"title": "Title"}, None))
+
+    def test_posts_newest_first_without_drafts(self):
+        index, read = self.index()
+        self.assertEqual(read, 6)
+        posts = index.posts(self.blog)
+        self.assertEqual(
+            [entry["metadata"]["title"] for _, entry in posts],
+            ["Majesty", "Tom", "Undated"],
+        )
+        self.assertEqual(posts[0][1]["url"], "/fp/blog/majesty/")
+        self.assertEqual(len(index.posts(self.blog, drafts=True)), 4)
+
+    def test_tags(self):
+        index, _ = self.index()
+        self.assertEqual(
+            index.tags(self.blog),
+            {
+                "songs": [os.path.join(self.blog, "tom", "index.md")],
+                "tolkien": [
+                    os.path.join(self.blog, "majesty", "index.md"),
+                    os.path.join(self.blog, "tom", "index.md"),
+                ],
+            },
+        )
+
+    def test_unchanged_headers_are_not_read(self):
+        index, _ = self.index()
+        path = os.path.join(self.root, "metadata.json")
+        index.save(path)
+        write_file(self.pages[2][0], "---\ndate: 2024-03-02\n---\n# Tom")
+        again, read = self.index(MetadataIndex.load(path))
+        self.assertEqual(read, 1)
+        self.assertEqual(
+            again.pages[self.pages[2][0]]["metadata"],
+            {"date": "2024-03-02", "title": "Tom"},
+        )
+        self.assertEqual(again.pages[self.pages[0][0]], index.pages[self.pages[0][0]])
+
+    def test_broken_header_is_left_out(self):
+        write_file(self.pages[0][0], "---\ndate: soon\n---\n# Home")
+        index, _ = self.index()
+        self.assertNotIn(self.pages[0][0], index.pages)
+        self.assertEqual(len(index.pages), 5)
+
+    def test_write_public_index(self):
+        index, _ = self.index()
+        self.assertTrue(write_public_index(self.dest, index))
+        self.assertFalse(write_public_index(self.dest, index))
+        with open(os.path.join(self.dest, "metadata.json")) as f:
+            public = json.load(f)
+        self.assertEqual(
+            [page["url"] for page in public],
+            [
+                "/fp/",
+                "/fp/blog/",
+                "/fp/blog/majesty/",
+                "/fp/blog/tom/",
+                "/fp/blog/undated/",
+            ],
+        )
+        self.assertEqual(
+            public[2],
+            {
+                "url": "/fp/blog/majesty/",
+                "date": "2024-05-01",
+                "tags": ["tolkien"],
+                "title": "Majesty",
+            },
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import gzip
+import os
+import tempfile
+import unittest
+
+from precompress import (
+    CompressStats,
+    brotli,
+    compress_bytes,
+    compressed_variants,
+    precompress_tree,
+)
+from fixtures import write_file
+
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.page = "<p>" + "flowers " * 100 + "</p>"
+        write_file(os.path.join(self.root, "index.html"), self.page)
+        write_file(os.path.join(self.root, "blog", "index.css"), "body {}" * 100)
+        write_file(os.path.join(self.root, "tiny.html"), "<p>hi</p>")
+        write_file(os.path.join(self.root, "tom.png"), "png" * 200)
+
+    def test_writes_gzip_variants(self):
+        stats = precompress_tree(self.root, ["gzip"])
+        self.assertEqual((stats.compressed, stats.unchanged), (2, 0))
+        self.assertLess(stats.ratio(), 0.5)
+        with gzip.open(os.path.join(self.root, "index.html.gz"), mode="rt") as f:
+            self.assertEqual(f.read(), self.page)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "tiny.html.gz")))
+        self.assertFalse(os.path.exists(os.path.join(self.root, "tom.png.gz")))
+        self.assertEqual(
+            os.stat(os.path.join(self.root, "index.html.gz")).st_mtime_ns,
+            os.stat(os.path.join(self.root, "index.html")).st_mtime_ns,
+        )
+
+    def test_up_to_date_variants_are_skipped(self):
+        precompress_tree(self.root, ["gzip"], workers=1)
+        stats = precompress_tree(self.root, ["gzip"], workers=1)
+        expected = CompressStats()
+        expected.unchanged = 2
+        self.assertEqual(stats, expected)
+
+    def test_changed_file_is_compressed_again(self):
+        precompress_tree(self.root, ["gzip"])
+        write_file(os.path.join(self.root, "index.html"), "<p>changed</p>" * 50)
+        os.utime(os.path.join(self.root, "index.html"), ns=(0, 0))
+        stats = precompress_tree(self.root, ["gzip"])
+        self.assertEqual((stats.compressed, stats.unchanged), (1, 1))
+
+    def test_orphaned_variants_are_removed(self):
+        precompress_tree(self.root, ["gzip"])
+        write_file(os.path.join(self.root, "archive.tar.gz"), "not ours")
+        os.remove(os.path.join(self.root, "index.html"))
+        stats = precompress_tree(self.root, ["gzip"])
+        self.assertEqual(stats.removed, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "index.html.gz")))
+        self.assertTrue(os.path.exists(os.path.join(self.root, "archive.tar.gz")))
+
+    def test_compressed_variants(self):
+        self.assertEqual(
+            compressed_variants({"index.html", "tom.png"}, ["gzip", "br"]),
+            {"index.html.gz", "index.html.br"},
+        )
+
+    def test_gzip_output_is_reproducible(self):
+        data = self.page.encode()
+        self.assertEqual(compress_bytes(data, "gzip"), compress_bytes(data, "gzip"))
+
+    @unittest.skipIf(brotli is None, "brotli is not installed")
+    def test_writes_brotli_variants(self):
+        precompress_tree(self.root, ["br"])
+        with open(os.path.join(self.root, "index.html.br"), mode="rb") as f:
+            self.assertEqual(brotli.decompress(f.read()).decode(), self.page)
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, compress_bytes, b"data", "zstd")
+
+
+if __name__ == "__main__":
+    unittest.main()
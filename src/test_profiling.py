@@ -0,0 +1,66 @@
+import unittest
+
+from profiling import PAGE_STAGES, BuildProfile, PageProfile, format_bytes
+
+
+def page_profile(source_path: str, seconds: float) -> PageProfile:
+    profile = PageProfile(source_path)
+    for stage in PAGE_STAGES:
+        profile.timings[stage] = seconds / len(PAGE_STAGES)
+        profile.sizes[stage] = 100
+    return profile
+
+
+class TestProfiling(unittest.TestCase):
+    def test_stage_accumulates(self):
+        profile = PageProfile("index.md")
+        with profile.stage("read"):
+            pass
+        first = profile.timings["read"]
+        with profile.stage("read"):
+            pass
+        self.assertGreaterEqual(profile.timings["read"], first)
+        self.assertEqual(profile.total(), profile.timings["read"])
+
+    def test_stage_totals(self):
+        build = BuildProfile()
+        build.add(page_profile("a.md", 0.006))
+        build.add(page_profile("b.md", 0.012))
+        seconds, size = build.stage_totals()["parse"]
+        self.assertAlmostEqual(seconds, 0.003)
+        self.assertEqual(size, 200)
+
+    def test_slowest(self):
+        build = BuildProfile()
+        for name, seconds in (("a.md", 0.1), ("b.md", 0.3), ("c.md", 0.2)):
+            build.add(page_profile(name, seconds))
+        self.assertEqual(
+            [page.source_path for page in build.slowest(2)], ["b.md", "c.md"]
+        )
+
+    def test_histogram(self):
+        build = BuildProfile()
+        for seconds in (0.0005, 0.0015, 0.0016, 0.006):
+            build.add(page_profile("page.md", seconds))
+        self.assertEqual(
+            build.histogram(),
+            [("< 1 ms", 1), ("1-2 ms", 2), ("2-4 ms", 0), ("4-8 ms", 1)],
+        )
+
+    def test_summary(self):
+        build = BuildProfile()
+        build.add(page_profile("content/index.md", 0.002))
+        summary = build.summary()
+        self.assertIn("Build profile: 1 pages", summary)
+        self.assertIn("content/index.md", summary)
+        for stage in PAGE_STAGES:
+            self.assertIn(stage, summary)
+
+    def test_format_bytes(self):
+        self.assertEqual(format_bytes(512), "512 B")
+        self.assertEqual(format_bytes(2048), "2.0 KB")
+        self.assertEqual(format_bytes(3 * 1024 * 1024), "3.0 MB")
+
+
+if __name__ == "__main__":
+    unittest.main()
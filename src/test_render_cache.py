@@ -0,0 +1,65 @@
+import os
+import tempfile
+import time
+import unittest
+
+from render_cache import RenderCache, parser_version
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = RenderCache(os.path.join(tmp.name, "render"))
+
+    def set_last_used(self, key: str, seconds_ago: float) -> None:
+        last_used = time.time() - seconds_ago
+        os.utime(self.cache.path(key), (last_used, last_used))
+
+    def test_get_and_put(self):
+        key = self.cache.key("# title")
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, "<div><h1>title</h1></div>")
+        self.assertEqual(self.cache.get(key), "<div><h1>title</h1></div>")
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_key_depends_on_markdown_and_parser(self):
+        self.assertEqual(self.cache.key("# a"), self.cache.key("# a"))
+        self.assertNotEqual(self.cache.key("# a"), self.cache.key("# b"))
+        self.assertEqual(len(parser_version()), 64)
+
+    def test_put_replaces_without_leftovers(self):
+        key = self.cache.key("text")
+        self.cache.put(key, "<p>old</p>")
+        self.cache.put(key, "<p>new</p>")
+        self.assertEqual(self.cache.get(key), "<p>new</p>")
+        shard = os.path.dirname(self.cache.path(key))
+        self.assertEqual(os.listdir(shard), [f"{key}.html"])
+
+    def test_prune_by_age(self):
+        old, fresh = self.cache.key("old"), self.cache.key("fresh")
+        self.cache.put(old, "<p>old</p>")
+        self.cache.put(fresh, "<p>fresh</p>")
+        self.set_last_used(old, 10 * 24 * 60 * 60)
+        self.assertEqual(self.cache.prune(max_age_seconds=24 * 60 * 60), 1)
+        self.assertIsNone(self.cache.get(old))
+        self.assertEqual(self.cache.get(fresh), "<p>fresh</p>")
+
+    def test_prune_by_size_keeps_recently_used(self):
+        keys = [self.cache.key(f"page {i}") for i in range(3)]
+        for i, key in enumerate(keys):
+            self.cache.put(key, "x" * 100)
+            self.set_last_used(key, 100 - i)
+        self.cache.get(keys[0])
+        self.assertEqual(self.cache.prune(max_bytes=200), 1)
+        self.assertEqual(
+            sorted(path for path, _, _ in self.cache.entries()),
+            sorted([self.cache.path(keys[0]), self.cache.path(keys[2])]),
+        )
+
+    def test_prune_empty_cache(self):
+        self.assertEqual(self.cache.prune(max_bytes=0, max_age_seconds=0), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
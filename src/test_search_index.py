@@ -0,0 +1,194 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import search_index
+from markdown_parsing import markdown_to_html_node
+from search_index import (
+    SearchIndex,
+    decode_postings,
+    encode_postings,
+    index_pages,
+    page_terms,
+    shard_name,
+    write_index_files,
+)
+from search_terms import PageTerms
+from fixtures import write_file
+
+
+class TestTerms(unittest.TestCase):
+    def test_page_terms(self):
+        markdown = (
+            "# The _Hobbit_\n\n"
+            "In a hole [in the ground](/ground) lived\na **hobbit**\n\n"
+            "> Not a nasty hole\n\n"
+            "- dirty\n- wet\n\n"
+            "1. ![a hole](/hole.png)\n\n"
+            "```\nhobbit = hole\n```"
+        )
+        terms = page_terms(markdown)
+        self.assertEqual(terms["hobbit"], [1, 10, 19])
+        self.assertEqual(terms["hole"], [4, 14, 18, 20])
+        self.assertEqual(terms["ground"], [7])
+        self.assertNotIn("png", terms)
+        self.assertNotIn("", terms)
+
+    def test_page_terms_of_rendered_blocks(self):
+        terms = PageTerms("Title")
+        terms.add_node(markdown_to_html_node("a *b* [c d](/e)"))
+        terms.add_node(markdown_to_html_node("![c f](/g.png)\n\n```\nA = b\n```"))
+        self.assertEqual(
+            terms,
+            PageTerms(
+                "Title", {"a": [0, 6], "b": [1, 7], "c": [2, 4], "d": [3], "f": [5]}
+            ),
+        )
+
+    def test_shard_name(self):
+        self.assertEqual(shard_name("hello"), "68-65")
+        self.assertEqual(shard_name("a"), "61")
+        self.assertEqual(shard_name("éa", 1), "e9")
+
+    def test_postings_round_trip(self):
+        postings = [(7, [3]), (2, [0, 4, 10])]
+        encoded = encode_postings(postings)
+        self.assertEqual(encoded, [2, 3, 0, 4, 6, 5, 1, 3])
+        self.assertEqual(decode_postings(encoded), sorted(postings))
+
+
+class TestSearchIndex(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.content = os.path.join(tmp.name, "content")
+        self.dest = os.path.join(tmp.name, "docs")
+        self.cache = os.path.join(tmp.name, ".flowery-cache", "search.json")
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\nhello world")
+        write_file(
+            os.path.join(self.content, "blog", "a.md"), "# Post\n\nhello _again_"
+        )
+        self.pages = [
+            (
+                os.path.join(self.content, "index.md"),
+                os.path.join(self.dest, "index.html"),
+            ),
+            (
+                os.path.join(self.content, "blog", "a.md"),
+                os.path.join(self.dest, "blog", "a.html"),
+            ),
+        ]
+
+    def index(
+        self,
+        previous: SearchIndex | None = None,
+        generated: dict[str, PageTerms] | None = None,
+    ) -> tuple[SearchIndex, int]:
+        with contextlib.redirect_stdout(io.StringIO()):
+            return index_pages(self.pages, self.dest, "/", previous, generated)
+
+    def test_files(self):
+        index, tokenized = self.index()
+        self.assertEqual(tokenized, 2)
+        files = {path: json.loads(contents) for path, contents in index.files().items()}
+        self.assertEqual(
+            files[os.path.join("search", "pages.json")],
+            {
+                "version": 1,
+                "prefix_length": 2,
+                "pages": [["/blog/a.html", "Post"], ["/", "Home"]],
+            },
+        )
+        shard = files[os.path.join("search", "terms", "68-65.json")]
+        self.assertEqual(decode_postings(shard["hello"]), [(0, [1]), (1, [1])])
+        self.assertEqual(
+            sorted(files),
+            [
+                os.path.join("search", "pages.json"),
+                os.path.join("search", "terms", "61-67.json"),
+                os.path.join("search", "terms", "68-65.json"),
+                os.path.join("search", "terms", "68-6f.json"),
+                os.path.join("search", "terms", "70-6f.json"),
+                os.path.join("search", "terms", "77-6f.json"),
+            ],
+        )
+
+    def test_unchanged_pages_are_not_tokenized(self):
+        index, _ = self.index()
+        index.save(self.cache)
+        with mock.patch.object(search_index, "page_terms") as page_terms:
+            again, tokenized = self.index(SearchIndex.load(self.cache))
+        page_terms.assert_not_called()
+        self.assertEqual(tokenized, 0)
+        self.assertEqual(again, index)
+
+    def test_touched_page_with_same_contents_is_not_tokenized(self):
+        index, _ = self.index()
+        os.utime(self.pages[1][0], ns=(0, 0))
+        again, tokenized = self.index(index)
+        self.assertEqual(tokenized, 0)
+        self.assertEqual(again.pages[self.pages[1][0]]["mtime_ns"], 0)
+
+    def test_changed_page_keeps_its_id(self):
+        index, _ = self.index()
+        write_file(self.pages[1][0], "# Post\n\nfarewell")
+        again, tokenized = self.index(index)
+        self.assertEqual(tokenized, 1)
+        entry = again.pages[self.pages[1][0]]
+        self.assertEqual(entry["id"], 0)
+        self.assertEqual(list(entry["terms"]), ["post", "farewell"])
+
+    def test_removed_page_id_is_reused(self):
+        index, _ = self.index()
+        removed_id = index.pages[self.pages[0][0]]["id"]
+        new_page = os.path.join(self.content, "new.md")
+        write_file(new_page, "# New\n\nnew page")
+        self.pages = [self.pages[1], (new_page, os.path.join(self.dest, "new.html"))]
+        again, tokenized = self.index(index)
+        self.assertEqual(tokenized, 1)
+        self.assertEqual(again.pages[new_page]["id"], removed_id)
+        self.assertNotIn(os.path.join(self.content, "index.md"), again.pages)
+
+    def test_generated_pages_are_not_read_again(self):
+        index, _ = self.index()
+        write_file(self.pages[1][0], "# Post\n\nfarewell")
+        generated = {self.pages[1][0]: PageTerms("Post", {"post": [0], "bye": [1]})}
+        with mock.patch.object(search_index, "read_source") as read_source:
+            again, tokenized = self.index(index, generated)
+        read_source.assert_not_called()
+        self.assertEqual(tokenized, 1)
+        self.assertEqual(
+            again.pages[self.pages[1][0]]["terms"], {"post": [0], "bye": [1]}
+        )
+
+    def test_broken_page_is_left_out(self):
+        write_file(self.pages[1][0], "no title")
+        index, _ = self.index()
+        self.assertEqual(list(index.pages), [self.pages[0][0]])
+
+    def test_write_index_files_skips_unchanged(self):
+        index, _ = self.index()
+        self.assertEqual(write_index_files(self.dest, index.files()), 6)
+        self.assertEqual(write_index_files(self.dest, index.files()), 0)
+        write_file(self.pages[1][0], "# Post\n\nhello _there_")
+        again, _ = self.index(index)
+        # NOTE: only the new shard of "there" is written and the one of
+        #       "again" is removed, its compressed sibling is left alone
+        stale = os.path.join(self.dest, "search", "terms", "61-67.json")
+        write_file(f"{stale}.gz", "")
+        self.assertEqual(write_index_files(self.dest, again.files()), 1)
+        self.assertFalse(os.path.exists(stale))
+        self.assertTrue(os.path.exists(f"{stale}.gz"))
+
+    def test_load_missing_or_other_version(self):
+        self.assertEqual(SearchIndex.load(self.cache), SearchIndex())
+        write_file(self.cache, json.dumps({"version": 0, "pages": {"a": {}}}))
+        self.assertEqual(SearchIndex.load(self.cache), SearchIndex())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from htmlnode import LeafNode, ParentNode
+from template import (
+    Template,
+    annotate_images,
+    load_template,
+    rebase_urls,
+    rewrite_urls,
+)
+
+
+class TestTemplate(unittest.TestCase):
+    def test_compile_segments(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        self.assertEqual(template.literals, ["<title>", "</title><main>", "</main>"])
+        self.assertEqual(template.slots, ["Title", "Content"])
+
+    def test_render(self):
+        template = Template("<title>{{ Title }}</title><main>{{ Content }}</main>")
+        content = ParentNode("div", [LeafNode("b", "bold")])
+        self.assertEqual(
+            template.render({"Title": "Hello", "Content": content}),
+            "<title>Hello</title><main><div><b>bold</b></div></main>",
+        )
+
+    def test_render_missing_value_keeps_slot(self):
+        template = Template("<p>{{ Author }}</p>")
+        self.assertEqual(template.render({}), "<p>{{ Author }}</p>")
+
+    def test_base_path_applied_to_template_and_content(self):
+        template = Template(
+            '<link href="/index.css" />{{ Content }}', "/flowery-press/"
+        )
+        self.assertEqual(
+            template.literals[0], '<link href="/flowery-press/index.css" />'
+        )
+        content = ParentNode(
+            "p",
+            [
+                LeafNode("a", "home", {"href": "/"}),
+                LeafNode("img", "", {"src": "/images/tom.png", "alt": "tom"}),
+            ],
+        )
+        self.assertEqual(
+            template.render({"Content": content}),
+            '<link href="/flowery-press/index.css" />'
+            '<p><a href="/flowery-press/">home</a>'
+            '<img src="/flowery-press/images/tom.png" alt="tom"></img></p>',
+        )
+
+    def test_content_rewritten_block_by_block(self):
+        template = Template("{{ Content }}", "/fp/", images={"a.png": ' width="1"'})
+        blocks = [
+            ParentNode("p", [LeafNode(None, "a "), LeafNode("a", "a", {"href": "/a"})]),
+            ParentNode("p", [LeafNode(None, "plain "), LeafNode("b", "text")]),
+            LeafNode("img", "", {"src": "/a.png"}),
+        ]
+        content = ParentNode("div", blocks)
+        expected = template.rewrite(content.to_html())
+        with mock.patch.object(template, "rewrite", wraps=template.rewrite) as rewrite:
+            self.assertEqual(template.render({"Content": content}), expected)
+        # NOTE: the opening tag of the content and then every block at once
+        self.assertEqual(rewrite.call_count, 1 + len(blocks))
+
+    def test_rebase_urls_default_base_path(self):
+        html = '<a href="/blog">blog</a>'
+        self.assertIs(rebase_urls(html, "/"), html)
+
+    def test_rewrite_urls_points_at_fingerprinted_assets(self):
+        assets = {"index.css": "index.0123456789.css"}
+        self.assertEqual(
+            rewrite_urls(
+                '<link href="/index.css" /><a href="/index.css?v=1#top">',
+                "/flowery-press/",
+                assets,
+            ),
+            '<link href="/flowery-press/index.0123456789.css" />'
+            '<a href="/flowery-press/index.0123456789.css?v=1#top">',
+        )
+        self.assertEqual(
+            rewrite_urls('<a href="/blog/">', "/", assets), '<a href="/blog/">'
+        )
+
+    def test_assets_applied_to_template_and_content(self):
+        template = Template(
+            '<link href="/index.css" />{{ Content }}',
+            assets={"index.css": "index.1.css", "images/tom.png": "images/tom.2.png"},
+        )
+        content = LeafNode("img", "", {"src": "/images/tom.png", "alt": "tom"})
+        self.assertEqual(
+            template.render({"Content": content}),
+            '<link href="/index.1.css" /><img src="/images/tom.2.png" alt="tom"></img>',
+        )
+
+    def test_annotate_images(self):
+        self.assertEqual(
+            annotate_images(
+                '<img src="/tom.png" alt="tom"><img src="https://x.org/a.png">',
+                {"tom.png": ' width="2" height="1"'},
+            ),
+            '<img src="/tom.png" width="2" height="1" loading="lazy" decoding="async"'
+            ' alt="tom"><img src="https://x.org/a.png" loading="lazy"'
+            ' decoding="async">',
+        )
+
+    def test_images_applied_before_base_path(self):
+        template = Template(
+            "{{ Content }}", "/flowery-press/", images={"tom.png": ' width="2"'}
+        )
+        content = LeafNode("img", "", {"src": "/tom.png", "alt": "tom"})
+        self.assertEqual(
+            template.render({"Content": content}),
+            '<img src="/flowery-press/tom.png" width="2" loading="lazy"'
+            ' decoding="async" alt="tom"></img>',
+        )
+
+    def test_load_template_cached_until_changed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "template.html")
+            with open(path, mode="w") as f:
+                f.write("<p>{{ Content }}</p>")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+            self.assertIsNot(load_template(path, "/flowery-press/"), first)
+            self.assertIsNot(load_template(path, "/", {"a.css": "a.1.css"}), first)
+            with open(path, mode="w") as f:
+                f.write("<div>{{ Content }}</div>")
+            self.assertEqual(load_template(path).literals, ["<div>", "</div>"])
+
+
+if __name__ == "__main__":
+    unittest.main()
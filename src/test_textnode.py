@@ -33,6 +33,10 @@ class TestTextNode(unittest.TestCase):
         node = TextNode("This is a text node", TextType.BOLD)
         self.assertEqual(node.url, None)
 
+    def test_no_instance_dict(self):
+        node = TextNode("This is a text node", TextType.BOLD)
+        self.assertFalse(hasattr(node, "__dict__"))
+
     def test_conversion_to_html_node_text(self):
         node = TextNode("This is a text node", TextType.PLAIN)
         html_node = text_node_to_html_node(node)